@@ -0,0 +1,379 @@
+"""
+History analytics: streaks, moving averages, weekday profile, percentiles, trend.
+
+AnalyticsEngine keeps completed days (everything before today) in dense
+per-calendar-day columns: intake, target, percentage and a recorded flag,
+so a day without data is a hole rather than a missing row. Columns are
+NumPy arrays when available, array.array otherwise. They are filled once
+from the archive and the hot history, then updated in place as days are
+archived; only hot days that completed or were edited since the last
+sync are re-read. Derived results are cached until a column changes. Today's
+running counter never enters the columns, so adding water doesn't
+invalidate anything.
+"""
+import logging
+from array import array
+from datetime import date, timedelta
+from itertools import accumulate
+
+from history_index import to_ordinal
+
+try:
+  import numpy as np
+
+  HAS_NUMPY = True
+except ImportError:
+  HAS_NUMPY = False
+
+log = logging.getLogger(__name__)
+
+MOVING_AVERAGE_WINDOWS = (7, 30, 90)
+PERCENTILES = (10, 25, 50, 75, 90)
+TREND_DAYS = 90
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+NOT_CACHED = object()  # Cache miss marker, since None is a valid result (e.g. trend())
+
+
+def entry_values(entry, default_target):
+  """(intake, target, percentage) of a history entry"""
+  intake = entry.get("intake", 0)
+  target = entry.get("target", default_target)
+  percentage = entry.get("percentage")
+  if percentage is None:
+    percentage = round((intake / target) * 100 if target > 0 else 0, 1)
+  return intake, target, percentage
+
+
+def percentile(sorted_values, q):
+  """Linear-interpolated percentile of sorted values (NumPy's default method)"""
+  position = (len(sorted_values) - 1) * q / 100
+  low = int(position)
+  high = min(low + 1, len(sorted_values) - 1)
+  return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+class AnalyticsEngine:
+  """Dense day columns over a profile's completed history, with cached results"""
+
+  def __init__(self, archive=None):
+    self.archive = archive
+    self.month_summaries = {}  # Sealed month -> manifest summary it was loaded from
+    self.first = None  # Ordinal of column index 0
+    self.length = 0
+    self.today = None  # Ordinal of the day in progress at the last sync
+    # Watermark of the hot history already folded in: the dict, its size, and
+    # days edited in place since (see mark_changed)
+    self.hot_source = None
+    self.hot_length = 0
+    self.changed_days = set()
+    self.version = 0  # Bumped whenever a column changes
+    self.intake = self.new_column("d", 0)
+    self.target = self.new_column("d", 0)
+    self.percentage = self.new_column("d", 0)
+    self.recorded = self.new_column("b", 0)
+    self.cache = {}
+
+  def new_column(self, typecode, size):
+    if HAS_NUMPY:
+      return np.zeros(size, dtype=np.bool_ if typecode == "b" else np.float64)
+    return array(typecode, bytes(size * array(typecode).itemsize))
+
+  def resize(self, first, last):
+    """Grow the columns to cover ordinals first..last, keeping existing values"""
+    new_first = first if self.first is None else min(first, self.first)
+    new_length = max(last, (self.first or last) + self.length - 1) - new_first + 1
+    offset = 0 if self.first is None else self.first - new_first
+    capacity = len(self.intake)
+    if offset == 0 and new_length <= capacity:
+      self.first, self.length = new_first, new_length
+      return
+
+    # Appends double the capacity so a day at a time stays amortized O(1)
+    capacity = max(new_length, 2 * capacity if offset == 0 else new_length)
+    for name, typecode in (("intake", "d"), ("target", "d"), ("percentage", "d"), ("recorded", "b")):
+      old = getattr(self, name)
+      column = self.new_column(typecode, capacity)
+      column[offset:offset + self.length] = old[:self.length]
+      setattr(self, name, column)
+    self.first, self.length = new_first, new_length
+
+  def set_day(self, ordinal, values):
+    """Store one completed day. Returns True if anything changed."""
+    if self.first is None or not self.first <= ordinal < self.first + self.length:
+      self.resize(ordinal, ordinal)
+    i = ordinal - self.first
+    intake, target, percentage = values
+    if self.recorded[i] and self.intake[i] == intake and self.target[i] == target and self.percentage[i] == percentage:
+      return False
+    self.intake[i] = intake
+    self.target[i] = target
+    self.percentage[i] = percentage
+    self.recorded[i] = True
+    return True
+
+  def mark_changed(self, days):
+    """Fold these hot history days in at the next sync; they were edited in place"""
+    self.changed_days.update(days)
+
+  def hot_changes(self, history, today):
+    """(day, entry) pairs of the hot history that may have changed since the last sync"""
+    previous = self.today
+    if (history is not self.hot_source or len(history) != self.hot_length
+        or previous is None or not 0 <= today - previous <= len(history)):
+      # A new or replaced dict, days added behind our back, or a clock jump: walk it all
+      return list(history.items())
+    # Days that completed since the last sync, plus the ones edited in place
+    days = self.changed_days | {(date.fromordinal(previous) + timedelta(days=i)).isoformat()
+                                for i in range(today - previous)}
+    return [(day, history[day]) for day in days if day in history]
+
+  def sync(self, history, default_target, today):
+    """
+      Bring the columns up to date with the archive and the hot history.
+
+      Only sealed months whose manifest summary changed are read, and only
+      hot days that completed or were marked changed since the last sync
+      (just days before `today` count). Clears the result cache if anything
+      changed.
+      """
+    today = to_ordinal(today)
+    pending = []
+    if self.archive is not None:
+      for month in self.archive.months():
+        summary = self.archive.summary(month)
+        if self.month_summaries.get(month) != summary:
+          archived = self.archive.segment(month)
+          pending.extend(archived.items())
+          # A day that is also in the hot history (a late event not sealed yet) keeps its hot entry
+          pending.extend((day, history[day]) for day in archived if day in history)
+          self.month_summaries[month] = summary
+    pending.extend(self.hot_changes(history, today))
+    self.today = today
+    self.hot_source = history
+    self.hot_length = len(history)
+    self.changed_days.clear()
+
+    values = {}
+    for day, entry in pending:
+      ordinal = to_ordinal(day)
+      if ordinal < today:
+        values[ordinal] = entry_values(entry, default_target)  # Hot entries override archived ones
+    if values and (self.first is None or min(values) < self.first or max(values) >= self.first + self.length):
+      self.resize(min(values), max(values))
+
+    changed = 0
+    for ordinal, day_values in values.items():
+      changed += self.set_day(ordinal, day_values)
+    if changed:
+      self.cache.clear()
+      self.version += 1
+      log.debug("Analytics updated %d day(s)", changed)
+    return changed
+
+  def cached(self, key, compute):
+    result = self.cache.get(key, NOT_CACHED)
+    if result is NOT_CACHED:
+      result = self.cache[key] = compute()
+    return result
+
+  def series(self):
+    """(ordinals, intakes, targets) lists of the recorded days, oldest first"""
+    def compute():
+      if HAS_NUMPY:
+        indexes = np.flatnonzero(self.recorded[:self.length])
+        return ((indexes + self.first).tolist(), self.intake[indexes].tolist(), self.target[indexes].tolist())
+      recorded = [i for i in range(self.length) if self.recorded[i]]
+      return ([self.first + i for i in recorded], [self.intake[i] for i in recorded], [self.target[i] for i in recorded])
+    return self.cached("series", compute)
+
+  def on_target(self):
+    """Per-day on-target flags"""
+    def compute():
+      if HAS_NUMPY:
+        return self.recorded[:self.length] & (self.percentage[:self.length] >= 100)
+      return [bool(r) and p >= 100 for r, p in zip(self.recorded[:self.length], self.percentage[:self.length])]
+    return self.cached("on_target", compute)
+
+  def streaks(self):
+    """Current (ending on the latest completed day) and longest run of on-target days"""
+    def compute():
+      flags = self.on_target()
+      if HAS_NUMPY:
+        edges = np.diff(np.concatenate(([0], flags.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        runs = list(zip(starts.tolist(), ends.tolist()))
+      else:
+        runs, start = [], None
+        for i, flag in enumerate(list(flags) + [False]):
+          if flag and start is None:
+            start = i
+          elif not flag and start is not None:
+            runs.append((start, i))
+            start = None
+
+      result = {"current": 0, "longest": 0, "longest_start": None, "longest_end": None}
+      if runs:
+        start, end = max(runs, key=lambda run: run[1] - run[0])  # First of the longest
+        result.update(
+          longest=end - start,
+          longest_start=date.fromordinal(self.first + start).isoformat(),
+          longest_end=date.fromordinal(self.first + end - 1).isoformat()
+        )
+        if runs[-1][1] == self.length:
+          result["current"] = runs[-1][1] - runs[-1][0]
+      return result
+    return self.cached("streaks", compute)
+
+  def moving_average(self, window):
+    """
+      Mean intake of the recorded days in the `window` calendar days ending on each day.
+
+      One value per column day (None/NaN where the window holds no data).
+      """
+    def compute():
+      if HAS_NUMPY:
+        recorded = self.recorded[:self.length]
+        sums = np.concatenate(([0.0], np.cumsum(np.where(recorded, self.intake[:self.length], 0.0))))
+        counts = np.concatenate(([0], np.cumsum(recorded)))
+        low = np.maximum(np.arange(1, self.length + 1) - window, 0)
+        window_sums = sums[1:] - sums[low]
+        window_counts = counts[1:] - counts[low]
+        with np.errstate(invalid="ignore", divide="ignore"):
+          return np.where(window_counts > 0, window_sums / np.maximum(window_counts, 1), np.nan)
+
+      recorded = self.recorded[:self.length]
+      sums = [0.0] + list(accumulate(i if r else 0.0 for i, r in zip(self.intake[:self.length], recorded)))
+      counts = [0] + list(accumulate(recorded))
+      averages = []
+      for i in range(1, self.length + 1):
+        low = max(i - window, 0)
+        count = counts[i] - counts[low]
+        averages.append((sums[i] - sums[low]) / count if count else None)
+      return averages
+    return self.cached(("moving_average", window), compute)
+
+  def latest_averages(self):
+    """{window: mean intake over the last `window` days} for the standard windows"""
+    result = {}
+    for window in MOVING_AVERAGE_WINDOWS:
+      averages = self.moving_average(window)
+      value = averages[-1] if self.length else None
+      result[window] = None if value is None or value != value else round(float(value), 1)  # NaN check
+    return result
+
+  def average_on(self, day, window=7):
+    """Moving average for one date, or None outside the columns"""
+    if self.first is None:
+      return None
+    i = to_ordinal(day) - self.first
+    if not 0 <= i < self.length:
+      return None
+    value = self.moving_average(window)[i]
+    return None if value is None or value != value else round(float(value), 1)
+
+  def weekday_profile(self):
+    """Mean intake and on-target rate for each weekday, Monday first"""
+    def compute():
+      if self.first is None:
+        return []
+      first_weekday = date.fromordinal(self.first).weekday()
+      if HAS_NUMPY:
+        recorded = self.recorded[:self.length]
+        weekdays = (np.arange(self.length) + first_weekday)[recorded] % 7
+        days = np.bincount(weekdays, minlength=7)
+        intake = np.bincount(weekdays, weights=self.intake[:self.length][recorded], minlength=7)
+        on_target = np.bincount(weekdays, weights=self.on_target()[recorded], minlength=7)
+        days, intake, on_target = days.tolist(), intake.tolist(), on_target.tolist()
+      else:
+        days, intake, on_target = [0] * 7, [0.0] * 7, [0] * 7
+        flags = self.on_target()
+        for i, (value, r) in enumerate(zip(self.intake[:self.length], self.recorded[:self.length])):
+          if r:
+            weekday = (i + first_weekday) % 7
+            days[weekday] += 1
+            intake[weekday] += value
+            on_target[weekday] += flags[i]
+      return [
+        {
+          "weekday": WEEKDAYS[w],
+          "days": int(days[w]),
+          "mean_intake": round(intake[w] / days[w], 1) if days[w] else 0,
+          "on_target_rate": round(on_target[w] / days[w], 3) if days[w] else 0
+        }
+        for w in range(7)
+      ]
+    return self.cached("weekday_profile", compute)
+
+  def percentiles(self, qs=PERCENTILES):
+    """Intake and percentage-of-target percentiles over all recorded days"""
+    def compute():
+      if HAS_NUMPY:
+        recorded = self.recorded[:self.length]
+        intake = self.intake[:self.length][recorded]
+        percentage = self.percentage[:self.length][recorded]
+        if not len(intake):
+          return {}
+        intake_values = np.percentile(intake, qs).tolist()
+        percentage_values = np.percentile(percentage, qs).tolist()
+      else:
+        columns = zip(self.intake[:self.length], self.percentage[:self.length], self.recorded[:self.length])
+        pairs = [(i, p) for i, p, r in columns if r]
+        if not pairs:
+          return {}
+        intake = sorted(i for i, _ in pairs)
+        percentage = sorted(p for _, p in pairs)
+        intake_values = [percentile(intake, q) for q in qs]
+        percentage_values = [percentile(percentage, q) for q in qs]
+      return {
+        f"p{q}": {"intake": round(i, 1), "percentage": round(p, 1)}
+        for q, i, p in zip(qs, intake_values, percentage_values)
+      }
+    return self.cached(("percentiles", tuple(qs)), compute)
+
+  def trend(self, days=TREND_DAYS):
+    """Least-squares slope of intake over the last `days` calendar days, in ml per day"""
+    def compute():
+      low = max(self.length - days, 0)
+      if HAS_NUMPY:
+        recorded = self.recorded[low:self.length]
+        x = np.arange(low, self.length, dtype=np.float64)[recorded]
+        y = self.intake[low:self.length][recorded]
+        if len(x) < 2:
+          return None
+        x_mean = x.mean()
+        return round(float(((x - x_mean) * (y - y.mean())).sum() / ((x - x_mean) ** 2).sum()), 2)
+
+      points = [(i, self.intake[i]) for i in range(low, self.length) if self.recorded[i]]
+      if len(points) < 2:
+        return None
+      x_mean = sum(x for x, _ in points) / len(points)
+      y_mean = sum(y for _, y in points) / len(points)
+      return round(
+        sum((x - x_mean) * (y - y_mean) for x, y in points) / sum((x - x_mean) ** 2 for x, _ in points), 2)
+    return self.cached(("trend", days), compute)
+
+  def summary(self, today_on_target=False):
+    """
+      Everything at once, for the UI and reports.
+
+      today_on_target extends the current streak by today when the goal is
+      already met; an unfinished day never breaks it, a day with no data does.
+      """
+    streaks = dict(self.streaks())
+    if self.today is not None and self.first is not None and self.first + self.length < self.today:
+      streaks["current"] = 0  # Days without data since the run ended
+    if today_on_target:
+      streaks["current"] += 1
+      streaks["longest"] = max(streaks["longest"], streaks["current"])
+    recorded = self.cached("days", lambda: int(sum(self.recorded[:self.length])) if self.length else 0)
+    return {
+      "first": date.fromordinal(self.first).isoformat() if self.first is not None else None,
+      "last": date.fromordinal(self.first + self.length - 1).isoformat() if self.length else None,
+      "days": recorded,
+      "streaks": streaks,
+      "moving_averages": self.latest_averages(),
+      "weekday_profile": self.weekday_profile(),
+      "percentiles": self.percentiles(),
+      "trend_ml_per_day": self.trend()
+    }
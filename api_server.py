@@ -0,0 +1,351 @@
+import asyncio
+import json
+import logging
+import sys
+from datetime import datetime, timedelta
+from urllib.parse import parse_qsl
+
+from app_logging import setup_logging
+from data_manager import DataManager
+from intake_log import EARLIEST_EVENT, MAX_AMOUNT
+from reminder_scheduler import ReminderScheduler
+
+log = logging.getLogger(__name__)
+
+MAX_HEADER_LINES = 100
+MAX_BODY_SIZE = 1024 * 1024  # 1 MB
+KEEP_ALIVE_TIMEOUT = 30  # seconds
+# How far ahead of our clock a client's timestamp may be (its clock may run fast)
+MAX_CLOCK_SKEW = timedelta(days=1)
+
+STATUS_TEXT = {
+  200: "OK",
+  201: "Created",
+  400: "Bad Request",
+  404: "Not Found",
+  405: "Method Not Allowed",
+  411: "Length Required",
+  413: "Payload Too Large",
+  500: "Internal Server Error"
+}
+
+
+class HttpError(Exception):
+  def __init__(self, status, message):
+    super().__init__(message)
+    self.status = status
+    self.message = message
+
+
+def parse_timestamp(value):
+  """Parse an ISO 8601 string or a unix timestamp into a local datetime"""
+  if value is None:
+    return datetime.now()
+  if isinstance(value, (int, float)) and not isinstance(value, bool):
+    try:
+      parsed = datetime.fromtimestamp(value)
+    except (OverflowError, OSError, ValueError):
+      raise HttpError(400, f"Timestamp out of range: {value}")
+  else:
+    try:
+      parsed = datetime.fromisoformat(str(value))
+      if parsed.tzinfo is not None:
+        # Convert to local time and drop the offset so it compares with local dates
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    except (OverflowError, OSError, ValueError):
+      raise HttpError(400, f"Invalid timestamp: {value}")
+  if not EARLIEST_EVENT <= parsed <= datetime.now() + MAX_CLOCK_SKEW:
+    raise HttpError(400, f"Timestamp out of range: {value}")
+  return parsed
+
+
+def parse_amount(value):
+  """Validate a water amount in ml"""
+  if isinstance(value, bool) or not isinstance(value, int) or not 0 < value <= MAX_AMOUNT:
+    raise HttpError(400, f"amount must be a positive integer up to {MAX_AMOUNT} (ml)")
+  return value
+
+
+class WaterApiServer:
+  """Stdlib-only HTTP/1.1 API for logging water from other devices"""
+
+  def __init__(self, data_manager=None, reminder_scheduler=None):
+    self.data_manager = data_manager or DataManager()
+    self.user_data = self.data_manager.load_data()
+
+    # Reminders are only managed here, the GUI app is responsible for firing them
+    self.reminder_scheduler = reminder_scheduler or ReminderScheduler(None)
+    self.reminder_scheduler.load_reminders(self.user_data.get("custom_reminders", []))
+
+    self.routes = {
+      ("GET", "/status"): self.get_status,
+      ("POST", "/intake"): self.add_intake,
+      ("POST", "/intake/batch"): self.add_intake_batch,
+      ("GET", "/stats/weekly"): self.get_weekly_stats,
+      ("GET", "/history"): self.get_history,
+      ("GET", "/stats/summary"): self.get_stats_summary,
+      ("GET", "/reminders"): self.list_reminders,
+      ("POST", "/reminders"): self.create_reminder
+    }
+    self.server = None
+
+  # --- Handlers -------------------------------------------------------------
+
+  def get_status(self, body):
+    self.data_manager.check_new_day(self.user_data)
+    target = self.user_data["daily_target"]
+    intake = self.user_data["current_intake"]
+    return 200, {
+      "date": self.user_data["last_reset_date"],
+      "current_intake": intake,
+      "daily_target": target,
+      "percentage": round((intake / target) * 100 if target > 0 else 0, 1),
+      "reminder_active": self.user_data.get("reminder_active", False)
+    }
+
+  def add_intake(self, body):
+    amount = parse_amount(body.get("amount"))
+    timestamp = parse_timestamp(body.get("timestamp"))
+    try:
+      self.data_manager.apply_intake_events(self.user_data, [(timestamp, amount)])
+    except ValueError as e:
+      raise HttpError(400, str(e))
+    self.save()
+    return self.get_status(body)
+
+  def add_intake_batch(self, body):
+    raw_events = body.get("events")
+    if not isinstance(raw_events, list):
+      raise HttpError(400, "events must be a list")
+
+    # Validate everything before touching the data so a bad event rejects the whole batch
+    events = [(parse_timestamp(e.get("timestamp")), parse_amount(e.get("amount")))
+              for e in raw_events if isinstance(e, dict)]
+    if len(events) != len(raw_events):
+      raise HttpError(400, "each event must be an object")
+
+    try:
+      applied = self.data_manager.apply_intake_events(self.user_data, events)
+    except ValueError as e:
+      raise HttpError(400, str(e))
+    self.save()  # One write for the whole batch
+
+    status = self.get_status(body)[1]
+    status["applied"] = applied
+    status["ignored"] = len(events) - applied
+    return 200, status
+
+  def get_weekly_stats(self, body):
+    self.data_manager.update_history(self.user_data)
+    return 200, {"days": self.data_manager.get_weekly_stats(self.user_data)}
+
+  def get_history(self, body):
+    self.data_manager.update_history(self.user_data)
+    try:
+      buckets = self.data_manager.query(
+        self.user_data, body.get("start"), body.get("end"), body.get("granularity", "day")
+      )
+    except ValueError as e:
+      raise HttpError(400, str(e))
+    return 200, {"buckets": buckets}
+
+  def get_stats_summary(self, body):
+    self.data_manager.check_new_day(self.user_data)
+    return 200, self.data_manager.stats_summary(self.user_data)
+
+  def list_reminders(self, body):
+    return 200, {"reminders": [
+      {"id": rid, "hour": hour, "minute": minute}
+      for hour, minute, rid in self.reminder_scheduler.get_all_reminders()
+    ]}
+
+  def create_reminder(self, body):
+    hour = body.get("hour")
+    minute = body.get("minute")
+    if not isinstance(hour, int) or not isinstance(minute, int) or not (0 <= hour < 24 and 0 <= minute < 60):
+      raise HttpError(400, "hour (0-23) and minute (0-59) are required")
+
+    reminder_id = self.reminder_scheduler.add_reminder(hour, minute, body.get("id"))
+    if reminder_id is None:
+      raise HttpError(400, f"A reminder already exists at {hour:02d}:{minute:02d}")
+    self.save()
+    return 201, {"id": reminder_id, "hour": hour, "minute": minute}
+
+  def delete_reminder(self, reminder_id):
+    if not self.reminder_scheduler.remove_reminder(reminder_id):
+      raise HttpError(404, f"Reminder {reminder_id} not found")
+    self.save()
+    return 200, {"deleted": reminder_id}
+
+  def reload_external_changes(self):
+    """Merge in what the GUI app, sync or a hand edit wrote to the data file since we last looked"""
+    # One stat call per request when nothing changed
+    if not self.data_manager.has_external_changes():
+      return
+    try:
+      changes = self.data_manager.reload_changes(self.user_data)
+    except Exception:
+      log.exception("Error reloading external changes")
+      return
+    if "custom_reminders" in changes["settings"]:
+      self.reminder_scheduler.load_reminders(self.user_data.get("custom_reminders", []))
+
+  def save(self):
+    self.user_data["custom_reminders"] = self.reminder_scheduler.to_list()
+    if not self.data_manager.save_data(self.user_data):
+      raise HttpError(500, "Could not save data")
+
+  # --- HTTP plumbing --------------------------------------------------------
+
+  def dispatch(self, method, path, body):
+    path, _, query = path.partition("?")
+    path = path.rstrip("/") or "/"
+    self.reload_external_changes()
+
+    if path.startswith("/reminders/"):
+      if method != "DELETE":
+        raise HttpError(405, "Use DELETE to remove a reminder")
+      return self.delete_reminder(path[len("/reminders/"):])
+
+    handler = self.routes.get((method, path))
+    if handler is None:
+      if any(route_path == path for _, route_path in self.routes):
+        raise HttpError(405, f"{method} not allowed on {path}")
+      raise HttpError(404, f"No route for {path}")
+
+    if body:
+      try:
+        payload = json.loads(body)
+      except ValueError:
+        raise HttpError(400, "Body must be valid JSON")
+      if not isinstance(payload, dict):
+        raise HttpError(400, "Body must be a JSON object")
+    else:
+      # GET parameters arrive in the query string
+      payload = dict(parse_qsl(query))
+    return handler(payload)
+
+  async def read_request(self, reader):
+    """Read one request. Returns (method, path, headers, body) or None on a closed connection."""
+    request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+    if not request_line:
+      return None
+
+    try:
+      method, path, version = request_line.decode("latin-1").split()
+    except ValueError:
+      raise HttpError(400, "Malformed request line")
+
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+      line = await reader.readline()
+      if line in (b"\r\n", b"\n", b""):
+        break
+      name, _, value = line.decode("latin-1").partition(":")
+      headers[name.strip().lower()] = value.strip()
+    else:
+      raise HttpError(400, "Too many headers")
+
+    raw_length = headers.get("content-length")
+    if raw_length is None:
+      if "transfer-encoding" in headers:
+        raise HttpError(411, "Content-Length is required")
+      raw_length = "0"
+    if not raw_length.isdigit():
+      raise HttpError(400, f"Invalid Content-Length: {raw_length}")
+    length = int(raw_length)
+    if length > MAX_BODY_SIZE:
+      raise HttpError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+
+    headers[":version"] = version
+    return method.upper(), path, headers, body
+
+  def write_response(self, writer, status, payload, keep_alive):
+    body = json.dumps(payload).encode("utf-8")
+    head = (
+      f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+      f"Content-Type: application/json\r\n"
+      f"Content-Length: {len(body)}\r\n"
+      f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+
+  async def handle_connection(self, reader, writer):
+    try:
+      while True:
+        try:
+          request = await self.read_request(reader)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+          break
+        except HttpError as e:
+          self.write_response(writer, e.status, {"error": e.message}, False)
+          break
+
+        if request is None:
+          break
+        method, path, headers, body = request
+
+        # HTTP/1.1 keeps connections open unless the client says otherwise
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if headers[":version"] == "HTTP/1.1" else connection == "keep-alive"
+
+        try:
+          status, payload = self.dispatch(method, path, body)
+        except HttpError as e:
+          status, payload = e.status, {"error": e.message}
+        except Exception:
+          log.exception("Error handling %s %s", method, path)
+          status, payload = 500, {"error": "Internal server error"}
+
+        self.write_response(writer, status, payload, keep_alive)
+        await writer.drain()
+        if not keep_alive:
+          break
+    finally:
+      writer.close()
+      try:
+        await writer.wait_closed()
+      except ConnectionError:
+        pass
+
+  async def start(self, host="127.0.0.1", port=8765):
+    self.server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+    return self.server
+
+  async def serve_forever(self, host="127.0.0.1", port=8765):
+    server = await self.start(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Water Reminder API listening on http://{address[0]}:{address[1]}")
+    async with server:
+      await server.serve_forever()
+
+
+def main(argv):
+  setup_logging(console=True)
+  host = "127.0.0.1"
+  port = 8765
+  filename = "user_data.json"
+
+  i = 0
+  while i < len(argv):
+    if argv[i] == "--host" and i + 1 < len(argv):
+      host = argv[i + 1]
+      i += 1
+    elif argv[i] == "--port" and i + 1 < len(argv):
+      port = int(argv[i + 1])
+      i += 1
+    elif argv[i] == "--data" and i + 1 < len(argv):
+      filename = argv[i + 1]
+      i += 1
+    i += 1
+
+  api = WaterApiServer(DataManager(filename))
+  try:
+    asyncio.run(api.serve_forever(host, port))
+  except KeyboardInterrupt:
+    pass
+
+
+if __name__ == "__main__":
+  main(sys.argv[1:])
@@ -0,0 +1,168 @@
+"""
+Logging for the app and its tools.
+
+Modules log through logging.getLogger(__name__). setup_logging() puts a
+QueueHandler on the root logger, so a log call just enqueues the record
+and returns; a QueueListener thread does the file I/O. Records are
+written as JSON lines to a size-rotated file in the per-user data
+directory.
+
+Nothing is logged unless WATER_REMINDER_LOG is set (or a level is passed):
+
+  WATER_REMINDER_LOG=INFO
+  WATER_REMINDER_LOG=WARNING,data_manager=DEBUG,system_tray=ERROR
+
+WATER_REMINDER_LOG_DIR overrides where the log file goes.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+LOG_ENV = "WATER_REMINDER_LOG"
+LOG_DIR_ENV = "WATER_REMINDER_LOG_DIR"
+LOG_FILENAME = "water_reminder.log"
+MAX_BYTES = 1024 * 1024
+BACKUP_COUNT = 5
+
+# Attributes every LogRecord has; anything else came from extra={...}
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+listener = None
+configured = False
+
+
+def user_data_dir():
+  """Per-user directory for the app's own files (logs), following each OS's convention"""
+  if sys.platform == "win32":
+    base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    return os.path.join(base, "WaterReminder")
+  if sys.platform == "darwin":
+    return os.path.expanduser("~/Library/Application Support/WaterReminder")
+  base = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+  return os.path.join(base, "water-reminder")
+
+
+class JsonFormatter(logging.Formatter):
+  """One JSON object per line: time, level, logger, message, extra fields and any traceback"""
+
+  def format(self, record):
+    entry = {
+      "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+      "level": record.levelname,
+      "logger": record.name,
+      "message": record.getMessage(),
+      "thread": record.threadName
+    }
+    for key, value in vars(record).items():
+      if key not in STANDARD_ATTRIBUTES and not key.startswith("_"):
+        entry[key] = value
+    if record.exc_info:
+      entry["exception"] = self.formatException(record.exc_info)
+    elif record.exc_text:
+      entry["exception"] = record.exc_text
+    return json.dumps(entry, default=str)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+  """
+    QueueHandler that keeps the message and traceback apart.
+
+    The stock handler folds the traceback into the message text; this one
+    only renders what can't cross a thread safely (args, exc_info).
+    """
+
+  def prepare(self, record):
+    record = copy.copy(record)
+    record.msg = record.getMessage()
+    record.args = None
+    if record.exc_info:
+      record.exc_text = logging.Formatter().formatException(record.exc_info)
+      record.exc_info = None
+    return record
+
+
+def parse_levels(spec):
+  """Parse "LEVEL,module=LEVEL,..." into (default level, {logger: level})"""
+  default = None
+  modules = {}
+  for part in (spec or "").split(","):
+    part = part.strip()
+    if not part:
+      continue
+    name, _, level = part.rpartition("=")
+    level = logging.getLevelName(level.strip().upper())
+    if not isinstance(level, int):
+      continue  # Unknown level name
+    if name:
+      modules[name.strip()] = level
+    else:
+      default = level
+  return default, modules
+
+
+def setup_logging(level=None, module_levels=None, log_dir=None, console=False):
+  """
+    Start the logging pipeline for this process. Safe to call more than once.
+
+    level/module_levels default to WATER_REMINDER_LOG. With no level at all
+    the app stays silent, unless console=True (command line tools), which
+    prints warnings and errors to stderr.
+    """
+  global listener, configured
+  if configured:
+    return listener
+  configured = True
+
+  env_level, env_modules = parse_levels(os.environ.get(LOG_ENV))
+  level = env_level if level is None else level
+  module_levels = {**env_modules, **(module_levels or {})}
+
+  root = logging.getLogger()
+  if level is None and not module_levels and not console:
+    # Silent: also stops logging's last-resort handler printing to stderr
+    root.addHandler(logging.NullHandler())
+    return None
+
+  handlers = []
+  if level is not None or module_levels:
+    log_dir = log_dir or os.environ.get(LOG_DIR_ENV) or os.path.join(user_data_dir(), "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(
+      os.path.join(log_dir, LOG_FILENAME), maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8"
+    )
+    file_handler.setFormatter(JsonFormatter())
+    handlers.append(file_handler)
+  if console:
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.WARNING)
+    console_handler.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+    handlers.append(console_handler)
+
+  root.setLevel(logging.WARNING if level is None else level)
+  for name, module_level in module_levels.items():
+    logging.getLogger(name).setLevel(module_level)
+
+  # Callers only pay for putting the record on an unbounded queue
+  log_queue = queue.SimpleQueue()
+  root.addHandler(StructuredQueueHandler(log_queue))
+  listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+  listener.start()
+  atexit.register(shutdown_logging)
+  return listener
+
+
+def shutdown_logging():
+  """Flush queued records and stop the writer thread"""
+  global listener, configured
+  configured = False
+  if listener is not None:
+    listener.stop()
+    for handler in listener.handlers:
+      handler.close()
+    listener = None
@@ -0,0 +1,272 @@
+"""
+Incremental, content-addressed backups of a profile.
+
+A snapshot splits the profile into chunks: "settings" (everything except
+history) and one "history/YYYY-MM" chunk per month, covering both the hot
+history in the data file and the sealed archive segments. Each chunk is
+stored once under the SHA-256 of its canonical JSON, so a snapshot only
+writes the chunks that changed since any earlier one. Its manifest lists
+the chunk hashes and is all a restore needs.
+
+  <base>_backups/
+    objects/ab/cdef...        gzip-compressed chunk, named by its hash
+    snapshots/<id>.json       {"id", "created", "chunks": {name: hash}}
+
+Sealed months are only re-read when their segment file changes, so an hourly
+snapshot of a multi-year history hashes the settings and the last couple of
+months and writes a manifest.
+
+  python backup_store.py --data user_data.json list
+  python backup_store.py --data user_data.json snapshot
+  python backup_store.py --data user_data.json restore --at "2025-05-01 12:00"
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+log = logging.getLogger(__name__)
+
+SETTINGS_CHUNK = "settings"
+HISTORY_CHUNK_PREFIX = "history/"
+# Left out of the settings chunk: history is chunked per month, and data_version
+# is bumped on every save so it would make every snapshot look changed
+VOLATILE_KEYS = ("history", "data_version")
+
+# Retention: every snapshot from the last KEEP_ALL_HOURS, then the newest one per day
+KEEP_ALL_HOURS = 48
+
+
+def encode_chunk(value):
+  """Canonical bytes for a chunk, so equal content always hashes the same"""
+  return json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def chunk_hash(raw):
+  return hashlib.sha256(raw).hexdigest()
+
+
+def snapshot_time(snapshot_id):
+  return datetime.strptime(snapshot_id[:15], "%Y%m%dT%H%M%S")
+
+
+class BackupStore:
+  """Snapshots of one profile as manifests over a shared pool of hashed chunks"""
+
+  def __init__(self, directory):
+    self.directory = directory
+    self.objects_dir = os.path.join(directory, "objects")
+    self.snapshots_dir = os.path.join(directory, "snapshots")
+    self.lock = threading.Lock()
+    self.sealed_hashes = {}  # month -> ((mtime_ns, size), hash) of its archive segment
+
+  def object_path(self, digest):
+    return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+  def write_file(self, path, raw, compress=False):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with (gzip.open if compress else open)(temp_path, "wb") as f:
+      f.write(raw)
+    os.replace(temp_path, path)
+
+  def put(self, value):
+    """Store a chunk unless an identical one is already stored. Returns (hash, bytes written)."""
+    raw = encode_chunk(value)
+    digest = chunk_hash(raw)
+    path = self.object_path(digest)
+    if os.path.exists(path):
+      return digest, 0
+    self.write_file(path, raw, compress=True)
+    return digest, len(raw)
+
+  def get(self, digest):
+    """Read a chunk back, checking it against its hash"""
+    with gzip.open(self.object_path(digest), "rb") as f:
+      raw = f.read()
+    if chunk_hash(raw) != digest:
+      raise ValueError(f"Backup chunk {digest} is corrupt")
+    return json.loads(raw)
+
+  def snapshot_ids(self):
+    """Snapshot ids, oldest first"""
+    try:
+      names = os.listdir(self.snapshots_dir)
+    except FileNotFoundError:
+      return []
+    return sorted(name[:-5] for name in names if name.endswith(".json"))
+
+  def manifest(self, snapshot_id):
+    with open(os.path.join(self.snapshots_dir, f"{snapshot_id}.json"), "r") as f:
+      return json.load(f)
+
+  def latest(self):
+    ids = self.snapshot_ids()
+    return self.manifest(ids[-1]) if ids else None
+
+  def find(self, at=None):
+    """Id of the newest snapshot taken at or before `at` (a datetime; None means latest)"""
+    ids = [i for i in self.snapshot_ids() if at is None or snapshot_time(i) <= at]
+    return ids[-1] if ids else None
+
+  def sealed_month_hash(self, archive, month, hot_days):
+    """
+      Hash of a sealed month's chunk, re-reading the segment only when its file changed.
+
+      Late hot entries for a sealed month are merged over the archived ones,
+      the same way queries see them.
+      """
+    if hot_days:
+      days = {**archive.segment(month), **hot_days}
+      return self.put(days)
+
+    stat = os.stat(archive.segment_path(month))
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = self.sealed_hashes.get(month)
+    if cached is not None and cached[0] == key:
+      return cached[1], 0
+    digest, written = self.put(archive.segment(month))
+    self.sealed_hashes[month] = (key, digest)
+    return digest, written
+
+  def snapshot(self, data, archive=None):
+    """
+      Back up a profile (its data dict plus its HistoryArchive, if any).
+
+      Returns the new manifest, or None when nothing changed since the latest
+      snapshot. The caller holds the data file lock so the archive can't be
+      sealed mid-snapshot.
+      """
+    started = time.perf_counter()
+    settings = {key: value for key, value in data.items() if key not in VOLATILE_KEYS}
+    hot_months = {}
+    for day, entry in data.get("history", {}).items():
+      hot_months.setdefault(day[:7], {})[day] = entry
+
+    with self.lock:
+      chunks = {}
+      written = 0
+      chunks[SETTINGS_CHUNK], size = self.put(settings)
+      written += size
+
+      sealed = archive.months() if archive is not None else []
+      for month in sealed:
+        chunks[HISTORY_CHUNK_PREFIX + month], size = self.sealed_month_hash(archive, month, hot_months.get(month))
+        written += size
+      for month, days in sorted(hot_months.items()):
+        if month not in sealed:
+          chunks[HISTORY_CHUNK_PREFIX + month], size = self.put(days)
+          written += size
+
+      previous = self.latest()
+      if previous is not None and previous["chunks"] == chunks:
+        return None
+
+      now = datetime.now()
+      snapshot_id = now.strftime("%Y%m%dT%H%M%S")
+      existing = self.snapshot_ids()
+      if existing and existing[-1][:15] >= snapshot_id:
+        # Same second (or the clock went back): sort after the latest one anyway
+        last = existing[-1]
+        sequence = int(last[16:] or 0) + 1 if len(last) > 15 else 1
+        snapshot_id = f"{last[:15]}-{sequence:03d}"
+
+      manifest = {
+        "id": snapshot_id,
+        "created": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "data_version": data.get("data_version", 0),
+        "bytes_written": written,
+        "chunks": chunks
+      }
+      self.write_file(os.path.join(self.snapshots_dir, f"{snapshot_id}.json"),
+                      json.dumps(manifest, indent=2).encode("utf-8"))
+      self.prune()
+
+    log.info("Backup %s: %d chunks, %d bytes new, %.1f ms",
+             snapshot_id, len(chunks), written, (time.perf_counter() - started) * 1000)
+    return manifest
+
+  def restore(self, snapshot_id=None):
+    """Rebuild a snapshot's profile (latest by default) as one data dict with its full history"""
+    snapshot_id = snapshot_id or self.find()
+    if snapshot_id is None:
+      raise FileNotFoundError("No backups to restore")
+    manifest = self.manifest(snapshot_id)
+    data = self.get(manifest["chunks"][SETTINGS_CHUNK])
+    data["history"] = {}
+    for name, digest in manifest["chunks"].items():
+      if name.startswith(HISTORY_CHUNK_PREFIX):
+        data["history"].update(self.get(digest))
+    return data
+
+  def prune(self, now=None):
+    """Thin out old snapshots and delete chunks no snapshot uses any more. Caller holds the lock."""
+    now = now or datetime.now()
+    keep_all_after = now - timedelta(hours=KEEP_ALL_HOURS)
+    ids = self.snapshot_ids()
+    newest_per_day = {}
+    for snapshot_id in ids:
+      newest_per_day[snapshot_id[:8]] = snapshot_id
+    doomed = [
+      i for i in ids
+      if snapshot_time(i) < keep_all_after and newest_per_day[i[:8]] != i
+    ]
+    if not doomed:
+      return 0
+
+    for snapshot_id in doomed:
+      os.remove(os.path.join(self.snapshots_dir, f"{snapshot_id}.json"))
+    referenced = set()
+    for snapshot_id in self.snapshot_ids():
+      referenced.update(self.manifest(snapshot_id)["chunks"].values())
+    for prefix in os.listdir(self.objects_dir):
+      folder = os.path.join(self.objects_dir, prefix)
+      for name in os.listdir(folder):
+        if prefix + name not in referenced:
+          os.remove(os.path.join(folder, name))
+    self.sealed_hashes = {month: cached for month, cached in self.sealed_hashes.items() if cached[1] in referenced}
+    return len(doomed)
+
+
+def main(argv=None):
+  from app_logging import setup_logging
+  from data_manager import DataManager
+
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--data", default="user_data.json", help="Data file to back up or restore")
+  commands = parser.add_subparsers(dest="command", required=True)
+  commands.add_parser("list", help="List snapshots")
+  commands.add_parser("snapshot", help="Take a snapshot now")
+  restore = commands.add_parser("restore", help="Replace the profile with a snapshot (close the app first)")
+  restore.add_argument("id", nargs="?", help="Snapshot id (default: latest)")
+  restore.add_argument("--at", help="Restore the newest snapshot taken at or before YYYY-MM-DD HH:MM")
+  args = parser.parse_args(argv)
+  setup_logging(console=True)
+
+  manager = DataManager(args.data)
+  if args.command == "list":
+    for snapshot_id in manager.backups.snapshot_ids():
+      manifest = manager.backups.manifest(snapshot_id)
+      print(f"{snapshot_id}  {manifest['created']}  {len(manifest['chunks'])} chunks  "
+            f"{manifest['bytes_written']} bytes new")
+  elif args.command == "snapshot":
+    manifest = manager.backup(manager.load_data())
+    print(f"Created {manifest['id']}" if manifest else "No changes since the last snapshot")
+  else:
+    snapshot_id = args.id
+    if args.at:
+      snapshot_id = manager.backups.find(datetime.strptime(args.at, "%Y-%m-%d %H:%M"))
+      if snapshot_id is None:
+        raise SystemExit(f"No snapshot at or before {args.at}")
+    if not manager.restore_backup(snapshot_id):
+      raise SystemExit("Restore failed")
+    print(f"Restored {snapshot_id or 'latest snapshot'}")
+
+
+if __name__ == "__main__":
+  main()
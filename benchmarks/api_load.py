@@ -0,0 +1,113 @@
+"""
+Load test for the local HTTP API (api_server.py).
+
+Starts the server in-process on a throwaway data file (or targets a running
+one with --url), opens many keep-alive connections and reports requests/sec
+and latency percentiles.
+
+  python benchmarks/api_load.py --clients 300 --requests 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_server import WaterApiServer  # noqa: E402
+from data_manager import DataManager  # noqa: E402
+
+
+def percentile(sorted_values, pct):
+  if not sorted_values:
+    return 0.0
+  index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+  return sorted_values[index]
+
+
+async def run_client(host, port, requests, latencies, errors, write_ratio):
+  reader, writer = await asyncio.open_connection(host, port)
+  try:
+    for n in range(requests):
+      if write_ratio and n % write_ratio == 0:
+        body = json.dumps({"amount": 50}).encode()
+        request = (f"POST /intake HTTP/1.1\r\nHost: {host}\r\n"
+                   f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body
+      else:
+        request = f"GET /status HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+
+      start = time.perf_counter()
+      writer.write(request)
+      await writer.drain()
+
+      status_line = await reader.readline()
+      length = 0
+      while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+          break
+        if line.lower().startswith(b"content-length:"):
+          length = int(line.split(b":", 1)[1])
+      await reader.readexactly(length)
+      latencies.append(time.perf_counter() - start)
+
+      if not status_line.startswith(b"HTTP/1.1 2"):
+        errors.append(status_line.decode(errors="replace").strip())
+  finally:
+    writer.close()
+
+
+async def run(args):
+  server = None
+  if args.url:
+    host, _, port = args.url.replace("http://", "").rstrip("/").partition(":")
+    port = int(port or 80)
+  else:
+    data_file = os.path.join(tempfile.mkdtemp(prefix="water_api_"), "user_data.json")
+    api = WaterApiServer(DataManager(data_file))
+    server = await api.start("127.0.0.1", 0)
+    host, port = server.sockets[0].getsockname()[:2]
+
+  latencies = []
+  errors = []
+  start = time.perf_counter()
+  await asyncio.gather(*[
+    run_client(host, port, args.requests, latencies, errors, args.write_every)
+    for _ in range(args.clients)
+  ])
+  elapsed = time.perf_counter() - start
+
+  if server:
+    server.close()
+    await server.wait_closed()
+
+  latencies.sort()
+  return {
+    "clients": args.clients,
+    "requests": len(latencies),
+    "errors": len(errors),
+    "seconds": round(elapsed, 3),
+    "requests_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0,
+    "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+    "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0
+  }
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--clients", type=int, default=200, help="concurrent keep-alive connections")
+  parser.add_argument("--requests", type=int, default=50, help="requests per connection")
+  parser.add_argument("--write-every", type=int, default=10,
+                      help="every Nth request is POST /intake (0 for read-only)")
+  parser.add_argument("--url", help="target an already running server, e.g. http://127.0.0.1:8765")
+  args = parser.parse_args()
+
+  print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,95 @@
+"""
+Benchmark for the shared ReminderEngine.
+
+Registers many users' daily and interval reminders in one engine, then runs
+the dispatcher and samples CPU time, traced memory and heap size once per
+second to show they stay flat. Interval reminders use short periods so
+plenty of events fire during the run.
+
+  python benchmarks/bench_reminder_engine.py --users 10000 --per-user 10 --seconds 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reminder_engine import Reminder, ReminderEngine  # noqa: E402
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--users", type=int, default=10000)
+  parser.add_argument("--per-user", type=int, default=10, help="reminders per user")
+  parser.add_argument("--seconds", type=int, default=20, help="how long to run the dispatcher")
+  parser.add_argument("--min-interval", type=float, default=5.0, help="shortest interval reminder (seconds)")
+  parser.add_argument("--max-interval", type=float, default=60.0, help="longest interval reminder (seconds)")
+  parser.add_argument("--seed", type=int, default=1)
+  args = parser.parse_args()
+
+  rng = random.Random(args.seed)
+  tracemalloc.start()
+
+  delivered = [0]
+
+  def sink(user_id, reminder_id, planned):
+    delivered[0] += 1
+
+  engine = ReminderEngine(default_sink=sink)
+
+  start = time.perf_counter()
+  for u in range(args.users):
+    user_id = f"user{u}"
+    for r in range(args.per_user):
+      if r % 2 == 0:
+        # Half are interval reminders with sub-minute periods so they actually fire
+        interval = rng.uniform(args.min_interval, args.max_interval)
+        engine.add(Reminder(user_id, f"interval_{r}", interval=interval))
+      else:
+        engine.add_daily(user_id, rng.randrange(24), rng.randrange(60), f"daily_{r}")
+  setup_seconds = time.perf_counter() - start
+
+  engine.start()
+  samples = []
+  cpu_start = time.process_time()
+  last_cpu = cpu_start
+  for second in range(args.seconds):
+    time.sleep(1)
+    cpu = time.process_time()
+    current, _ = tracemalloc.get_traced_memory()
+    stats = engine.stats()
+    samples.append({
+      "second": second + 1,
+      "cpu_seconds": round(cpu - last_cpu, 4),
+      "traced_mb": round(current / 1e6, 2),
+      "heap_size": stats["heap_size"],
+      "fired": stats["fired"]
+    })
+    last_cpu = cpu
+  engine.stop()
+
+  cpu_per_second = [s["cpu_seconds"] for s in samples]
+  memory = [s["traced_mb"] for s in samples]
+  result = {
+    "users": args.users,
+    "reminders": args.users * args.per_user,
+    "setup_seconds": round(setup_seconds, 3),
+    "delivered": delivered[0],
+    "cpu_seconds_per_second": {
+      "min": min(cpu_per_second),
+      "max": max(cpu_per_second),
+      "mean": round(sum(cpu_per_second) / len(cpu_per_second), 4)
+    },
+    "traced_mb": {"first": memory[0], "last": memory[-1], "max": max(memory)},
+    "max_lateness_seconds": engine.stats()["max_lateness"],
+    "samples": samples
+  }
+  print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,77 @@
+"""
+Benchmark for the parallel fleet report.
+
+Writes --profiles synthetic profile files, then builds the report with
+1, 2, 4 ... up to --max-workers processes and prints files/sec for each so
+scaling with cores is visible.
+
+  python benchmarks/fleet.py --profiles 50000 --history-days 60
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.append(BENCH_DIR)  # After the app, so a script never shadows an app module
+
+from fleet_report import build_report  # noqa: E402
+from synthetic import make_profile, write_profile  # noqa: E402
+
+
+def write_profiles(workdir, first, count, history_days):
+  for i in range(first, first + count):
+    write_profile(os.path.join(workdir, f"user{i}.json"),
+                  make_profile(history_days=history_days, seed=i, username=f"user{i}"))
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--profiles", type=int, default=50000)
+  parser.add_argument("--history-days", type=int, default=60)
+  parser.add_argument("--days", type=int, default=30, help="report window")
+  parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+  args = parser.parse_args()
+
+  workdir = tempfile.mkdtemp(prefix="water_fleet_")
+  try:
+    # Generating the data set is itself parallel so the benchmark stays quick
+    step = 1000
+    starts = list(range(0, args.profiles, step))
+    with ProcessPoolExecutor() as pool:
+      list(pool.map(write_profiles, [workdir] * len(starts), starts,
+                    [min(step, args.profiles - i) for i in starts], [args.history_days] * len(starts)))
+
+    worker_counts = []
+    workers = 1
+    while workers < args.max_workers:
+      worker_counts.append(workers)
+      workers *= 2
+    worker_counts.append(args.max_workers)
+
+    runs = []
+    report = None
+    for workers in worker_counts:
+      report = build_report(workdir, args.days, workers=workers)
+      runs.append({"workers": workers, "seconds": report["seconds"], "files_per_sec": report["files_per_sec"]})
+      print(f"{workers:>3} workers: {report['files_per_sec']:>10.1f} files/sec", file=sys.stderr)
+  finally:
+    shutil.rmtree(workdir, ignore_errors=True)
+
+  print(json.dumps({
+    "profiles": args.profiles,
+    "history_days": args.history_days,
+    "report_days": args.days,
+    "errors": report["errors"],
+    "dehydrated": report["dehydrated"],
+    "speedup": round(runs[-1]["files_per_sec"] / runs[0]["files_per_sec"], 2),
+    "runs": runs
+  }, indent=2))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,82 @@
+"""
+Measures the cost of the instrumentation hooks in metrics.py.
+
+Compares an empty loop against metrics.timer()/incr()/observe() with metrics
+disabled and enabled, and times DataManager.save_data both ways.
+
+  python benchmarks/metrics_overhead.py --iterations 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics  # noqa: E402
+from data_manager import DataManager  # noqa: E402
+
+
+def per_call_ns(func, iterations):
+  start = time.perf_counter()
+  func(iterations)
+  return (time.perf_counter() - start) / iterations * 1e9
+
+
+def empty_loop(n):
+  for _ in range(n):
+    pass
+
+
+def timer_loop(n):
+  for _ in range(n):
+    with metrics.timer("bench_ms"):
+      pass
+
+
+def counter_loop(n):
+  for _ in range(n):
+    metrics.incr("bench.count")
+
+
+def guarded_observe_loop(n):
+  for _ in range(n):
+    if metrics.enabled:
+      metrics.observe("bench.drift_ms", 1.0)
+
+
+def save_data_ms(iterations):
+  manager = DataManager(os.path.join(tempfile.mkdtemp(prefix="water_metrics_"), "user_data.json"))
+  data = manager.load_data()
+  start = time.perf_counter()
+  for _ in range(iterations):
+    manager.save_data(data)
+  return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--iterations", type=int, default=1000000)
+  parser.add_argument("--save-iterations", type=int, default=500)
+  args = parser.parse_args()
+
+  results = {"empty_loop_ns": round(per_call_ns(empty_loop, args.iterations), 1)}
+  for state in (False, True):
+    metrics.enable(state)
+    metrics.reset()
+    label = "enabled" if state else "disabled"
+    results[label] = {
+      "timer_ns": round(per_call_ns(timer_loop, args.iterations), 1),
+      "incr_ns": round(per_call_ns(counter_loop, args.iterations), 1),
+      "guarded_observe_ns": round(per_call_ns(guarded_observe_loop, args.iterations), 1),
+      "save_data_ms": round(save_data_ms(args.save_iterations), 4)
+    }
+  metrics.enable(False)
+
+  print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,88 @@
+"""
+Benchmark for batch intake-target calculation and profile retargeting.
+
+Times calculate_water_intake_batch on --users synthetic users (NumPy when
+installed, pure Python otherwise) against a loop over calculate_water_intake,
+then runs retarget_profiles over a directory of --profiles profile files.
+
+  python benchmarks/retarget.py --users 1000000 --profiles 20000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.append(BENCH_DIR)  # After the app, so a script never shadows an app module
+
+import water_calculator  # noqa: E402
+from profile_manager import retarget_profiles  # noqa: E402
+from synthetic import make_profile, write_profile  # noqa: E402
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--users", type=int, default=1000000, help="users for the in-memory batch calculation")
+  parser.add_argument("--profiles", type=int, default=10000, help="profile files for the retarget pass")
+  parser.add_argument("--history-days", type=int, default=30)
+  parser.add_argument("--seed", type=int, default=1)
+  args = parser.parse_args()
+
+  rng = random.Random(args.seed)
+  weights = [rng.uniform(40, 140) for _ in range(args.users)]
+  units = [rng.choice(water_calculator.WEIGHT_UNITS) for _ in range(args.users)]
+  levels = [rng.choice(water_calculator.ACTIVITY_LEVELS) for _ in range(args.users)]
+
+  start = time.perf_counter()
+  unit_codes = water_calculator.encode_weight_units(units)
+  activity_codes = water_calculator.encode_activity_levels(levels)
+  encode_seconds = time.perf_counter() - start
+
+  start = time.perf_counter()
+  batch = water_calculator.calculate_water_intake_batch(weights, unit_codes, activity_codes)
+  batch_seconds = time.perf_counter() - start
+
+  start = time.perf_counter()
+  scalar = [water_calculator.calculate_water_intake(w, u, a) for w, u, a in zip(weights, units, levels)]
+  scalar_seconds = time.perf_counter() - start
+
+  mismatches = sum(1 for a, b in zip(batch, scalar) if int(a) != b)
+
+  workdir = tempfile.mkdtemp(prefix="water_retarget_")
+  try:
+    for i in range(args.profiles):
+      profile = make_profile(history_days=args.history_days, seed=i, username=f"user{i}")
+      profile["daily_target"] = 0  # Force every profile to be rewritten
+      write_profile(os.path.join(workdir, f"user{i}.json"), profile)
+
+    start = time.perf_counter()
+    scanned, updated, errors = retarget_profiles(workdir)
+    retarget_seconds = time.perf_counter() - start
+  finally:
+    shutil.rmtree(workdir, ignore_errors=True)
+
+  print(json.dumps({
+    "numpy": water_calculator.HAS_NUMPY,
+    "users": args.users,
+    "encode_seconds": round(encode_seconds, 3),
+    "batch_seconds": round(batch_seconds, 3),
+    "scalar_loop_seconds": round(scalar_seconds, 3),
+    "batch_users_per_sec": round(args.users / batch_seconds) if batch_seconds else None,
+    "batch_scalar_mismatches": mismatches,
+    "retarget": {
+      "profiles": scanned,
+      "updated": updated,
+      "errors": errors,
+      "seconds": round(retarget_seconds, 3),
+      "profiles_per_sec": round(scanned / retarget_seconds) if retarget_seconds else None
+    }
+  }, indent=2))
+
+
+if __name__ == "__main__":
+  main()
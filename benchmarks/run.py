@@ -0,0 +1,201 @@
+"""
+Benchmark suite for the persistence, scheduling and notification paths.
+
+Runs headless: pygame uses the dummy SDL audio driver and desktop
+notifications go to a stub notifier, so no audio device or desktop session
+is needed.
+
+  python benchmarks/run.py --output results.json
+  python benchmarks/run.py --baseline results.json          # compare, exit 1 on regression
+  python benchmarks/run.py --full --filter data_manager     # include 20-year / 100k-reminder cases
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# Must be set before pygame is imported anywhere
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.append(BENCH_DIR)  # After the app, so a script never shadows an app module
+
+from data_manager import DataManager  # noqa: E402
+from reminder_scheduler import ReminderScheduler  # noqa: E402
+from synthetic import make_profile, make_reminders, write_profile  # noqa: E402
+
+HISTORY_SIZES = {"1d": 1, "1y": 365, "5y": 5 * 365}
+FULL_HISTORY_SIZES = {"20y": 20 * 365}
+REMINDER_COUNTS = [0, 100, 1000, 10000]
+FULL_REMINDER_COUNTS = [100000]
+
+
+class StubNotifier:
+  """Stands in for plyer.notification and just counts calls"""
+
+  def __init__(self):
+    self.calls = 0
+
+  def notify(self, **kwargs):
+    self.calls += 1
+
+
+def measure(func, repeat, setup=None):
+  """Run func `repeat` times and return timing statistics in milliseconds"""
+  timings = []
+  for _ in range(repeat):
+    state = setup() if setup else None
+    start = time.perf_counter()
+    func(state) if setup else func()
+    timings.append((time.perf_counter() - start) * 1000)
+  return {
+    "runs": repeat,
+    "min_ms": round(min(timings), 4),
+    "median_ms": round(statistics.median(timings), 4),
+    "max_ms": round(max(timings), 4)
+  }
+
+
+def data_manager_cases(workdir, full):
+  sizes = dict(HISTORY_SIZES, **(FULL_HISTORY_SIZES if full else {}))
+  for label, days in sizes.items():
+    path = os.path.join(workdir, f"profile_{label}.json")
+    write_profile(path, make_profile(history_days=days, seed=days))
+    manager = DataManager(path)
+    data = manager.load_data()
+    repeat = 20 if days < 3650 else 5
+    csv_path = os.path.join(workdir, f"export_{label}.csv")
+
+    # Bind through defaults: the cases are collected before any of them run
+    yield f"data_manager.load_data[{label}]", lambda manager=manager: manager.load_data(), repeat
+    yield f"data_manager.save_data[{label}]", lambda manager=manager, data=data: manager.save_data(data), repeat
+    yield (f"data_manager.get_weekly_stats[{label}]",
+           lambda manager=manager, data=data: manager.get_weekly_stats(data), repeat)
+    yield (f"data_manager.is_dehydrated[{label}]",
+           lambda manager=manager, data=data: manager.is_dehydrated(data), repeat)
+    yield (f"data_manager.export_history_to_csv[{label}]",
+           lambda manager=manager, data=data, csv_path=csv_path: manager.export_history_to_csv(data, csv_path), repeat)
+
+
+def reminder_cases(full):
+  counts = REMINDER_COUNTS + (FULL_REMINDER_COUNTS if full else [])
+  for count in counts:
+    reminders = make_reminders(count)
+    repeat = 5 if count >= 10000 else 20
+
+    def load(reminders=reminders):
+      ReminderScheduler(None).load_reminders(reminders)
+
+    def add(reminders=reminders):
+      scheduler = ReminderScheduler(None)
+      scheduler.load_reminders(reminders)
+      return scheduler
+
+    yield f"reminder_scheduler.load_reminders[{count}]", load, repeat, None
+    # Only time the single add, not building the scheduler it is added to
+    yield (f"reminder_scheduler.add_reminder[{count}]",
+           lambda scheduler: scheduler.add_reminder(23, 59, "bench"), repeat, add)
+
+
+def notification_cases():
+  try:
+    import notification_manager
+  except ImportError as e:
+    yield "notification_manager", None, 0, f"skipped: {e}"
+    return
+
+  notification_manager.notification = StubNotifier()
+  manager = notification_manager.NotificationManager()
+  if not manager.sounds:
+    yield "notification_manager.play_sound", None, 0, "skipped: no sounds loaded"
+    return
+
+  yield "notification_manager.play_sound[water_drop]", lambda: manager.play_sound("water_drop"), 50, None
+  yield ("notification_manager.send_notification[stub]",
+         lambda: manager.send_notification("Bench", "Benchmark", sound=None), 50, None)
+
+
+def run_suite(args):
+  workdir = tempfile.mkdtemp(prefix="water_bench_")
+  results = {}
+  skipped = {}
+  try:
+    cases = [(name, func, repeat, None) for name, func, repeat in data_manager_cases(workdir, args.full)]
+    cases += list(reminder_cases(args.full))
+    cases += list(notification_cases())
+
+    for name, func, repeat, extra in cases:
+      if args.filter and args.filter not in name:
+        continue
+      if func is None:
+        skipped[name] = extra
+        continue
+      setup = extra if callable(extra) else None
+      results[name] = measure(func, repeat, setup)
+      print(f"{name:<58} {results[name]['median_ms']:>10.3f} ms", file=sys.stderr)
+  finally:
+    shutil.rmtree(workdir, ignore_errors=True)
+
+  return {
+    "meta": {
+      "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+      "python": platform.python_version(),
+      "platform": platform.platform(),
+      "full": args.full
+    },
+    "results": results,
+    "skipped": skipped
+  }
+
+
+def compare(current, baseline, threshold):
+  """Print a comparison table and return the names of regressed cases"""
+  regressions = []
+  print(f"{'case':<58} {'baseline':>10} {'current':>10} {'ratio':>7}")
+  for name, result in sorted(current["results"].items()):
+    base = baseline.get("results", {}).get(name)
+    if not base:
+      print(f"{name:<58} {'-':>10} {result['median_ms']:>10.3f} {'new':>7}")
+      continue
+    ratio = result["median_ms"] / base["median_ms"] if base["median_ms"] else 1.0
+    flag = ""
+    if ratio > threshold:
+      flag = "  REGRESSION"
+      regressions.append(name)
+    print(f"{name:<58} {base['median_ms']:>10.3f} {result['median_ms']:>10.3f} {ratio:>7.2f}{flag}")
+  return regressions
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--output", help="write results JSON to this file")
+  parser.add_argument("--baseline", help="compare against a stored results JSON")
+  parser.add_argument("--threshold", type=float, default=1.25,
+                      help="median slowdown ratio that counts as a regression")
+  parser.add_argument("--filter", help="only run cases whose name contains this text")
+  parser.add_argument("--full", action="store_true", help="include 20-year history and 100k reminder cases")
+  args = parser.parse_args()
+
+  current = run_suite(args)
+
+  if args.output:
+    with open(args.output, "w") as f:
+      json.dump(current, f, indent=2)
+  elif not args.baseline:
+    print(json.dumps(current, indent=2))
+
+  if args.baseline:
+    with open(args.baseline, "r") as f:
+      baseline = json.load(f)
+    if compare(current, baseline, args.threshold):
+      sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
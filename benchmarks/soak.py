@@ -0,0 +1,405 @@
+"""
+Soak test: run the real app headlessly through months of simulated use and
+fail if memory, objects, threads or file descriptors keep growing.
+
+Time is simulated. time.time()/time.sleep() and the modules' datetime.now()
+follow a clock the harness advances one step at a time, so the interval
+and custom reminders (one ReminderEngine) and the midnight rollover all run on
+simulated time. Tk after() timers are taken over too: the periodic jobs
+(backup, sync, pace refresh) run when their simulated due time passes, and
+the data file watcher is polled at its own backoff interval. Sync goes to a
+temporary folder unless --no-sync is given. At each step the harness may
+click an add-water button, then pumps Tk events. The Tk root stays
+withdrawn, the tray and message boxes are stubbed unless --with-tray is
+given, pygame uses the dummy SDL audio driver and notifications go to a
+stub. The run fails if a periodic job never ran.
+
+Every --sample-hours the harness records RSS, traced heap, gc object count,
+thread count and open file descriptors. Growth is measured against the first
+sample after a one-day warm-up. The report lists the allocation sites that
+grew the most (tracemalloc, by line).
+
+  python benchmarks/soak.py --days 90 --output soak.json
+  xvfb-run python benchmarks/soak.py --days 365 --with-tray
+"""
+import argparse
+import gc
+import heapq
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+# Must be set before pygame is imported anywhere
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+STEP_SECONDS = 60
+MB = 1024 * 1024
+
+
+class SimulatedClock:
+  """Wall clock that only moves when the harness advances it"""
+
+  def __init__(self, start):
+    self.now = start
+    self.condition = threading.Condition()
+    self.stopped = False
+    self.real_sleep = time.sleep
+
+  def time(self):
+    return self.now
+
+  def sleep(self, seconds):
+    """Block the calling thread until `seconds` of simulated time have passed"""
+    with self.condition:
+      wake_at = self.now + max(0.0, seconds)
+      while self.now < wake_at and not self.stopped:
+        self.condition.wait(0.05)
+
+  def advance(self, seconds):
+    with self.condition:
+      self.now += seconds
+      self.condition.notify_all()
+    # Let woken threads run before the next step
+    self.real_sleep(0.001)
+
+  def stop(self):
+    with self.condition:
+      self.stopped = True
+      self.condition.notify_all()
+
+  def datetime_class(self):
+    clock = self
+
+    class SimulatedDatetime(datetime):
+      @classmethod
+      def now(cls, tz=None):
+        return cls.fromtimestamp(clock.now, tz)
+
+    return SimulatedDatetime
+
+
+class SimulatedTimers:
+  """Tk after()/after_idle()/after_cancel() replacement whose callbacks run on the simulated clock"""
+
+  def __init__(self, clock):
+    self.clock = clock
+    self.heap = []  # [due, sequence, timer_id, callback, args]
+    self.cancelled = set()
+    self.sequence = 0
+    self.lock = threading.Lock()
+    self.runs = {}  # callback name -> calls
+
+  def install(self, root):
+    root.after = self.after
+    root.after_idle = self.after_idle
+    root.after_cancel = self.after_cancel
+
+  def after(self, ms, func=None, *args):
+    if func is None:
+      self.clock.sleep(ms / 1000)
+      return None
+    with self.lock:
+      self.sequence += 1
+      timer_id = f"sim#{self.sequence}"
+      heapq.heappush(self.heap, [self.clock.now + ms / 1000, self.sequence, timer_id, func, args])
+    return timer_id
+
+  def after_idle(self, func, *args):
+    return self.after(0, func, *args)
+
+  def after_cancel(self, timer_id):
+    with self.lock:
+      self.cancelled.add(timer_id)
+
+  def run_due(self):
+    """Run every callback due by now, including ones scheduled while running"""
+    while True:
+      with self.lock:
+        if not self.heap or self.heap[0][0] > self.clock.now:
+          return
+        _, _, timer_id, func, args = heapq.heappop(self.heap)
+        if timer_id in self.cancelled:
+          self.cancelled.discard(timer_id)
+          continue
+      name = getattr(func, "__name__", repr(func))
+      self.runs[name] = self.runs.get(name, 0) + 1
+      func(*args)
+
+
+class StubNotifier:
+  """Stands in for plyer.notification and just counts calls"""
+
+  def __init__(self):
+    self.calls = 0
+
+  def notify(self, **kwargs):
+    self.calls += 1
+
+
+class StubMessageBox:
+  """Non-blocking replacement for tkinter.messagebox"""
+
+  def __init__(self):
+    self.calls = 0
+
+  def __getattr__(self, name):
+    def show(*args, **kwargs):
+      self.calls += 1
+      return True
+    return show
+
+
+class HeadlessTray:
+  """What the app calls on SystemTray, without a tray icon"""
+
+  def __init__(self, root, app, icon_path):
+    self.updates = 0
+
+  def update_progress(self, *args):
+    self.updates += 1
+
+  def set_quick_add_amounts(self, amounts):
+    pass
+
+  def show_window(self):
+    pass
+
+
+def install_clock(clock):
+  """Route the app's time and datetime lookups through the simulated clock"""
+  time.time = clock.time
+  time.sleep = clock.sleep
+  simulated = clock.datetime_class()
+  for name in ("main", "data_manager", "reminder_scheduler"):
+    module = sys.modules.get(name)
+    if module is not None and getattr(module, "datetime", None) is datetime:
+      module.datetime = simulated
+
+  import day_rollover
+  day_rollover.clock.refresh()
+
+
+def rss_bytes():
+  try:
+    with open("/proc/self/statm") as f:
+      return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+  except (OSError, ValueError, AttributeError):
+    pass
+  try:
+    import psutil
+    return psutil.Process().memory_info().rss
+  except ImportError:
+    return None
+
+
+def open_fds():
+  try:
+    return len(os.listdir("/proc/self/fd"))
+  except OSError:
+    pass
+  try:
+    import psutil
+    process = psutil.Process()
+    return process.num_handles() if hasattr(process, "num_handles") else process.num_fds()
+  except ImportError:
+    return None
+
+
+def take_sample(clock, day):
+  gc.collect()
+  current, _ = tracemalloc.get_traced_memory()
+  rss = rss_bytes()
+  return {
+    "day": round(day, 2),
+    "simulated": datetime.fromtimestamp(clock.now).strftime("%Y-%m-%d %H:%M"),
+    "rss_mb": round(rss / MB, 2) if rss is not None else None,
+    "heap_mb": round(current / MB, 3),
+    "objects": len(gc.get_objects()),
+    "threads": threading.active_count(),
+    "fds": open_fds()
+  }
+
+
+def growth_failures(baseline, final, args):
+  failures = []
+  if baseline["rss_mb"] is not None and final["rss_mb"] - baseline["rss_mb"] > args.max_rss_growth_mb:
+    failures.append(f"RSS grew {final['rss_mb'] - baseline['rss_mb']:.1f} MB")
+  if final["heap_mb"] - baseline["heap_mb"] > args.max_heap_growth_mb:
+    failures.append(f"traced heap grew {final['heap_mb'] - baseline['heap_mb']:.2f} MB")
+  if final["objects"] > baseline["objects"] * (1 + args.max_object_growth):
+    failures.append(f"object count grew {baseline['objects']} -> {final['objects']}")
+  if final["threads"] > baseline["threads"]:
+    failures.append(f"thread count grew {baseline['threads']} -> {final['threads']}")
+  if baseline["fds"] is not None and final["fds"] - baseline["fds"] > args.max_fd_growth:
+    failures.append(f"open file descriptors grew {baseline['fds']} -> {final['fds']}")
+  return failures
+
+
+def top_growth(before, after, limit):
+  stats = after.compare_to(before, "lineno")
+  return [
+    {"site": str(stat.traceback[0]), "size_diff_kb": round(stat.size_diff / 1024, 1), "count_diff": stat.count_diff}
+    for stat in stats[:limit] if stat.size_diff > 0
+  ]
+
+
+def periodic_jobs(args):
+  """App methods that re-arm themselves with root.after and must keep running"""
+  jobs = ["backup_data", "refresh_pace"]
+  if not args.no_sync:
+    jobs.append("sync_history")
+  return jobs
+
+
+def run_soak(args):
+  rng = random.Random(args.seed)
+  clock = SimulatedClock(time.time())
+
+  import tkinter as tk
+  import main
+  import notification_manager
+
+  notification_manager.notification = StubNotifier()
+  main.messagebox = StubMessageBox()
+  if not args.with_tray:
+    main.SystemTray = HeadlessTray
+  install_clock(clock)
+
+  root = tk.Tk()
+  root.withdraw()
+  timers = SimulatedTimers(clock)
+  timers.install(root)
+  app = main.WaterReminderApp(root)
+
+  # Poll the watcher on simulated time instead of its real-time thread
+  app.file_watcher.stop()
+  next_poll = clock.now + app.file_watcher.interval
+  watcher_polls = 0
+
+  if not args.no_sync:
+    sync_dir = os.path.abspath("sync")
+    app.user_data["sync_dir"] = sync_dir
+    app.data_manager.enable_sync(sync_dir)
+    app.sync_history()
+  app.reminder_scheduler.load_reminders([[10, 30, "soak_morning"], [15, 0, "soak_afternoon"]])
+  app.reminder_scheduler.schedule_reminders()
+  if not app.reminder_active:
+    app.toggle_reminder()
+
+  amounts = [100, 200, 250, 300, 500]
+  steps_per_sample = int(args.sample_hours * 3600 / STEP_SECONDS)
+  total_steps = int(args.days * 86400 / STEP_SECONDS)
+  click_chance = args.clicks_per_day / (16 * 3600 / STEP_SECONDS)  # Clicks fall in waking hours
+
+  samples = []
+  baseline = baseline_snapshot = None
+  clicks = rollovers = 0
+  started = time.perf_counter()
+  try:
+    for step in range(1, total_steps + 1):
+      clock.advance(STEP_SECONDS)
+      # The reminder engine waits on real time; wake it to look at the new simulated time
+      with app.reminder_scheduler.engine.condition:
+        app.reminder_scheduler.engine.condition.notify()
+      if app.rollover.check():
+        rollovers += 1
+      timers.run_due()
+      if clock.now >= next_poll:
+        app.file_watcher.poll()
+        watcher_polls += 1
+        next_poll = clock.now + app.file_watcher.interval
+      hour = datetime.fromtimestamp(clock.now).hour
+      if 7 <= hour < 23 and rng.random() < click_chance:
+        app.add_water(rng.choice(amounts))
+        clicks += 1
+      root.update()
+
+      if step % steps_per_sample == 0:
+        sample = take_sample(clock, step * STEP_SECONDS / 86400)
+        samples.append(sample)
+        if baseline is None and sample["day"] >= 1:
+          # Warm-up over: sounds loaded, caches and threads settled
+          baseline = sample
+          baseline_snapshot = tracemalloc.take_snapshot()
+        print(f"day {sample['day']:>7.1f}  rss {sample['rss_mb']} MB  heap {sample['heap_mb']} MB  "
+              f"objects {sample['objects']}  threads {sample['threads']}  fds {sample['fds']}", file=sys.stderr)
+  finally:
+    app.reminder_active = False
+    app.reminder_scheduler.stop_interval()
+    app.reminder_scheduler.stop_reminders()
+    app.rollover.stop()
+    app.file_watcher.stop()
+    app.events.close(wait=False)
+    clock.stop()
+    final_snapshot = tracemalloc.take_snapshot()
+    root.destroy()
+
+  final = samples[-1] if samples else take_sample(clock, args.days)
+  baseline = baseline or (samples[0] if samples else final)
+  failures = growth_failures(baseline, final, args)
+  jobs = {name: timers.runs.get(name, 0) for name in periodic_jobs(args)}
+  jobs["watcher_polls"] = watcher_polls
+  failures += [f"{name} never ran" for name, runs in jobs.items() if not runs]
+  return {
+    "simulated_days": args.days,
+    "real_seconds": round(time.perf_counter() - started, 1),
+    "clicks": clicks,
+    "rollovers": rollovers,
+    "notifications": notification_manager.notification.calls,
+    "jobs": jobs,
+    "baseline": baseline,
+    "final": final,
+    "top_growth": top_growth(baseline_snapshot, final_snapshot, args.top) if baseline_snapshot else [],
+    "samples": samples,
+    "failures": failures,
+    "passed": not failures
+  }
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--days", type=float, default=90, help="simulated days to run")
+  parser.add_argument("--sample-hours", type=float, default=24)
+  parser.add_argument("--clicks-per-day", type=float, default=10)
+  parser.add_argument("--with-tray", action="store_true", help="use the real pystray icon (needs a desktop session)")
+  parser.add_argument("--no-sync", action="store_true", help="don't sync history to a temporary folder")
+  parser.add_argument("--max-rss-growth-mb", type=float, default=25)
+  parser.add_argument("--max-heap-growth-mb", type=float, default=5)
+  parser.add_argument("--max-object-growth", type=float, default=0.10, help="allowed fractional growth")
+  parser.add_argument("--max-fd-growth", type=int, default=4)
+  parser.add_argument("--top", type=int, default=15, help="allocation sites to list")
+  parser.add_argument("--seed", type=int, default=1)
+  parser.add_argument("--output", help="write the report here as well as to stdout")
+  args = parser.parse_args()
+
+  tracemalloc.start()
+  workdir = tempfile.mkdtemp(prefix="water_soak_")
+  cwd = os.getcwd()
+  os.chdir(workdir)  # The app keeps user_data.json in the working directory
+  try:
+    report = run_soak(args)
+  finally:
+    os.chdir(cwd)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+  text = json.dumps(report, indent=2)
+  print(text)
+  if args.output:
+    with open(args.output, "w") as f:
+      f.write(text)
+  if not report["passed"]:
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,90 @@
+"""
+Multi-process stress test for DataManager's locking and merge-on-write.
+
+Several processes share one data file. Each loads it once, then repeatedly
+adds to its in-memory counter and saves, exactly as concurrent app
+instances, API servers or CLIs would. Every increment must survive, so the
+final current_intake must equal processes * increments * amount.
+
+  python benchmarks/stress_concurrent_writes.py --processes 8 --increments 200
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_manager import DataManager  # noqa: E402
+
+
+def worker(path, increments, amount, settings_key, start_event):
+  manager = DataManager(path)
+  data = manager.load_data()
+  start_event.wait()
+  for i in range(increments):
+    data["current_intake"] += amount
+    # Each process also owns one setting so non-counter merges are exercised
+    data[settings_key] = i
+    if not manager.save_data(data):
+      raise SystemExit(f"save failed in {settings_key}")
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--processes", type=int, default=8)
+  parser.add_argument("--increments", type=int, default=200)
+  parser.add_argument("--amount", type=int, default=10)
+  args = parser.parse_args()
+
+  workdir = tempfile.mkdtemp(prefix="water_stress_")
+  path = os.path.join(workdir, "user_data.json")
+  try:
+    # Create the file first so every worker starts from the same base
+    manager = DataManager(path)
+    manager.save_data(manager.load_data())
+
+    start_event = multiprocessing.Event()
+    workers = [
+      multiprocessing.Process(target=worker, args=(path, args.increments, args.amount, f"stress_{n}", start_event))
+      for n in range(args.processes)
+    ]
+    for process in workers:
+      process.start()
+
+    start = time.perf_counter()
+    start_event.set()
+    for process in workers:
+      process.join()
+    elapsed = time.perf_counter() - start
+
+    with open(path, "r") as f:
+      final = json.load(f)
+  finally:
+    shutil.rmtree(workdir, ignore_errors=True)
+
+  expected = args.processes * args.increments * args.amount
+  settings_ok = all(final.get(f"stress_{n}") == args.increments - 1 for n in range(args.processes))
+  result = {
+    "processes": args.processes,
+    "saves": args.processes * args.increments,
+    "seconds": round(elapsed, 3),
+    "saves_per_sec": round(args.processes * args.increments / elapsed, 1),
+    "expected_intake": expected,
+    "final_intake": final.get("current_intake"),
+    "lost_increments": (expected - final.get("current_intake", 0)) // args.amount,
+    "settings_preserved": settings_ok,
+    "worker_failures": sum(1 for p in workers if p.exitcode != 0)
+  }
+  print(json.dumps(result, indent=2))
+
+  if result["final_intake"] != expected or not settings_ok or result["worker_failures"]:
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,60 @@
+"""Synthetic user profiles for benchmarks and stress tests."""
+import json
+import random
+from datetime import datetime, timedelta
+
+ACTIVITY_LEVELS = ["sedentary", "light", "moderate", "active", "very active"]
+
+
+def make_history(days, target=2000, rng=None, end=None):
+  """Build `days` consecutive history entries ending yesterday"""
+  rng = rng or random.Random(0)
+  end = end or datetime.now()
+  history = {}
+  for offset in range(days, 0, -1):
+    date = (end - timedelta(days=offset)).strftime("%Y-%m-%d")
+    intake = int(rng.gauss(target * 0.9, target * 0.25)) // 50 * 50
+    intake = max(0, intake)
+    history[date] = {
+      "intake": intake,
+      "target": target,
+      "percentage": round(intake / target * 100, 1)
+    }
+  return history
+
+
+def make_reminders(count, rng=None):
+  """Build `count` custom reminders as [hour, minute, id] lists"""
+  rng = rng or random.Random(0)
+  return [[rng.randrange(24), rng.randrange(60), f"reminder_{i}"] for i in range(count)]
+
+
+def make_profile(history_days=365, reminders=0, seed=0, username="bench-user"):
+  """Build a complete user_data dictionary"""
+  rng = random.Random(seed)
+  now = datetime.now()
+  weight = rng.randrange(45, 120)
+  target = int(weight * 30 * rng.choice([1.0, 1.1, 1.2, 1.3, 1.4])) // 50 * 50
+  return {
+    "weight": weight,
+    "weight_unit": "kg",
+    "activity_level": rng.choice(ACTIVITY_LEVELS),
+    "reminder_interval": rng.choice([30, 45, 60, 90]),
+    "daily_target": target,
+    "current_intake": rng.randrange(0, target, 50),
+    "last_reset_date": now.strftime("%Y-%m-%d"),
+    "reminder_active": False,
+    "sound_enabled": True,
+    "start_minimized": False,
+    "custom_reminders": make_reminders(reminders, rng),
+    "history": make_history(history_days, target, rng, now),
+    "user_info": {
+      "username": username,
+      "last_login": now.strftime("%Y-%m-%d %H:%M:%S")
+    }
+  }
+
+
+def write_profile(path, profile):
+  with open(path, "w") as f:
+    json.dump(profile, f, indent=2)
@@ -1,6 +1,143 @@
+import copy
 import json
+import logging
 import os
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
+
+try:
+  import fcntl
+
+  HAS_FCNTL = True
+except ImportError:
+  import msvcrt
+
+  HAS_FCNTL = False
+
+import metrics
+from analytics import AnalyticsEngine
+from backup_store import BackupStore
+from day_rollover import today_string
+from history_archive import HistoryArchive, cold_cutoff
+from history_index import GRANULARITIES, Bucket, HistoryIndex, bucket_end, bucket_start, to_ordinal
+from history_sync import HistorySync
+from intake_log import IntakeEventStore, check_event
+
+log = logging.getLogger(__name__)
+
+DEFAULT_QUICK_ADD_AMOUNTS = [100, 200, 300, 500]
+
+
+def get_quick_add_amounts(data):
+  """Get the user's quick-add amounts (ml) shared by the dashboard and tray"""
+  amounts = [a for a in data.get("quick_add_amounts", []) if isinstance(a, int) and a > 0]
+  return amounts or list(DEFAULT_QUICK_ADD_AMOUNTS)
+
+
+# Chronic dehydration: at least DEHYDRATED_MIN_DAYS of the last
+# DEHYDRATION_WINDOW days below DEHYDRATION_PERCENT of target
+DEHYDRATION_WINDOW = 3
+DEHYDRATED_MIN_DAYS = 2
+DEHYDRATION_PERCENT = 80
+
+
+def is_dehydrated_pattern(percentages):
+  """Apply the dehydration rule to the most recent days' target percentages"""
+  if len(percentages) < DEHYDRATION_WINDOW:
+    return False
+  below_target_count = sum(1 for p in percentages[-DEHYDRATION_WINDOW:] if p < DEHYDRATION_PERCENT)
+  return below_target_count >= DEHYDRATED_MIN_DAYS
+
+
+# Keys merged as per-day counters rather than whole values
+COUNTER_KEYS = ("history", "current_intake", "last_reset_date", "data_version")
+
+
+def day_counters(data):
+  """Map each date to its intake, with today's running counter taking precedence"""
+  counters = {date: entry.get("intake", 0) for date, entry in data.get("history", {}).items()}
+  if data.get("last_reset_date"):
+    counters[data["last_reset_date"]] = data.get("current_intake", 0)
+  return counters
+
+
+def merge_user_data(base, disk, mine, archive=None):
+  """
+    Three-way merge of user data.
+
+    base is what this process last read or wrote, disk is what another process
+    has written since, mine is our in-memory copy. Intake counters are merged
+    per day (disk + our delta) so concurrent increments are never lost; other
+    settings take our value if we changed it, otherwise the disk value.
+
+    With the profile's HistoryArchive, days before the cold cutoff that are
+    missing from disk count as sealed: they are dropped unless we changed
+    them, in which case our change is added to the archived intake.
+    """
+  merged = {}
+  for key in set(disk) | set(mine):
+    if key in COUNTER_KEYS:
+      continue
+    if key in mine and (key not in base or mine[key] != base[key]):
+      merged[key] = mine[key]
+    elif key in disk:
+      merged[key] = disk[key]
+
+  base_days = day_counters(base)
+  disk_days = day_counters(disk)
+  mine_days = day_counters(mine)
+
+  merged["last_reset_date"] = max(disk.get("last_reset_date", ""), mine.get("last_reset_date", ""))
+  cutoff = cold_cutoff(merged["last_reset_date"]) if archive is not None and merged["last_reset_date"] else None
+  history = {}
+  for date in set(disk_days) | set(mine_days):
+    base_intake = base_days.get(date)
+    disk_intake = disk_days.get(date, 0)
+    if cutoff and date < cutoff:
+      archived = archive.segment(date[:7]).get(date)
+      archived_intake = archived.get("intake", 0) if archived else 0
+      if base_intake is None:
+        # A late entry loaded from the archive started from the archived intake
+        base_intake = archived_intake
+      if date not in disk_days:
+        # Sealed by another process: keep it only to carry our own change over
+        if mine_days.get(date, base_intake) == base_intake:
+          continue
+        disk_intake = archived_intake
+    intake = max(0, disk_intake + mine_days.get(date, 0) - (base_intake or 0))
+    if date == merged["last_reset_date"]:
+      merged["current_intake"] = intake
+
+    # Prefer our entry's target if we touched it, otherwise the one on disk
+    mine_entry = mine.get("history", {}).get(date)
+    base_entry = base.get("history", {}).get(date)
+    disk_entry = disk.get("history", {}).get(date)
+    source = mine_entry if mine_entry is not None and mine_entry != base_entry else (disk_entry or mine_entry)
+    if source is None:
+      continue  # Today's counter with no history entry yet
+    target = source.get("target", merged.get("daily_target", 0))
+    history[date] = {
+      "intake": intake,
+      "target": target,
+      "percentage": round((intake / target) * 100 if target > 0 else 0, 1)
+    }
+
+  merged["history"] = history
+  merged.setdefault("current_intake", 0)
+  return merged
+
+
+# JSON files a profile keeps next to its data file that are not profiles themselves
+SIDECAR_SUFFIXES = ("_sync.json",)
+
+
+def is_profile_file(name):
+  """Whether a file name in a profiles directory is a profile data file"""
+  return name.endswith(".json") and not name.endswith(SIDECAR_SUFFIXES)
+
+
 class DataManager:
   def __init__(self, filename="user_data.json"):
     self.filename = filename
@@ -16,12 +153,17 @@ class DataManager:
       "weight_unit": "kg",
       "activity_level": "moderate",
       "reminder_interval": 60,
+      "wake_time": "08:00",
+      "sleep_time": "22:00",
       "daily_target": 2000,
       "current_intake": 0,
       "last_reset_date": datetime.now().strftime("%Y-%m-%d"),
       "reminder_active": False,
       "sound_enabled": True,
       "start_minimized": False,
+      "quick_add_amounts": list(DEFAULT_QUICK_ADD_AMOUNTS),
+      "last_amount": None,
+      "sync_dir": None,  # Shared folder for multi-device history sync
       "custom_reminders": [],
       "history": {},  # Track daily intake history
       "user_info": {
@@ -30,51 +172,364 @@ class DataManager:
       }
     }
 
+    # Per-drink events live next to the data file and are loaded on first use
+    base, _ = os.path.splitext(self.filename)
+    self.events_filename = f"{base}_events.bin"
+    self.event_store = None
+
+    # Old history is sealed into compressed monthly segments so this file stays small
+    self.archive = HistoryArchive(f"{base}_archive")
+    # Sorted date index over the hot history for range queries
+    self.history_index = HistoryIndex()
+    # Incremental snapshots of settings and history, taken by backup()
+    self.backups = BackupStore(f"{base}_backups")
+    # Streaks, averages and percentiles over completed days, see analytics()
+    self.analytics_engine = AnalyticsEngine(self.archive)
+
+    # Cross-process safety: an advisory lock file, plus what we last read or
+    # wrote so a save can tell whether someone else changed the file meanwhile
+    self.lock_filename = f"{self.filename}.lock"
+    self.thread_lock = threading.RLock()
+    self.lock_depth = 0
+    self.base_text = None
+    self.base_version = 0
+    self.disk_signature = None
+
+    # Multi-device sync, off until enable_sync() is called
+    self.history_sync = None
+
+  @contextmanager
+  def file_lock(self, shared=False):
+    """
+    Hold the advisory lock on the data file (exclusive unless shared=True).
+
+    Re-entrant within a thread, so save_data() can run inside a larger locked
+    operation. Take the exclusive lock first when nesting.
+    """
+    with self.thread_lock:
+      if self.lock_depth:
+        self.lock_depth += 1
+        try:
+          yield
+        finally:
+          self.lock_depth -= 1
+        return
+
+      with open(self.lock_filename, "a+") as lock_file:
+        if HAS_FCNTL:
+          fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+          # msvcrt has no shared locks; LK_LOCK retries for about 10 seconds
+          lock_file.seek(0)
+          msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        self.lock_depth = 1
+        try:
+          yield
+        finally:
+          self.lock_depth = 0
+          if HAS_FCNTL:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+          else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+  def file_signature(self):
+    """Cheap fingerprint of the data file, or None if it doesn't exist"""
+    try:
+      st = os.stat(self.filename)
+    except OSError:
+      return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+  def read_disk(self):
+    """Read the data file's text. Caller holds the file lock."""
+    with open(self.filename, "r") as f:
+      text = f.read()
+    self.disk_signature = self.file_signature()
+    return text
+
+  def has_external_changes(self):
+    """True if the data file changed since this process last read or wrote it (one stat call)"""
+    signature = self.file_signature()
+    return signature is not None and signature != self.disk_signature
+
+  def reload_changes(self, data):
+    """
+    Merge changes another process or tool wrote to the file into data, in place.
+
+    Returns which sections changed: {"settings": [keys], "today": bool, "history": [dates]}.
+    The file is only parsed if its stat fingerprint changed.
+    """
+    changes = {"settings": [], "today": False, "history": []}
+    with self.file_lock(shared=True):
+      if not self.has_external_changes():
+        return changes
+      text = self.read_disk()
+      disk = json.loads(text)
+      base = json.loads(self.base_text) if self.base_text else {}
+      merged = merge_user_data(base, disk, data, self.archive)
+      self.base_text = text
+      self.base_version = disk.get("data_version", 0)
+
+    old_history = data.get("history", {})
+    changes["settings"] = sorted(k for k in merged if k not in COUNTER_KEYS and data.get(k) != merged[k])
+    changes["today"] = (merged["current_intake"] != data.get("current_intake")
+                        or merged["last_reset_date"] != data.get("last_reset_date"))
+    changes["history"] = sorted(d for d, entry in merged["history"].items() if old_history.get(d) != entry)
+
+    data.clear()
+    data.update(merged)
+    data["data_version"] = self.base_version
+    return changes
+
+  def enable_sync(self, sync_dir):
+    """Sync history with other devices through a shared folder"""
+    base, _ = os.path.splitext(self.filename)
+    self.history_sync = HistorySync(f"{base}_sync.json", os.path.expanduser(sync_dir), self.archive)
+
+  def sync_history(self, data):
+    """
+    Save, then exchange history changes with other devices and save the result.
+
+    Returns {"exported": days_sent, "imported": [dates]}, or None if sync is off or failed.
+    """
+    if self.history_sync is None:
+      return None
+    try:
+      with self.file_lock():
+        # Saving first merges other local processes' increments into data
+        if not self.save_data(data):
+          return None
+        result = self.history_sync.sync(data)
+        self.analytics_engine.mark_changed(result["imported"])
+        if result["imported"] and not self.save_data(data):
+          return None
+      metrics.incr("sync.runs")
+      metrics.incr("sync.days_imported", len(result["imported"]))
+      return result
+    except Exception:
+      log.exception("Error syncing history")
+      return None
+
+  def backup(self, data):
+    """
+    Save, then snapshot the profile into the backup store.
+
+    Returns the snapshot manifest, or None if nothing changed or it failed.
+    """
+    try:
+      with self.file_lock():
+        if not self.save_data(data):
+          return None
+        manifest = self.backups.snapshot(data, self.archive)
+      if manifest is not None:
+        metrics.incr("backup.snapshots")
+        metrics.incr("backup.bytes_written", manifest["bytes_written"])
+      return manifest
+    except Exception:
+      log.exception("Error backing up data")
+      return None
+
+  def restore_backup(self, snapshot_id=None):
+    """
+    Replace the data file and history archive with a snapshot (latest by default).
+
+    The current state is snapshotted first, so a restore can be undone.
+    Returns the restored data, or None on failure.
+    """
+    try:
+      with self.file_lock():
+        disk_version = 0
+        if os.path.exists(self.filename):
+          current = json.loads(self.read_disk())
+          disk_version = current.get("data_version", 0)
+          self.backups.snapshot(current, self.archive)
+
+        data = self.backups.restore(snapshot_id)
+        self.archive.clear()
+        self.history_index = HistoryIndex()
+        self.analytics_engine = AnalyticsEngine(self.archive)
+        self.seal_history(data)
+
+        # Newer than anything on disk, so running processes pick it up as a change
+        data["data_version"] = max(disk_version, data.get("data_version", 0)) + 1
+        text = json.dumps(data, indent=2)
+        self.write_atomic(text)
+        self.base_text = text
+        self.base_version = data["data_version"]
+        self.disk_signature = self.file_signature()
+      return data
+    except Exception:
+      log.exception("Error restoring backup")
+      return None
+
+  def get_event_store(self):
+    """Get the per-drink event store, loading it on first use"""
+    if self.event_store is None:
+      self.event_store = IntakeEventStore(self.events_filename)
+    return self.event_store
+
+  def record_intake_event(self, amount, source="other", timestamp=None):
+    """Record when (and from where) a drink was logged"""
+    self.get_event_store().record(amount, source, timestamp)
+
   def load_data(self):
     """Load user data from the JSON file"""
     if os.path.exists(self.filename):
       try:
-        with open(self.filename, "r") as f:
-          data = json.load(f)
+        with self.file_lock(shared=True):
+          text = self.read_disk()
+          start = time.perf_counter()
+          data = json.loads(text)
+          if metrics.enabled:
+            metrics.observe("load_data.parse_ms", (time.perf_counter() - start) * 1000)
+          self.base_text = text
+          self.base_version = data.get("data_version", 0)
 
-          # Update last login time
-          if "user_info" not in data:
-            data["user_info"] = {}
+        # Update last login time
+        if "user_info" not in data:
+          data["user_info"] = {}
 
-          data["user_info"]["last_login"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        data["user_info"]["last_login"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-          # Check if date has changed since last use
-          current_date = datetime.now().strftime("%Y-%m-%d")
-          if current_date != data.get("last_reset_date", ""):
-            # Save yesterday's data to history before resetting
-            self.archive_daily_data(data)
+        # Every process sharing the file tracks changes for sync once it's configured
+        if data.get("sync_dir") and self.history_sync is None:
+          self.enable_sync(data["sync_dir"])
 
-            # Reset daily intake
-            data["current_intake"] = 0
-            data["last_reset_date"] = current_date
+        # Check if date has changed since last use
+        self.check_new_day(data)
 
-          return data
+        return data
       except Exception as e:
-        print(f"Error loading data: {e}")
+        log.error("Error loading data: %s", e)
 
     # Return default data if file doesn't exist or can't be loaded
-    default = self.default_data.copy()
+    # Deep copy so callers never share the nested history/user_info dicts
+    default = copy.deepcopy(self.default_data)
     default["user_info"]["last_login"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     return default
 
   def save_data(self, data):
     """Save user data to the JSON file"""
     try:
-      # Ensure the history is updated
-      data = self.update_history(data)
-
-      with open(self.filename, "w") as f:
-        json.dump(data, f, indent=2)
+      with metrics.timer("save_data_ms"), self.file_lock():
+        # Ensure the history is updated
+        data = self.update_history(data)
+
+        # If another process wrote since our last read or write, merge with its
+        # changes instead of overwriting them
+        signature = self.file_signature()
+        if signature is not None and signature != self.disk_signature:
+          text = self.read_disk()
+          disk = json.loads(text)
+          disk_version = disk.get("data_version", 0)
+          # Compare the text, not just the version: hand edits and other tools
+          # don't bump data_version
+          if text != self.base_text:
+            base = json.loads(self.base_text) if self.base_text else {}
+            merged = merge_user_data(base, disk, data, self.archive)
+            # Update in place: callers keep references to this dict
+            data.clear()
+            data.update(merged)
+            metrics.incr("save_data.merges")
+          self.base_version = disk_version
+
+        self.seal_history(data)
+
+        data["data_version"] = self.base_version + 1
+        text = json.dumps(data, indent=2)
+        self.write_atomic(text)
+
+        self.base_text = text
+        self.base_version = data["data_version"]
+        self.disk_signature = self.file_signature()
+      metrics.incr("save_data.count")
+      metrics.incr("save_data.bytes", len(text))
       return True
-    except Exception as e:
-      print(f"Error saving data: {e}")
+    except Exception:
+      log.exception("Error saving data")
+      return False
+
+  def seal_history(self, data):
+    """Move history older than the hot window into the archive. Caller holds the file lock."""
+    today = data.get("last_reset_date") or today_string()
+    history = data.get("history", {})
+    sealed = self.archive.seal(history, cold_cutoff(today))
+    for day in sealed:
+      self.history_index.remove(history, day)
+    if sealed:
+      metrics.incr("history.days_sealed", len(sealed))
+    return len(sealed)
+
+  def write_atomic(self, text):
+    """Write the data file via a temp file and rename so readers never see a partial file"""
+    temp_path = f"{self.filename}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+      f.write(text)
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(temp_path, self.filename)
+
+  def check_new_day(self, data):
+    """Archive and reset the daily counter if the date has changed. Returns True if it was reset."""
+    current_date = today_string()
+    if current_date == data.get("last_reset_date", ""):
       return False
 
+    self.roll_over(data, current_date)
+    return True
+
+  def roll_over(self, data, current_date):
+    """Archive the finished day and start a new one"""
+    # Save yesterday's data to history before resetting
+    self.archive_daily_data(data)
+
+    # Reset daily intake
+    data["current_intake"] = 0
+    data["last_reset_date"] = current_date
+
+  def apply_intake_events(self, data, events, source="api"):
+    """
+    Apply (datetime, amount) intake events to today's counter or to past history days.
+
+    Raises ValueError, before changing anything, if any event can't be logged.
+    """
+    for timestamp, amount in events:
+      check_event(timestamp, amount)
+    self.check_new_day(data)
+    today = data["last_reset_date"]
+    if "history" not in data:
+      data["history"] = {}
+
+    applied = []
+    past_days = set()
+    for timestamp, amount in events:
+      date = timestamp.date().isoformat()
+      if date == today:
+        data["current_intake"] += amount
+      elif date < today:
+        past_days.add(date)
+        # Late event for a previous day: fold it into that day's history entry,
+        # starting from the archived one if the day was already sealed
+        entry = data["history"].get(date)
+        if entry is None:
+          archived = self.archive.segment(date[:7]).get(date)
+          entry = dict(archived) if archived else {"intake": 0, "target": data["daily_target"]}
+          data["history"][date] = entry
+        self.history_index.insert(data["history"], date)
+        entry["intake"] = entry.get("intake", 0) + amount
+        target = entry.get("target", data["daily_target"])
+        entry["percentage"] = round((entry["intake"] / target) * 100 if target > 0 else 0, 1)
+      else:
+        continue  # Ignore events from the future
+      applied.append((amount, source, timestamp.timestamp()))
+
+    self.get_event_store().record_many(applied)
+    self.analytics_engine.mark_changed(past_days)
+    if self.history_sync is not None:
+      self.history_sync.mark_dirty(sorted(past_days))
+    return len(applied)
+
   def archive_daily_data(self, data):
     """Archive the previous day's data to history"""
     if "last_reset_date" in data and data["last_reset_date"]:
@@ -88,10 +543,12 @@ class DataManager:
         "target": data["daily_target"],
         "percentage": round((data["current_intake"] / data["daily_target"]) * 100 if data["daily_target"] > 0 else 0, 1)
       }
+      self.history_index.insert(data["history"], prev_date)
 
   def update_history(self, data):
     """Update the history with today's intake"""
-    today = datetime.now().strftime("%Y-%m-%d")
+    # The running counter always belongs to the day it was last reset on
+    today = data.get("last_reset_date") or today_string()
     if "history" not in data:
       data["history"] = {}
 
@@ -104,56 +561,126 @@ class DataManager:
       "target": data["daily_target"],
       "percentage": round((data["current_intake"] / data["daily_target"]) * 100 if data["daily_target"] > 0 else 0, 1)
     }
+    self.history_index.insert(data["history"], today)
 
     return data
 
-  def get_weekly_stats(self, data):
-    """Get water intake statistics for the last 7 days"""
-    if "history" not in data:
+  def query(self, data, start=None, end=None, granularity="day"):
+    """
+    Summarize history between start and end (inclusive) per day, week or month.
+
+    start/end are YYYY-MM-DD strings, dates or ordinals; None leaves that side
+    open. Returns one dict per bucket that has data, oldest first, with
+    start, end, days, intake, target, mean, on_target and percentage.
+    Archived months are only opened when the range reaches them, and whole
+    months are answered from the archive manifest when possible.
+    """
+    if granularity not in GRANULARITIES:
+      raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    start = None if start is None else to_ordinal(start)
+    end = None if end is None else to_ordinal(end)
+
+    history = data.get("history", {})
+    self.history_index.ensure(history)
+    default_target = data.get("daily_target", 0)
+    buckets = {}
+
+    def bucket_for(ordinal):
+      key = bucket_start(ordinal, granularity)
+      bucket = buckets.get(key)
+      if bucket is None:
+        bucket = buckets[key] = Bucket(key)
+      return bucket
+
+    for month in self.archive.months():
+      summary = self.archive.summary(month)
+      first, last = to_ordinal(summary["first"]), to_ordinal(summary["last"])
+      if (start is not None and last < start) or (end is not None and first > end):
+        continue
+
+      month_start = bucket_start(first, "month")
+      month_end = bucket_end(month_start, "month")
+      if (granularity == "month" and "target" in summary
+          and (start is None or month_start >= start) and (end is None or month_end <= end)
+          and not self.history_index.range(month_start, month_end)):
+        bucket_for(first).add_summary(summary)
+        continue
+
+      for day, entry in self.archive.segment(month).items():
+        ordinal = to_ordinal(day)
+        if day in history or (start is not None and ordinal < start) or (end is not None and ordinal > end):
+          continue  # The hot copy of a day wins over the archived one
+        bucket_for(ordinal).add(entry, default_target)
+
+    for day in self.history_index.range(start, end):
+      bucket_for(to_ordinal(day)).add(history[day], default_target)
+
+    return [buckets[key].to_dict(granularity) for key in sorted(buckets)]
+
+  def latest_days(self, data, count):
+    """Daily summaries for the `count` most recent days with data, oldest first"""
+    history = data.get("history", {})
+    self.history_index.ensure(history)
+    recent = self.history_index.latest(count)
+    if len(recent) == count:
+      # Anything archived is older than these, bar late entries the query picks up too
+      return self.query(data, recent[0])[-count:]
+
+    # Not enough hot days: reach back through the archive's newest months
+    needed = count - len(recent)
+    start = recent[0] if recent else None
+    for month in reversed(self.archive.months()):
+      summary = self.archive.summary(month)
+      start = summary["first"]
+      needed -= summary["days"]
+      if needed <= 0:
+        break
+    if start is None:
       return []
+    return self.query(data, start)[-count:]
 
-    # Sort history by date (most recent first)
-    sorted_dates = sorted(data["history"].keys(), reverse=True)
-
-    # Get last 7 days with data
-    recent_days = sorted_dates[:7]
+  def analytics(self, data):
+    """The analytics engine, brought up to date with data's completed days"""
+    self.analytics_engine.sync(
+      data.get("history", {}), data.get("daily_target", 0), data.get("last_reset_date") or today_string()
+    )
+    return self.analytics_engine
 
-    stats = []
-    for date in sorted(recent_days):  # Sort chronologically for display
-      if date in data["history"]:
-        entry = data["history"][date]
-        stats.append({
-          "date": date,
-          "intake": entry.get("intake", 0),
-          "target": entry.get("target", data["daily_target"]),
-          "percentage": entry.get("percentage", 0)
-        })
+  def stats_summary(self, data):
+    """Streaks, moving averages, weekday profile, percentiles and trend, counting today's progress"""
+    target = data.get("daily_target", 0)
+    return self.analytics(data).summary(today_on_target=target > 0 and data.get("current_intake", 0) >= target)
 
-    return stats
+  def get_weekly_stats(self, data):
+    """Get water intake statistics for the last 7 days"""
+    return [
+      {"date": day["start"], "intake": day["intake"], "target": day["target"], "percentage": day["percentage"]}
+      for day in self.latest_days(data, 7)
+    ]
 
   def export_history_to_csv(self, data, filename="water_history.csv"):
     """Export drinking history to a CSV file"""
     try:
-      if "history" not in data or not data["history"]:
+      days = self.query(data)
+      if not days:
         return False, "No history data to export"
 
+      analytics = self.analytics(data)
       import csv
       with open(filename, 'w', newline='') as csvfile:
         writer = csv.writer(csvfile)
         # Write header
-        writer.writerow(['Date', 'Water Intake (ml)', 'Daily Target (ml)', 'Percentage'])
-
-        # Sort dates
-        sorted_dates = sorted(data["history"].keys())
+        writer.writerow(['Date', 'Water Intake (ml)', 'Daily Target (ml)', 'Percentage', '7-Day Average (ml)'])
 
         # Write data
-        for date in sorted_dates:
-          entry = data["history"][date]
+        for day in days:
+          average = analytics.average_on(day["start"])
           writer.writerow([
-            date,
-            entry.get("intake", 0),
-            entry.get("target", 0),
-            entry.get("percentage", 0)
+            day["start"],
+            day["intake"],
+            day["target"],
+            day["percentage"],
+            "" if average is None else average
           ])
 
       return True, f"History exported to {filename}"
@@ -162,18 +689,5 @@ class DataManager:
 
   def is_dehydrated(self, data):
     """Check if user is chronically below water targets"""
-    if "history" not in data or len(data["history"]) < 3:
-      return False
-
-    # Check the last 3 days
-    sorted_dates = sorted(data["history"].keys(), reverse=True)
-    recent_days = sorted_dates[:3]
-
-    below_target_count = 0
-    for date in recent_days:
-      entry = data["history"][date]
-      if entry.get("percentage", 0) < 80:  # Below 80% of target
-        below_target_count += 1
-
-    # If 2 or more days were below 80% of target
-    return below_target_count >= 2
\ No newline at end of file
+    recent_days = self.latest_days(data, DEHYDRATION_WINDOW)
+    return is_dehydrated_pattern([day["percentage"] for day in recent_days])
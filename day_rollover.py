@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, time as dt_time
+
+log = logging.getLogger(__name__)
+
+# Cached dates are re-derived at least this often so timezone or clock
+# changes are noticed even when midnight is hours away.
+RECHECK_SECONDS = 900
+
+
+def next_local_midnight(day):
+  """Get the epoch time of the local midnight that starts the day after `day`"""
+  # A naive local datetime's timestamp() goes through mktime, so DST is accounted for
+  return datetime.combine(day + timedelta(days=1), dt_time.min).timestamp()
+
+
+class DayClock:
+  """Caches today's date so hot paths compare against a float instead of formatting dates"""
+
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.refresh()
+
+  def refresh(self):
+    """Re-derive today's date and the time it stays valid until"""
+    with self.lock:
+      now = time.time()
+      day = datetime.fromtimestamp(now).date()
+      self.ordinal = day.toordinal()
+      self.date_string = day.strftime("%Y-%m-%d")
+      self.next_midnight = next_local_midnight(day)
+      self.valid_until = min(self.next_midnight, now + RECHECK_SECONDS)
+
+  def today(self):
+    """Get today's date as a YYYY-MM-DD string"""
+    if time.time() >= self.valid_until:
+      self.refresh()
+    return self.date_string
+
+  def today_ordinal(self):
+    """Get today's date as a proleptic Gregorian ordinal"""
+    if time.time() >= self.valid_until:
+      self.refresh()
+    return self.ordinal
+
+
+# Shared by every module in the process
+clock = DayClock()
+
+
+def today_string():
+  return clock.today()
+
+
+def today_ordinal():
+  return clock.today_ordinal()
+
+
+class DayRollover:
+  """
+    Calls on_rollover(previous_date, new_date) once when the local day changes.
+
+    A background thread sleeps until the precomputed next midnight (waking at
+    least every RECHECK_SECONDS to catch timezone changes and system sleep).
+    Hot paths can also call check(), which is a float comparison unless the
+    day has actually changed.
+    """
+
+  def __init__(self, on_rollover):
+    self.on_rollover = on_rollover
+    self.lock = threading.Lock()
+    self.stop_flag = threading.Event()
+    self.thread = None
+    self.current_ordinal = clock.today_ordinal()
+    self.current_date = clock.today()
+
+  def is_stale(self):
+    """True once the cached day is over"""
+    return time.time() >= clock.next_midnight or clock.today_ordinal() != self.current_ordinal
+
+  def check(self):
+    """Fire the rollover callback if the day has changed. Returns True if it fired."""
+    if not self.is_stale():
+      return False
+
+    clock.refresh()
+    with self.lock:
+      if clock.ordinal == self.current_ordinal:
+        return False  # Another thread already handled it
+      previous = self.current_date
+      self.current_ordinal = clock.ordinal
+      self.current_date = clock.date_string
+
+    try:
+      self.on_rollover(previous, self.current_date)
+    except Exception:
+      log.exception("Error handling day rollover")
+    return True
+
+  def start(self):
+    """Start the background midnight timer"""
+    self.stop_flag.clear()
+    if self.thread and self.thread.is_alive():
+      return
+
+    def rollover_loop():
+      while True:
+        timeout = max(0.0, min(clock.next_midnight - time.time(), RECHECK_SECONDS))
+        if self.stop_flag.wait(timeout):
+          return
+        # Pick up timezone changes made while we were running (POSIX only)
+        if hasattr(time, "tzset"):
+          time.tzset()
+        clock.refresh()
+        self.check()
+
+    self.thread = threading.Thread(target=rollover_loop, daemon=True)
+    self.thread.start()
+
+  def stop(self):
+    self.stop_flag.set()
+    if self.thread and self.thread.is_alive():
+      self.thread.join(1.0)
+    self.thread = None
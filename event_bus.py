@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+# Delivery modes
+SYNC = "sync"  # On the publishing thread, before publish() returns
+WORKER = "worker"  # On the shared worker pool; publish() doesn't wait
+
+WORKER_THREADS = 4
+
+
+class Event:
+  """Base class; subscribing to Event receives every event"""
+  __slots__ = ("timestamp",)
+
+  def __init__(self):
+    self.timestamp = time.time()
+
+  def __repr__(self):
+    fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+    return f"{type(self).__name__}({fields})"
+
+
+class IntakeAdded(Event):
+  """Water was logged. total is the day's intake including this amount."""
+  __slots__ = ("amount", "source", "total", "target", "date")
+
+  def __init__(self, amount, source, total, target, date):
+    super().__init__()
+    self.amount = amount
+    self.source = source
+    self.total = total
+    self.target = target
+    self.date = date
+
+
+class GoalReached(Event):
+  """The day's intake reached the target"""
+  __slots__ = ("total", "target", "date")
+
+  def __init__(self, total, target, date):
+    super().__init__()
+    self.total = total
+    self.target = target
+    self.date = date
+
+
+class DayRolledOver(Event):
+  """The finished day was archived and the counter reset"""
+  __slots__ = ("previous_date", "new_date")
+
+  def __init__(self, previous_date, new_date):
+    super().__init__()
+    self.previous_date = previous_date
+    self.new_date = new_date
+
+
+class ReminderFired(Event):
+  """An interval or custom reminder is due and wasn't suppressed"""
+  __slots__ = ("kind", "title", "message", "sound")
+
+  def __init__(self, kind, title, message, sound=None):
+    super().__init__()
+    self.kind = kind  # "interval" or "custom"
+    self.title = title
+    self.message = message
+    self.sound = sound
+
+
+class Subscription:
+  """One handler for one event type. Worker deliveries run in order, one at a time."""
+  __slots__ = ("event_type", "handler", "priority", "mode", "name", "pending", "running", "lock")
+
+  def __init__(self, event_type, handler, priority, mode, name):
+    self.event_type = event_type
+    self.handler = handler
+    self.priority = priority
+    self.mode = mode
+    self.name = name
+    self.pending = deque()
+    self.running = False
+    self.lock = threading.Lock()
+
+
+class EventBus:
+  """
+    In-process publish/subscribe for app events.
+
+    Subscribers run in priority order (highest first). SYNC subscribers run on
+    the publishing thread and should be quick (state, UI). WORKER subscribers
+    run on a shared thread pool; each has its own queue drained by at most one
+    worker at a time, so a slow subscriber falls behind on its own without
+    holding up the others or the publisher. A failing subscriber is logged and
+    never stops delivery to the rest.
+
+    Plugins can subscribe the same way the app does:
+
+      bus.subscribe(IntakeAdded, lambda e: print(e.amount), mode=WORKER)
+    """
+
+  def __init__(self, workers=WORKER_THREADS):
+    self.subscriptions = []
+    self.routes = {}  # event type -> subscriptions in delivery order (cached)
+    self.lock = threading.Lock()
+    self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="events")
+    self.closed = False
+
+  def subscribe(self, event_type, handler, priority=0, mode=SYNC, name=None):
+    """Register handler(event) for event_type and its subclasses. Returns the subscription."""
+    if mode not in (SYNC, WORKER):
+      raise ValueError(f"mode must be {SYNC!r} or {WORKER!r}")
+    subscription = Subscription(event_type, handler, priority, mode, name or getattr(handler, "__name__", "handler"))
+    with self.lock:
+      self.subscriptions.append(subscription)
+      self.routes = {}
+    return subscription
+
+  def unsubscribe(self, subscription):
+    with self.lock:
+      if subscription in self.subscriptions:
+        self.subscriptions.remove(subscription)
+        self.routes = {}
+
+  def route(self, event_type):
+    routes = self.routes
+    subscriptions = routes.get(event_type)
+    if subscriptions is None:
+      with self.lock:
+        # Stable sort: equal priorities keep registration order
+        subscriptions = sorted(
+          (s for s in self.subscriptions if issubclass(event_type, s.event_type)),
+          key=lambda s: -s.priority
+        )
+        self.routes[event_type] = subscriptions
+    return subscriptions
+
+  def publish(self, event):
+    """Deliver an event: SYNC subscribers now, WORKER subscribers queued"""
+    if metrics.enabled:
+      metrics.incr(f"events.{type(event).__name__}")
+    for subscription in self.route(type(event)):
+      if subscription.mode == SYNC:
+        self.deliver(subscription, event)
+      elif not self.closed:
+        with subscription.lock:
+          subscription.pending.append(event)
+          if subscription.running:
+            continue  # Its worker will pick this one up
+          subscription.running = True
+        self.pool.submit(self.drain, subscription)
+
+  def deliver(self, subscription, event):
+    try:
+      with metrics.timer(f"events.handler.{subscription.name}_ms"):
+        subscription.handler(event)
+    except Exception:
+      log.exception("Event subscriber %s failed on %r", subscription.name, event)
+
+  def drain(self, subscription):
+    """Run a worker subscriber's queued events in order"""
+    while True:
+      with subscription.lock:
+        if not subscription.pending:
+          subscription.running = False
+          return
+        event = subscription.pending.popleft()
+      self.deliver(subscription, event)
+
+  def close(self, wait=True):
+    """Stop accepting worker deliveries and let queued ones finish"""
+    self.closed = True
+    self.pool.shutdown(wait=wait)
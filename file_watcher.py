@@ -0,0 +1,57 @@
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+MIN_INTERVAL = 1.0  # seconds
+MAX_INTERVAL = 30.0
+BACKOFF = 1.5
+
+
+class DataFileWatcher:
+  """
+    Notices when the data file is changed by another process, tool or sync client.
+
+    Polls with a single os.stat per tick, comparing against the fingerprint the
+    DataManager recorded on its own last read or write, so our own saves never
+    trigger it. The interval backs off from MIN_INTERVAL to MAX_INTERVAL while
+    nothing changes and snaps back after a change.
+    """
+
+  def __init__(self, data_manager, on_change):
+    self.data_manager = data_manager
+    self.on_change = on_change
+    self.interval = MIN_INTERVAL
+    self.stop_flag = threading.Event()
+    self.thread = None
+
+  def poll(self):
+    """Check once. Returns True if a change was reported."""
+    if self.data_manager.has_external_changes():
+      self.interval = MIN_INTERVAL
+      try:
+        self.on_change()
+      except Exception:
+        log.exception("Error handling external data change")
+      return True
+
+    self.interval = min(MAX_INTERVAL, self.interval * BACKOFF)
+    return False
+
+  def start(self):
+    self.stop_flag.clear()
+    if self.thread and self.thread.is_alive():
+      return
+
+    def watch_loop():
+      while not self.stop_flag.wait(self.interval):
+        self.poll()
+
+    self.thread = threading.Thread(target=watch_loop, daemon=True)
+    self.thread.start()
+
+  def stop(self):
+    self.stop_flag.set()
+    if self.thread and self.thread.is_alive():
+      self.thread.join(1.0)
+    self.thread = None
@@ -0,0 +1,226 @@
+"""
+Read-only hydration report across a directory of profile files.
+
+Profiles are parsed in worker processes, each of which folds a chunk of
+files into one partial result; the partials are merged in a single reduce
+step. Days sealed into a profile's <user>_archive are read from there when
+the window reaches past its hot history. Nothing is written back (unlike
+DataManager.load_data, which stamps last_login), so it is safe to run
+against live profiles.
+
+  python fleet_report.py --dir profiles --days 30
+  python fleet_report.py --dir profiles --json > report.json
+"""
+import argparse
+import heapq
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+
+from app_logging import setup_logging
+from data_manager import DEHYDRATION_WINDOW, is_dehydrated_pattern, is_profile_file
+from history_archive import HistoryArchive, cold_cutoff
+
+CHUNK_SIZE = 500
+MAX_LISTED_USERS = 100
+
+
+def empty_partial():
+  return {
+    "profiles": 0,
+    "errors": 0,
+    "skipped": 0,
+    "dehydrated": 0,
+    "dehydrated_users": [],
+    "days": {}  # date -> [profiles, intake, target, on_target]
+  }
+
+
+def profile_days(data):
+  """A profile's daily entries including today's running counter (not saved into history yet)"""
+  history = data.get("history", {})
+  today = data.get("last_reset_date")
+  if today:
+    target = data.get("daily_target", 0)
+    intake = data.get("current_intake", 0)
+    history = dict(history)
+    history[today] = {
+      "intake": intake,
+      "target": target,
+      "percentage": round((intake / target) * 100 if target > 0 else 0, 1)
+    }
+  return history
+
+
+def archived_days(path, data, first_day, last_day):
+  """A profile's sealed days in [first_day, last_day], if the window reaches past its hot history"""
+  # Read back far enough for the dehydration rule as well
+  window_start = (date.fromisoformat(last_day) - timedelta(days=DEHYDRATION_WINDOW - 1)).isoformat()
+  start = min(first_day, window_start)
+  if start >= cold_cutoff(data.get("last_reset_date") or last_day):
+    return {}
+  archive = HistoryArchive(f"{os.path.splitext(path)[0]}_archive")
+  return dict(archive.days(start, last_day))
+
+
+def scan_profile(partial, path, first_day, last_day):
+  """Fold one profile file into a partial result. Returns False if the file isn't a profile."""
+  with open(path, "r") as f:
+    data = json.load(f)
+  if not isinstance(data, dict) or "daily_target" not in data:
+    return False
+
+  # The hot copy of a day wins over the archived one
+  history = {**archived_days(path, data, first_day, last_day), **profile_days(data)}
+  days = partial["days"]
+  for day, entry in history.items():
+    if first_day <= day <= last_day:
+      totals = days.get(day)
+      if totals is None:
+        totals = days[day] = [0, 0, 0, 0]
+      totals[0] += 1
+      totals[1] += entry.get("intake", 0)
+      totals[2] += entry.get("target", 0)
+      if entry.get("percentage", 0) >= 100:
+        totals[3] += 1
+
+  # Same rule as DataManager.is_dehydrated, over the newest days on or before last_day
+  recent = heapq.nlargest(DEHYDRATION_WINDOW, (d for d in history if d <= last_day))
+  if is_dehydrated_pattern([history[d].get("percentage", 0) for d in reversed(recent)]):
+    partial["dehydrated"] += 1
+    partial["dehydrated_users"].append(os.path.splitext(os.path.basename(path))[0])
+  partial["profiles"] += 1
+  return True
+
+
+def scan_chunk(paths, first_day, last_day):
+  """Map step: one worker turns a chunk of files into one partial"""
+  partial = empty_partial()
+  for path in paths:
+    try:
+      if not scan_profile(partial, path, first_day, last_day):
+        partial["skipped"] += 1
+    except (OSError, ValueError, TypeError, AttributeError):
+      partial["errors"] += 1
+  # Only the first MAX_LISTED_USERS names survive the reduce, whatever the chunk order
+  partial["dehydrated_users"] = sorted(partial["dehydrated_users"])[:MAX_LISTED_USERS]
+  return partial
+
+
+def merge_partials(total, partial):
+  """Reduce step: fold partial into total"""
+  total["profiles"] += partial["profiles"]
+  total["errors"] += partial["errors"]
+  total["skipped"] += partial["skipped"]
+  total["dehydrated"] += partial["dehydrated"]
+  total["dehydrated_users"] = sorted(total["dehydrated_users"] + partial["dehydrated_users"])[:MAX_LISTED_USERS]
+  for day, (profiles, intake, target, on_target) in partial["days"].items():
+    totals = total["days"].get(day)
+    if totals is None:
+      total["days"][day] = [profiles, intake, target, on_target]
+    else:
+      totals[0] += profiles
+      totals[1] += intake
+      totals[2] += target
+      totals[3] += on_target
+  return total
+
+
+def list_profiles(data_dir):
+  with os.scandir(data_dir) as entries:
+    return sorted(entry.path for entry in entries if is_profile_file(entry.name) and entry.is_file())
+
+
+def build_report(data_dir, days=30, end=None, workers=None, chunk_size=CHUNK_SIZE):
+  """
+    Aggregate every profile in data_dir over the `days` days ending on `end` (default today).
+
+    workers=1 scans in this process; otherwise chunks go to a process pool
+    (workers=None uses every core).
+    """
+  end = end or date.today()
+  first_day = (end - timedelta(days=days - 1)).isoformat()
+  last_day = end.isoformat()
+
+  start = time.perf_counter()
+  paths = list_profiles(data_dir)
+  chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+  total = empty_partial()
+
+  if workers == 1:
+    for chunk in chunks:
+      merge_partials(total, scan_chunk(chunk, first_day, last_day))
+  else:
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+      futures = [pool.submit(scan_chunk, chunk, first_day, last_day) for chunk in chunks]
+      for future in as_completed(futures):
+        merge_partials(total, future.result())
+  seconds = time.perf_counter() - start
+
+  daily = []
+  on_target_days = profile_days_total = 0
+  for day in sorted(total["days"]):
+    profiles, intake, target, on_target = total["days"][day]
+    profile_days_total += profiles
+    on_target_days += on_target
+    daily.append({
+      "date": day,
+      "profiles": profiles,
+      "mean_intake": round(intake / profiles, 1),
+      "mean_percentage": round((intake / target) * 100 if target > 0 else 0, 1),
+      "on_target_rate": round(on_target / profiles, 3)
+    })
+
+  return {
+    "from": first_day,
+    "to": last_day,
+    "profiles": total["profiles"],
+    "errors": total["errors"],
+    "skipped": total["skipped"],
+    "seconds": round(seconds, 3),
+    "files_per_sec": round(len(paths) / seconds, 1) if seconds else None,
+    "on_target_rate": round(on_target_days / profile_days_total, 3) if profile_days_total else 0,
+    "dehydrated": total["dehydrated"],
+    "dehydrated_rate": round(total["dehydrated"] / total["profiles"], 3) if total["profiles"] else 0,
+    "dehydrated_users": total["dehydrated_users"],
+    "daily": daily
+  }
+
+
+def format_report(report):
+  lines = [
+    f"Hydration report {report['from']} to {report['to']}",
+    f"Profiles: {report['profiles']} ({report['errors']} unreadable, {report['skipped']} not profiles), "
+    f"{report['files_per_sec']} files/sec",
+    f"Days on target: {report['on_target_rate'] * 100:.1f}%",
+    f"Chronically dehydrated: {report['dehydrated']} ({report['dehydrated_rate'] * 100:.1f}%)",
+    "",
+    f"{'Date':<12}{'Profiles':>10}{'Mean ml':>10}{'Mean %':>9}{'On target':>11}"
+  ]
+  for day in report["daily"]:
+    lines.append(f"{day['date']:<12}{day['profiles']:>10}{day['mean_intake']:>10.0f}"
+                 f"{day['mean_percentage']:>9.1f}{day['on_target_rate'] * 100:>10.1f}%")
+  return "\n".join(lines)
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--dir", required=True, help="Directory of <user>.json profiles")
+  parser.add_argument("--days", type=int, default=30, help="Days to report, ending today")
+  parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+  parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+  parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+  args = parser.parse_args(argv)
+  setup_logging(console=True)
+
+  if not os.path.isdir(args.dir):
+    sys.exit(f"Not a directory: {args.dir}")
+  report = build_report(args.dir, args.days, workers=args.workers, chunk_size=args.chunk_size)
+  print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+  main()
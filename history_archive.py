@@ -0,0 +1,156 @@
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+# Days kept in the hot data file; older whole months are sealed into segments
+HOT_DAYS = 60
+SEGMENT_CACHE_SIZE = 12
+
+
+def cold_cutoff(today, hot_days=HOT_DAYS):
+  """First date that stays hot: the start of the month hot_days before today"""
+  day = date.fromisoformat(today) - timedelta(days=hot_days)
+  return day.replace(day=1).isoformat()
+
+
+def summarize(days):
+  """Manifest entry for a segment's days"""
+  dates = sorted(days)
+  return {
+    "first": dates[0],
+    "last": dates[-1],
+    "days": len(dates),
+    "intake": sum(entry.get("intake", 0) for entry in days.values()),
+    "target": sum(entry.get("target", 0) for entry in days.values()),
+    "on_target": sum(1 for entry in days.values() if entry.get("percentage", 0) >= 100)
+  }
+
+
+class HistoryArchive:
+  """
+    Cold history: one gzip-compressed JSON segment per month plus a manifest.
+
+    Segments are written once and only ever replaced as a whole (atomic
+    rename) when a late entry arrives for a sealed month. The manifest keeps
+    each month's date range and totals so summaries never open a segment;
+    segments themselves are read on demand and kept in a small LRU cache.
+    """
+
+  def __init__(self, directory, cache_size=SEGMENT_CACHE_SIZE):
+    self.directory = directory
+    self.manifest_path = os.path.join(directory, "manifest.json")
+    self.cache_size = cache_size
+    self.cache = OrderedDict()  # month -> {date: entry}, least recently used first
+    self.lock = threading.Lock()
+    self.manifest = None
+    self.manifest_mtime = None
+
+  def segment_path(self, month):
+    return os.path.join(self.directory, f"{month}.json.gz")
+
+  def load_manifest(self):
+    """Get the manifest, re-reading it if another process sealed a segment"""
+    try:
+      mtime = os.stat(self.manifest_path).st_mtime_ns
+    except OSError:
+      self.manifest, self.manifest_mtime = {"segments": {}}, None
+      return self.manifest
+
+    if mtime != self.manifest_mtime:
+      with open(self.manifest_path, "r") as f:
+        self.manifest = json.load(f)
+      self.manifest_mtime = mtime
+      self.cache.clear()  # Segments may have been replaced too
+    return self.manifest
+
+  def months(self):
+    """Sealed months in order"""
+    return sorted(self.load_manifest()["segments"])
+
+  def summary(self, month):
+    return self.load_manifest()["segments"].get(month)
+
+  def segment(self, month):
+    """Get a month's days, reading and caching the segment on first use"""
+    with self.lock:
+      if month not in self.load_manifest()["segments"]:
+        return {}
+      days = self.cache.get(month)
+      if days is not None:
+        self.cache.move_to_end(month)
+        return days
+
+      with gzip.open(self.segment_path(month), "rt") as f:
+        days = json.load(f)
+      self.cache[month] = days
+      while len(self.cache) > self.cache_size:
+        self.cache.popitem(last=False)
+      return days
+
+  def days(self, start=None, end=None):
+    """Yield (date, entry) for archived days in [start, end], oldest first"""
+    for month in self.months():
+      summary = self.summary(month)
+      if (start and summary["last"] < start) or (end and summary["first"] > end):
+        continue  # Skipped without opening the segment
+      days = self.segment(month)
+      for day in sorted(days):
+        if (not start or day >= start) and (not end or day <= end):
+          yield day, days[day]
+
+  def write_json(self, path, value, compress=False):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    opener = gzip.open if compress else open
+    with opener(temp_path, "wt") as f:
+      json.dump(value, f, separators=(",", ":"))
+    os.replace(temp_path, path)
+
+  def clear(self):
+    """Delete every segment and the manifest (before a restore rewrites them)"""
+    with self.lock:
+      for month in self.months():
+        try:
+          os.remove(self.segment_path(month))
+        except FileNotFoundError:
+          pass
+      if os.path.exists(self.manifest_path):
+        os.remove(self.manifest_path)
+      self.manifest, self.manifest_mtime = {"segments": {}}, None
+      self.cache.clear()
+
+  def seal(self, history, cutoff):
+    """
+      Move days before cutoff out of history into monthly segments.
+
+      Removes them from the history dict in place and returns the moved dates.
+      The caller holds the data file lock.
+      """
+    old = [day for day in history if day < cutoff]
+    if not old:
+      return []
+
+    by_month = {}
+    for day in old:
+      by_month.setdefault(day[:7], {})[day] = history[day]
+
+    os.makedirs(self.directory, exist_ok=True)
+    with self.lock:
+      manifest = self.load_manifest()
+      for month, days in by_month.items():
+        if month in manifest["segments"]:
+          # Late entries for a sealed month: write a replacement segment
+          with gzip.open(self.segment_path(month), "rt") as f:
+            days = {**json.load(f), **days}
+        self.write_json(self.segment_path(month), days, compress=True)
+        manifest["segments"][month] = summarize(days)
+        self.cache.pop(month, None)
+      # The manifest goes last so it never points at a missing segment
+      self.write_json(self.manifest_path, manifest)
+      self.manifest_mtime = os.stat(self.manifest_path).st_mtime_ns
+
+    for day in old:
+      del history[day]
+    return old
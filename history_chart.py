@@ -0,0 +1,327 @@
+"""
+History tab: daily intake against target on a tk.Canvas.
+
+Completed days come from the analytics engine's columns; today's bar comes
+from the live counter. The canvas is drawn in two layers:
+
+  static  grid, labels, past days and the target line. Redrawn only when the
+          view, the canvas size or the archived data changes.
+  today   the current day's bar, redrawn on every add_water.
+
+Short ranges draw one bar per day. Ranges with more days than about a third
+of the plot width draw a line through the days picked by LTTB (Largest
+Triangle Three Buckets). That keeps peaks and dips at one point per pixel.
+Dragging pans the view and the mouse wheel zooms around the pointer;
+redraws are coalesced to one per idle cycle so neither blocks the Tk thread.
+"""
+import tkinter as tk
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date
+from tkinter import ttk
+
+from history_index import to_ordinal
+
+MARGIN_LEFT = 50
+MARGIN_RIGHT = 10
+MARGIN_TOP = 10
+MARGIN_BOTTOM = 25
+
+MIN_SPAN_DAYS = 7
+DEFAULT_SPAN_DAYS = 90
+ZOOM_STEP = 0.8
+BAR_MIN_PIXELS = 3  # Below this many pixels per day, switch from bars to a line
+DOWNSAMPLE_CACHE_SIZE = 16
+
+INTAKE_COLOR = "#4a90d9"
+ON_TARGET_COLOR = "#3aa655"
+TODAY_COLOR = "#8cc4f2"
+TARGET_COLOR = "#d9534f"
+GRID_COLOR = "#e5e5e5"
+
+MONTH_NAMES = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def lttb(xs, ys, threshold):
+  """
+    Indexes of the points Largest Triangle Three Buckets keeps when reducing
+    (xs, ys) to `threshold` points. Always keeps the first and last point.
+    """
+  count = len(xs)
+  if threshold >= count or threshold < 3:
+    return list(range(count))
+
+  every = (count - 2) / (threshold - 2)
+  kept = [0]
+  a = 0
+  for i in range(threshold - 2):
+    # Average of the next bucket is the third corner of the triangle
+    next_start = int((i + 1) * every) + 1
+    next_end = min(int((i + 2) * every) + 1, count)
+    span = next_end - next_start
+    avg_x = sum(xs[next_start:next_end]) / span
+    avg_y = sum(ys[next_start:next_end]) / span
+
+    ax, ay = xs[a], ys[a]
+    best, best_area = None, -1.0
+    for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+      area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+      if area > best_area:
+        best, best_area = j, area
+    kept.append(best)
+    a = best
+  kept.append(count - 1)
+  return kept
+
+
+def nice_step(value):
+  """Round a grid spacing up to 1, 2 or 5 times a power of ten"""
+  magnitude = 1
+  while magnitude * 10 <= value:
+    magnitude *= 10
+  for factor in (1, 2, 5, 10):
+    if value <= factor * magnitude:
+      return factor * magnitude
+  return 10 * magnitude
+
+
+class HistoryChart:
+  """Intake vs target chart with pan, zoom and a separately drawn today bar"""
+
+  def __init__(self, parent, data_manager, user_data):
+    self.data_manager = data_manager
+    self.user_data = user_data
+
+    controls = ttk.Frame(parent)
+    controls.pack(fill="x", padx=10, pady=(10, 0))
+    for label, days in (("30 days", 30), ("90 days", 90), ("1 year", 365), ("All", None)):
+      ttk.Button(controls, text=label, command=lambda d=days: self.show_last(d)).pack(side="left", padx=2)
+    self.range_label = ttk.Label(controls, text="")
+    self.range_label.pack(side="right")
+
+    self.canvas = tk.Canvas(parent, background="white", highlightthickness=0)
+    self.canvas.pack(fill="both", expand=True, padx=10, pady=10)
+    ttk.Label(parent, text="Drag to pan, scroll to zoom").pack(pady=(0, 5))
+
+    self.view_end = to_ordinal(self.today())
+    self.view_start = self.view_end - DEFAULT_SPAN_DAYS + 1
+    self.drawn_key = None  # What the static layer currently shows
+    self.scale = None  # (ymax, bars) the static layer was drawn with
+    self.render_pending = None
+    self.pinned = True  # The view ends on today and follows it into the next day
+    self.drag_x = None
+    self.downsampled = OrderedDict()  # (start, end, width, ymax, version) -> line coordinates
+
+    self.canvas.bind("<Configure>", lambda event: self.schedule_render())
+    self.canvas.bind("<ButtonPress-1>", self.on_press)
+    self.canvas.bind("<B1-Motion>", self.on_drag)
+    self.canvas.bind("<ButtonRelease-1>", lambda event: setattr(self, "drag_x", None))
+    self.canvas.bind("<MouseWheel>", lambda event: self.zoom(event.x, event.delta > 0))
+    self.canvas.bind("<Button-4>", lambda event: self.zoom(event.x, True))  # X11 wheel
+    self.canvas.bind("<Button-5>", lambda event: self.zoom(event.x, False))
+
+  def today(self):
+    return self.user_data.get("last_reset_date") or date.today().isoformat()
+
+  # --- Geometry ---------------------------------------------------------------
+
+  def plot_size(self):
+    width = max(self.canvas.winfo_width() - MARGIN_LEFT - MARGIN_RIGHT, 1)
+    height = max(self.canvas.winfo_height() - MARGIN_TOP - MARGIN_BOTTOM, 1)
+    return width, height
+
+  def x_of(self, ordinal):
+    width, _ = self.plot_size()
+    span = self.view_end - self.view_start + 1
+    return MARGIN_LEFT + (ordinal - self.view_start + 0.5) * width / span
+
+  def y_of(self, value, ymax):
+    _, height = self.plot_size()
+    return MARGIN_TOP + height * (1 - min(value, ymax) / ymax)
+
+  def day_at(self, x):
+    width, _ = self.plot_size()
+    span = self.view_end - self.view_start + 1
+    return self.view_start + (x - MARGIN_LEFT) * span / width
+
+  # --- View changes -------------------------------------------------------------
+
+  def bounds(self):
+    """Oldest and newest ordinals the view may show"""
+    ordinals = self.data_manager.analytics(self.user_data).series()[0]
+    newest = to_ordinal(self.today())
+    return (ordinals[0] if ordinals else newest), newest
+
+  def set_view(self, start, end):
+    oldest, newest = self.bounds()
+    span = min(max(end - start, MIN_SPAN_DAYS - 1), max(newest - oldest, MIN_SPAN_DAYS - 1))
+    start = max(min(start, newest - span), oldest)
+    self.view_start, self.view_end = int(round(start)), int(round(start)) + int(round(span))
+    self.pinned = self.view_end >= newest
+    self.schedule_render()
+
+  def show_last(self, days):
+    oldest, newest = self.bounds()
+    self.set_view(oldest if days is None else newest - days + 1, newest)
+
+  def on_press(self, event):
+    self.drag_x = event.x
+
+  def on_drag(self, event):
+    if self.drag_x is None:
+      return
+    width, _ = self.plot_size()
+    shift = (self.drag_x - event.x) * (self.view_end - self.view_start + 1) / width
+    if abs(shift) >= 1:
+      self.drag_x = event.x
+      self.set_view(self.view_start + shift, self.view_end + shift)
+
+  def zoom(self, x, zoom_in):
+    """Zoom around the day under the pointer"""
+    anchor = self.day_at(x)
+    factor = ZOOM_STEP if zoom_in else 1 / ZOOM_STEP
+    self.set_view(anchor - (anchor - self.view_start) * factor, anchor + (self.view_end - anchor) * factor)
+
+  # --- Drawing --------------------------------------------------------------------
+
+  def schedule_render(self):
+    """Coalesce bursts of drag/zoom/resize events into one redraw when Tk is idle"""
+    if self.render_pending is None:
+      self.render_pending = self.canvas.after_idle(self.render)
+
+  def render(self, force=False):
+    """Redraw the static layer if the view or the data changed, then the today layer"""
+    self.render_pending = None
+    if self.canvas.winfo_width() <= 1:
+      return  # Not mapped yet; <Configure> will call back
+    engine = self.data_manager.analytics(self.user_data)
+    width, height = self.plot_size()
+    key = (self.view_start, self.view_end, width, height, engine.version)
+    if key != self.drawn_key or force:
+      self.draw_static(engine, width, height)
+      self.drawn_key = key
+    self.draw_today()
+
+  def visible(self, engine):
+    ordinals, intakes, targets = engine.series()
+    lo = bisect_left(ordinals, self.view_start)
+    hi = bisect_right(ordinals, self.view_end)
+    return ordinals[lo:hi], intakes[lo:hi], targets[lo:hi]
+
+  def draw_static(self, engine, width, height):
+    canvas = self.canvas
+    canvas.delete("static")
+    ordinals, intakes, targets = self.visible(engine)
+    span = self.view_end - self.view_start + 1
+    bars = width / span >= BAR_MIN_PIXELS
+
+    today_target = self.user_data.get("daily_target", 0)
+    ymax = max(max(intakes, default=0), max(targets, default=0), today_target,
+               self.user_data.get("current_intake", 0), 1) * 1.1
+    step = nice_step(ymax / 5)
+    self.scale = (ymax, bars)
+
+    # Grid and axis labels
+    for value in range(0, int(ymax) + 1, step):
+      y = self.y_of(value, ymax)
+      canvas.create_line(MARGIN_LEFT, y, MARGIN_LEFT + width, y, fill=GRID_COLOR, tags="static")
+      canvas.create_text(MARGIN_LEFT - 5, y, text=f"{value}", anchor="e", font=("Arial", 8), tags="static")
+    self.draw_date_labels(width, height)
+
+    # Past days
+    if bars:
+      half = max(width / span * 0.4, 0.5)
+      for ordinal, intake, target in zip(ordinals, intakes, targets):
+        x = self.x_of(ordinal)
+        color = ON_TARGET_COLOR if target > 0 and intake >= target else INTAKE_COLOR
+        canvas.create_rectangle(x - half, self.y_of(intake, ymax), x + half, self.y_of(0, ymax),
+                                fill=color, outline="", tags="static")
+    elif len(ordinals) > 1:
+      canvas.create_line(*self.line_coordinates(engine, ordinals, intakes, width, ymax),
+                         fill=INTAKE_COLOR, width=1.5, tags="static")
+
+    # Target as a step line through the days it changed
+    points = []
+    for i, (ordinal, target) in enumerate(zip(ordinals, targets)):
+      if i == 0 or target != targets[i - 1]:
+        if points:
+          points.extend((self.x_of(ordinal), points[-1]))
+        points.extend((self.x_of(ordinal), self.y_of(target, ymax)))
+    if points:
+      points.extend((self.x_of(min(self.view_end, to_ordinal(self.today()))), points[-1]))
+      canvas.create_line(*points, fill=TARGET_COLOR, dash=(4, 2), tags="static")
+
+    first = date.fromordinal(self.view_start).isoformat()
+    last = date.fromordinal(self.view_end).isoformat()
+    self.range_label.config(text=f"{first} to {last}" + ("" if bars else f" ({len(ordinals)} days, downsampled)"))
+
+  def line_coordinates(self, engine, ordinals, intakes, width, ymax):
+    """Flat x/y list of the LTTB-reduced line, cached for panning back and forth"""
+    key = (self.view_start, self.view_end, width, ymax, engine.version)
+    coordinates = self.downsampled.get(key)
+    if coordinates is not None:
+      self.downsampled.move_to_end(key)
+      return coordinates
+
+    coordinates = []
+    for i in lttb(ordinals, intakes, int(width)):
+      coordinates.extend((self.x_of(ordinals[i]), self.y_of(intakes[i], ymax)))
+    self.downsampled[key] = coordinates
+    while len(self.downsampled) > DOWNSAMPLE_CACHE_SIZE:
+      self.downsampled.popitem(last=False)
+    return coordinates
+
+  def draw_date_labels(self, width, height):
+    """Day, month or year ticks, whichever fits"""
+    span = self.view_end - self.view_start + 1
+    y = MARGIN_TOP + height + 4
+    first, last = date.fromordinal(self.view_start), date.fromordinal(self.view_end)
+    if span <= 31:
+      ticks = [(o, date.fromordinal(o).strftime("%d %b")) for o in range(self.view_start, self.view_end + 1, 7)]
+    elif span <= 730:
+      ticks = []
+      year, month = first.year, first.month
+      while date(year, month, 1) <= last:
+        ordinal = date(year, month, 1).toordinal()
+        if ordinal >= self.view_start and (span <= 366 or month in (1, 4, 7, 10)):
+          ticks.append((ordinal, MONTH_NAMES[month - 1] if month != 1 else str(year)))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    else:
+      ticks = [(date(year, 1, 1).toordinal(), str(year)) for year in range(first.year + 1, last.year + 1)]
+    for ordinal, text in ticks:
+      canvas_x = self.x_of(ordinal)
+      self.canvas.create_text(canvas_x, y, text=text, anchor="n", font=("Arial", 8), tags="static")
+
+  def draw_today(self):
+    """Redraw only the current day's bar (or point, in line mode)"""
+    self.canvas.delete("today")
+    if self.scale is None:
+      return
+    ymax, bars = self.scale
+    intake = self.user_data.get("current_intake", 0)
+    if intake > ymax:
+      self.render(force=True)  # Off the scale: the static layer needs a new y axis
+      return
+    today = to_ordinal(self.today())
+    if not self.view_start <= today <= self.view_end:
+      return
+
+    x, y = self.x_of(today), self.y_of(intake, ymax)
+    if bars:
+      width, _ = self.plot_size()
+      half = max(width / (self.view_end - self.view_start + 1) * 0.4, 0.5)
+      self.canvas.create_rectangle(x - half, y, x + half, self.y_of(0, ymax),
+                                   fill=TODAY_COLOR, outline=INTAKE_COLOR, tags="today")
+    else:
+      self.canvas.create_oval(x - 3, y - 3, x + 3, y + 3, fill=TODAY_COLOR, outline=INTAKE_COLOR, tags="today")
+
+  def update_today(self):
+    """Called after add_water and other counter changes"""
+    if self.drawn_key is None:
+      return  # Never drawn yet; the first <Configure> draws everything
+    today = to_ordinal(self.today())
+    if self.pinned and self.view_end < today:
+      # A new day started: scroll along with it
+      span = self.view_end - self.view_start
+      self.view_start, self.view_end = today - span, today
+    self.render()
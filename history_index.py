@@ -0,0 +1,133 @@
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+GRANULARITIES = ("day", "week", "month")
+
+
+def to_ordinal(value):
+  """Accept a YYYY-MM-DD string, a date or an ordinal"""
+  if isinstance(value, int):
+    return value
+  if isinstance(value, str):
+    return date.fromisoformat(value).toordinal()
+  return value.toordinal()
+
+
+def bucket_start(ordinal, granularity):
+  """Ordinal of the first day of the bucket containing `ordinal`"""
+  if granularity == "day":
+    return ordinal
+  day = date.fromordinal(ordinal)
+  if granularity == "week":
+    return ordinal - day.weekday()  # Weeks start on Monday
+  return day.replace(day=1).toordinal()
+
+
+def bucket_end(start, granularity):
+  """Ordinal of the last day of the bucket starting at `start`"""
+  if granularity == "day":
+    return start
+  if granularity == "week":
+    return start + 6
+  day = date.fromordinal(start)
+  next_month = day.replace(year=day.year + 1, month=1) if day.month == 12 else day.replace(month=day.month + 1)
+  return next_month.toordinal() - 1
+
+
+class Bucket:
+  """Running totals for one day, week or month of history"""
+  __slots__ = ("start", "days", "intake", "target", "on_target", "percentage")
+
+  def __init__(self, start):
+    self.start = start
+    self.days = 0
+    self.intake = 0
+    self.target = 0
+    self.on_target = 0
+    self.percentage = None  # A single day's stored percentage
+
+  def add(self, entry, default_target):
+    self.days += 1
+    self.intake += entry.get("intake", 0)
+    self.target += entry.get("target", default_target)
+    if entry.get("percentage", 0) >= 100:
+      self.on_target += 1
+    self.percentage = entry.get("percentage", 0)
+
+  def add_summary(self, summary):
+    """Fold in a sealed month's manifest totals"""
+    self.days += summary["days"]
+    self.intake += summary["intake"]
+    self.target += summary["target"]
+    self.on_target += summary["on_target"]
+
+  def to_dict(self, granularity):
+    if granularity == "day":
+      percentage = self.percentage
+    else:
+      percentage = round((self.intake / self.target) * 100 if self.target > 0 else 0, 1)
+    return {
+      "start": date.fromordinal(self.start).isoformat(),
+      "end": date.fromordinal(bucket_end(self.start, granularity)).isoformat(),
+      "days": self.days,
+      "intake": self.intake,
+      "target": self.target,
+      "mean": round(self.intake / self.days, 1) if self.days else 0,
+      "on_target": self.on_target,
+      "percentage": percentage
+    }
+
+
+class HistoryIndex:
+  """
+    Sorted day ordinals of a history dict, kept in step with it by bisect inserts.
+
+    Range lookups are two bisects plus the k days in range. The index is tied to
+    one history dict; if that dict is replaced (e.g. by a merge) or gains days
+    behind the index's back, ensure() rebuilds it.
+    """
+
+  def __init__(self):
+    self.ordinals = []
+    self.dates = []  # Parallel YYYY-MM-DD keys
+    self.source = None
+
+  def rebuild(self, history):
+    self.dates = sorted(history)
+    self.ordinals = [to_ordinal(d) for d in self.dates]
+    self.source = history
+
+  def ensure(self, history):
+    if history is not self.source or len(history) != len(self.dates):
+      self.rebuild(history)
+
+  def insert(self, history, day):
+    """Record that `day` was added to history"""
+    if history is not self.source:
+      self.rebuild(history)
+      return
+    ordinal = to_ordinal(day)
+    i = bisect_left(self.ordinals, ordinal)
+    if i == len(self.ordinals) or self.ordinals[i] != ordinal:
+      self.ordinals.insert(i, ordinal)
+      self.dates.insert(i, day)
+
+  def remove(self, history, day):
+    """Record that `day` was removed from history"""
+    if history is not self.source:
+      return
+    ordinal = to_ordinal(day)
+    i = bisect_left(self.ordinals, ordinal)
+    if i < len(self.ordinals) and self.ordinals[i] == ordinal:
+      del self.ordinals[i]
+      del self.dates[i]
+
+  def range(self, start=None, end=None):
+    """Dates with start <= ordinal <= end (None = open), oldest first"""
+    lo = 0 if start is None else bisect_left(self.ordinals, start)
+    hi = len(self.ordinals) if end is None else bisect_right(self.ordinals, end)
+    return self.dates[lo:hi]
+
+  def latest(self, count):
+    """The `count` most recent dates, oldest first"""
+    return self.dates[-count:] if count > 0 else []
@@ -0,0 +1,453 @@
+"""
+Multi-device history sync through a shared folder.
+
+Each day's intake is kept as a per-device counter map
+{device_id: [added, removed]}: a PN-counter built from two grow-only
+counters. Merging takes the element-wise max, so applying the same delta
+twice, or deltas in any order, always gives the same result. A day's
+intake is the sum of added - removed over every device.
+
+Devices never edit each other's files. On every sync a device:
+  1. works out how its own counters moved for the days that could have
+     changed locally (days since the last sync plus days marked dirty),
+  2. writes only those days to a new <device>.<seq>.delta.json file,
+  3. applies delta files from other devices newer than its sync vector,
+  4. publishes that vector as <device>.watermark.json, and deletes its own
+     deltas every other device has applied.
+
+Every COMPACT_AFTER deltas a device also writes <device>.snapshot.json with
+all of its own counters, so a device that joins later (or was away longer
+than WATERMARK_MAX_AGE_DAYS) starts from the snapshot instead of needing
+deltas that were already deleted. Counters are stored locally one file per
+month, and only the months a sync touched are rewritten.
+
+  python history_sync.py --data user_data.json --dir ~/Dropbox/water-sync
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import socket
+import uuid
+from datetime import date, timedelta
+
+log = logging.getLogger(__name__)
+
+DELTA_NAME = re.compile(r"^(?P<device>[A-Za-z0-9_-]+)\.(?P<seq>\d+)\.delta\.json$")
+SNAPSHOT_NAME = re.compile(r"^(?P<device>[A-Za-z0-9_-]+)\.snapshot\.json$")
+WATERMARK_NAME = re.compile(r"^(?P<device>[A-Za-z0-9_-]+)\.watermark\.json$")
+
+# Write a snapshot of our counters after this many deltas since the last one
+COMPACT_AFTER = 100
+# Devices that haven't synced for this long stop holding back delta cleanup
+WATERMARK_MAX_AGE_DAYS = 30
+
+
+def make_device_id():
+  """Readable, unique id for this machine's copy of the data"""
+  host = re.sub(r"[^A-Za-z0-9_-]", "-", socket.gethostname())[:32] or "device"
+  return f"{host}-{uuid.uuid4().hex[:8]}"
+
+
+def counter_total(devices):
+  """Intake for one day from its per-device counters"""
+  return max(0, sum(added - removed for added, removed in devices.values()))
+
+
+def merge_counter(devices, device, added, removed):
+  """Merge one device's counter into a day's map. Returns True if it changed."""
+  old = devices.get(device, [0, 0])
+  new = [max(old[0], added), max(old[1], removed)]
+  if new == old:
+    return False
+  devices[device] = new
+  return True
+
+
+def write_json(path, value):
+  """Write a JSON file via a temp file and rename, so readers never see it half written"""
+  directory, name = os.path.split(path)
+  temp_path = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+  with open(temp_path, "w") as f:
+    json.dump(value, f, separators=(",", ":"))
+    f.flush()
+    os.fsync(f.fileno())
+  os.replace(temp_path, path)
+
+
+def dates_between(first, last):
+  """YYYY-MM-DD strings from first to last inclusive"""
+  try:
+    day, end = date.fromisoformat(first), date.fromisoformat(last)
+  except (TypeError, ValueError):
+    return []
+  dates = []
+  while day <= end:
+    dates.append(day.isoformat())
+    day += timedelta(days=1)
+  return dates
+
+
+class CounterStore:
+  """
+    Per-day counters ({date: {device: [added, removed]}}) kept as one JSON
+    file per month, read on first use and written back only if changed.
+    """
+
+  def __init__(self, directory):
+    self.directory = directory
+    self.months = {}  # month -> {date: {device: counter}}
+    self.dirty = set()
+
+  def month_path(self, month):
+    return os.path.join(self.directory, f"{month}.json")
+
+  def month(self, month):
+    days = self.months.get(month)
+    if days is None:
+      try:
+        with open(self.month_path(month), "r") as f:
+          days = json.load(f)
+      except FileNotFoundError:
+        days = {}
+      self.months[month] = days
+    return days
+
+  def day(self, day):
+    """A day's counter map; changes must be followed by touch(day)"""
+    return self.month(day[:7]).setdefault(day, {})
+
+  def touch(self, day):
+    self.dirty.add(day[:7])
+
+  def all_days(self):
+    """Every stored day, reading each month file"""
+    try:
+      names = os.listdir(self.directory)
+    except FileNotFoundError:
+      names = []
+    for month in sorted({name[:-5] for name in names if name.endswith(".json")} | set(self.months)):
+      yield from self.month(month).items()
+
+  def save(self):
+    if not self.dirty:
+      return
+    os.makedirs(self.directory, exist_ok=True)
+    for month in sorted(self.dirty):
+      write_json(self.month_path(month), self.months[month])
+    self.dirty.clear()
+
+
+class HistorySync:
+  """
+    Sync state for one data file: device id, counters, and the sync vector.
+
+    The state lives in state_path next to the data file, the counters in a
+    <state>_counters directory beside it. Dates changed between syncs (e.g.
+    late API events) are appended to a small pending file, so marking a date
+    is O(1). Callers hold the DataManager's file lock around sync() so
+    processes sharing a data file take turns.
+    """
+
+  def __init__(self, state_path, sync_dir, archive=None):
+    base = os.path.splitext(state_path)[0]
+    self.state_path = state_path
+    self.pending_path = f"{base}.pending"
+    self.counters_dir = f"{base}_counters"
+    self.sync_dir = sync_dir
+    self.archive = archive  # HistoryArchive with the sealed days, if any
+
+  def load_state(self):
+    try:
+      with open(self.state_path, "r") as f:
+        state = json.load(f)
+    except (OSError, ValueError):
+      state = {}
+    state.setdefault("device_id", make_device_id())
+    state.setdefault("seq", 0)
+    state.setdefault("vector", {})  # device -> highest delta seq applied
+    state.setdefault("scan_from", None)  # first date the next sync re-checks
+    state.setdefault("unseen", [])  # dates received before our day reached them
+    state.setdefault("compacted", 0)  # seq of our latest snapshot
+    state.setdefault("published", None)  # date our watermark was last written
+    return state
+
+  def load_counters(self, state):
+    counters = CounterStore(self.counters_dir)
+    # Older state files kept every counter inline; move them to month files
+    for day, devices in state.pop("counters", {}).items():
+      counters.day(day).update(devices)
+      counters.touch(day)
+    return counters
+
+  def save_state(self, state):
+    write_json(self.state_path, state)
+
+  def mark_dirty(self, dates):
+    """Remember past dates whose intake changed so the next sync re-checks them"""
+    if not dates:
+      return
+    try:
+      with open(self.pending_path, "a") as f:
+        f.write("".join(f"{d}\n" for d in dates))
+    except OSError as e:
+      log.error("Error marking days for sync: %s", e)
+
+  def take_pending(self):
+    try:
+      with open(self.pending_path, "r") as f:
+        dates = {line.strip() for line in f if line.strip()}
+    except OSError:
+      return set()
+    return dates
+
+  def clear_pending(self):
+    try:
+      os.remove(self.pending_path)
+    except OSError:
+      pass
+
+  def local_entry(self, data, day):
+    """A past day's history entry, from the hot history or else the archive"""
+    entry = data.get("history", {}).get(day)
+    if entry is None and self.archive is not None:
+      entry = self.archive.segment(day[:7]).get(day)
+    return entry
+
+  def local_intake(self, data, day):
+    """This machine's current intake for a day, or None if it has none"""
+    if day == data.get("last_reset_date"):
+      return data.get("current_intake", 0)
+    entry = self.local_entry(data, day)
+    return None if entry is None else entry.get("intake", 0)
+
+  def known_days(self, data):
+    """Every day this machine has history for, hot or sealed"""
+    days = set(data.get("history", {}))
+    if self.archive is not None:
+      days.update(day for day, _ in self.archive.days())
+    return days
+
+  def record_local(self, state, counters, data, days, unseen=()):
+    """
+      Move our own counters so each day's total matches the local intake.
+
+      For unseen days the local intake doesn't include other devices' drinks
+      yet, so it is compared against our own counter instead of the total.
+      """
+    device = state["device_id"]
+    changed = {}
+    for day in days:
+      intake = self.local_intake(data, day)
+      if intake is None:
+        continue
+      devices = counters.day(day)
+      added, removed = devices.get(device, [0, 0])
+      diff = intake - ((added - removed) if day in unseen else counter_total(devices))
+      if diff == 0:
+        continue
+      if diff > 0:
+        added += diff
+      else:
+        removed -= diff
+      devices[device] = [added, removed]
+      counters.touch(day)
+      changed[day] = devices[device]
+    return changed
+
+  def export(self, state, changed):
+    """Write our changed counters as the next delta file"""
+    state["seq"] += 1
+    name = f"{state['device_id']}.{state['seq']:08d}.delta.json"
+    write_json(os.path.join(self.sync_dir, name),
+               {"device": state["device_id"], "seq": state["seq"], "days": changed})
+    return name
+
+  def list_folder(self):
+    """The shared folder's deltas as {device: {seq: name}} plus the devices with a snapshot"""
+    deltas = {}
+    snapshots = set()
+    for name in os.listdir(self.sync_dir):
+      match = DELTA_NAME.match(name)
+      if match:
+        deltas.setdefault(match["device"], {})[int(match["seq"])] = name
+        continue
+      match = SNAPSHOT_NAME.match(name)
+      if match:
+        snapshots.add(match["device"])
+    return deltas, snapshots
+
+  def read_shared(self, name):
+    """Read a file from the shared folder, or None if it is missing or still being copied"""
+    try:
+      with open(os.path.join(self.sync_dir, name), "r") as f:
+        return json.load(f)
+    except (OSError, ValueError) as e:
+      log.warning("Skipping unreadable sync file %s: %s", name, e)
+      return None
+
+  def merge_days(self, counters, other, days, changed):
+    for day, (added, removed) in days.items():
+      if merge_counter(counters.day(day), other, added, removed):
+        counters.touch(day)
+        changed.add(day)
+
+  def import_deltas(self, state, counters, deltas, snapshots):
+    """Apply other devices' snapshots and deltas newer than our sync vector. Returns the changed dates."""
+    vector = state["vector"]
+    changed = set()
+    for other in sorted((set(deltas) | snapshots) - {state["device_id"]}):
+      seqs = deltas.get(other, {})
+      applied = vector.get(other, 0)
+      if applied + 1 not in seqs and other in snapshots:
+        # The deltas we need were cleaned up: start from the device's snapshot
+        snapshot = self.read_shared(f"{other}.snapshot.json")
+        if snapshot is not None and snapshot.get("seq", 0) > applied:
+          self.merge_days(counters, other, snapshot.get("days", {}), changed)
+          applied = vector[other] = snapshot["seq"]
+
+      for seq in sorted(s for s in seqs if s > applied):
+        delta = self.read_shared(seqs[seq])
+        if delta is None:
+          continue
+        self.merge_days(counters, other, delta.get("days", {}), changed)
+        # Advance only over contiguous deltas so a gap (a file still being
+        # copied into the folder) is retried next time; re-applying is harmless
+        if seq == vector.get(other, 0) + 1:
+          vector[other] = seq
+    return changed
+
+  def publish_watermark(self, state, today):
+    """Tell the other devices which of their deltas we have applied, at most once a day unless it moved"""
+    published = state["published"]
+    if published is not None and published["date"] == today and published["vector"] == state["vector"]:
+      return
+    write_json(os.path.join(self.sync_dir, f"{state['device_id']}.watermark.json"),
+               {"device": state["device_id"], "vector": state["vector"], "date": today})
+    state["published"] = {"date": today, "vector": dict(state["vector"])}
+
+  def applied_everywhere(self, state, today):
+    """Highest of our seqs every recently seen device has applied"""
+    device = state["device_id"]
+    oldest = (date.fromisoformat(today) - timedelta(days=WATERMARK_MAX_AGE_DAYS)).isoformat()
+    floor = state["seq"]
+    for name in os.listdir(self.sync_dir):
+      match = WATERMARK_NAME.match(name)
+      if not match or match["device"] == device:
+        continue
+      watermark = self.read_shared(name)
+      if watermark is None:
+        return 0  # Can't tell what it has applied, so keep everything
+      if watermark.get("date", "") >= oldest:
+        floor = min(floor, watermark.get("vector", {}).get(device, 0))
+    return floor
+
+  def compact(self, state, counters, own_deltas, today):
+    """Snapshot our counters every COMPACT_AFTER deltas and delete deltas nobody needs any more"""
+    device = state["device_id"]
+    if state["seq"] - state["compacted"] >= COMPACT_AFTER:
+      days = {day: devices[device] for day, devices in counters.all_days() if device in devices}
+      write_json(os.path.join(self.sync_dir, f"{device}.snapshot.json"),
+                 {"device": device, "seq": state["seq"], "days": days})
+      state["compacted"] = state["seq"]
+
+    # Devices that joined later or were away too long start from the snapshot
+    # instead, so only deltas it covers can go
+    floor = min(state["compacted"], self.applied_everywhere(state, today))
+    removed = 0
+    for seq, name in own_deltas.items():
+      if seq <= floor:
+        try:
+          os.remove(os.path.join(self.sync_dir, name))
+          removed += 1
+        except FileNotFoundError:
+          pass
+    return removed
+
+  def apply(self, counters, data, days):
+    """Write merged day totals back into the user data"""
+    history = data.setdefault("history", {})
+    today = data.get("last_reset_date")
+    for day in days:
+      intake = counter_total(counters.day(day))
+      if day == today:
+        data["current_intake"] = intake
+        continue
+      # A sealed day gets a full hot entry, which replaces the archived one when it is sealed again
+      target = (self.local_entry(data, day) or {}).get("target", data.get("daily_target", 0))
+      history[day] = {
+        "intake": intake,
+        "target": target,
+        "percentage": round((intake / target) * 100 if target > 0 else 0, 1)
+      }
+
+  def sync(self, data):
+    """
+      Exchange changes with the shared folder and merge them into data in place.
+
+      Returns {"exported": days_sent, "imported": [dates changed]}.
+      """
+    os.makedirs(self.sync_dir, exist_ok=True)
+    state = self.load_state()
+    counters = self.load_counters(state)
+    today = data.get("last_reset_date")
+
+    if state["scan_from"] is None:
+      # First sync: every day we know about, sealed or not, is news to the other devices
+      days = self.known_days(data)
+    else:
+      days = set(dates_between(state["scan_from"], today))
+    days |= self.take_pending()
+    if today:
+      days.add(today)
+
+    # Days another device reached first, which we have now reached too
+    unseen = {d for d in state["unseen"] if today and d <= today}
+    changed = self.record_local(state, counters, data, days | unseen, unseen)
+    if changed:
+      self.export(state, changed)
+
+    deltas, snapshots = self.list_folder()
+    imported = self.import_deltas(state, counters, deltas, snapshots)
+    # Another device may already be past midnight; hold its new day until ours starts
+    future = {d for d in imported if not today or d > today}
+    self.apply(counters, data, (imported | unseen) - future)
+
+    state["unseen"] = sorted((set(state["unseen"]) - unseen) | future)
+    state["scan_from"] = today
+    counters.save()
+    if today:
+      self.publish_watermark(state, today)
+      self.compact(state, counters, deltas.get(state["device_id"], {}), today)
+    self.save_state(state)
+    self.clear_pending()
+    return {"exported": len(changed), "imported": sorted((imported | unseen) - future)}
+
+
+def main(argv=None):
+  from app_logging import setup_logging
+  from data_manager import DataManager
+
+  setup_logging(console=True)
+
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--data", default="user_data.json", help="Data file to sync")
+  parser.add_argument("--dir", help="Shared folder every device syncs through (saved as sync_dir)")
+  args = parser.parse_args(argv)
+
+  manager = DataManager(args.data)
+  data = manager.load_data()
+  if args.dir:
+    data["sync_dir"] = args.dir
+    manager.enable_sync(args.dir)
+  if manager.history_sync is None:
+    raise SystemExit("No sync folder configured; pass --dir")
+  result = manager.sync_history(data)
+  if result is None:
+    raise SystemExit("Sync failed")
+  print(f"Sent {result['exported']} day(s), received {len(result['imported'])} day(s)")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,204 @@
+import logging
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+
+from day_rollover import today_ordinal
+
+log = logging.getLogger(__name__)
+
+SOURCES = ("other", "dashboard", "tray", "api", "launch")
+SOURCE_CODES = {source: code for code, source in enumerate(SOURCES)}
+
+# One event on disk: epoch seconds, ml, source code (7 bytes, little endian)
+RECORD = struct.Struct("<IHB")
+MAX_AMOUNT = 0xFFFF
+# Oldest drink the log accepts (RECORD keeps unsigned epoch seconds)
+EARLIEST_EVENT = datetime(2000, 1, 1)
+
+
+def check_event(moment, amount):
+  """Raise ValueError unless a (datetime, ml) drink can be stored as logged"""
+  if moment < EARLIEST_EVENT:
+    raise ValueError(f"Drink time {moment} is before {EARLIEST_EVENT.year}")
+  if isinstance(amount, bool) or not isinstance(amount, int) or not 0 < amount <= MAX_AMOUNT:
+    raise ValueError(f"Drink amount must be 1-{MAX_AMOUNT} ml, got {amount!r}")
+
+
+def to_ordinal(day):
+  """Accept None (today), a date ordinal or a date/datetime"""
+  if day is None:
+    return today_ordinal()
+  if isinstance(day, int):
+    return day
+  return day.toordinal()
+
+
+class DayLog:
+  """One day's drinks in parallel arrays plus a per-hour prefix-sum index"""
+  __slots__ = ("seconds", "amounts", "sources", "prefix")
+
+  def __init__(self):
+    self.seconds = array("L")  # Seconds since local midnight, sorted
+    self.amounts = array("H")  # ml
+    self.sources = array("B")  # SOURCE_CODES
+    self.prefix = array("L", [0] * 25)  # prefix[h] = ml drunk before hour h
+
+  def add(self, second, amount, source):
+    index = len(self.seconds)
+    if index and second < self.seconds[-1]:
+      # Late or imported event: keep the arrays time ordered
+      index = bisect_right(self.seconds, second)
+    self.seconds.insert(index, second)
+    self.amounts.insert(index, amount)
+    self.sources.insert(index, source)
+
+    for hour in range(second // 3600 + 1, 25):
+      self.prefix[hour] += amount
+
+  def total(self):
+    return self.prefix[24]
+
+  def intake_by_hour(self, hour):
+    """Total ml drunk before the end of `hour` (0-23)"""
+    return self.prefix[min(max(hour + 1, 0), 24)]
+
+  def hour_totals(self):
+    """ml drunk in each of the 24 hours"""
+    return [self.prefix[h + 1] - self.prefix[h] for h in range(24)]
+
+  def longest_gap(self, start_second=None, end_second=None):
+    """
+      Longest stretch in seconds without a drink.
+
+      With start/end (e.g. waking hours) the time before the first and after
+      the last drink counts too; otherwise only gaps between drinks count.
+      """
+    points = list(self.seconds)
+    if start_second is not None:
+      points = [start_second] + [s for s in points if s >= start_second]
+    if end_second is not None:
+      points = [s for s in points if s <= end_second] + [end_second]
+    if len(points) < 2:
+      return 0
+    return max(b - a for a, b in zip(points, points[1:]))
+
+
+class IntakeEventStore:
+  """Append-only log of (timestamp, ml, source) drink events, indexed by day"""
+
+  def __init__(self, path):
+    self.path = path
+    self.days = {}  # date ordinal -> DayLog
+    self.lock = threading.Lock()
+    self.load()
+
+  def load(self):
+    """Read the event file into per-day buffers"""
+    self.days = {}
+    if not os.path.exists(self.path):
+      return
+    try:
+      with open(self.path, "rb") as f:
+        raw = f.read()
+    except OSError as e:
+      log.error("Error loading intake events: %s", e)
+      return
+
+    # Ignore a torn trailing record from an interrupted write
+    usable = len(raw) - len(raw) % RECORD.size
+    for timestamp, amount, source in RECORD.iter_unpack(raw[:usable]):
+      self.add_to_day(timestamp, amount, source)
+
+  def add_to_day(self, timestamp, amount, source):
+    moment = datetime.fromtimestamp(timestamp)
+    ordinal = moment.toordinal()
+    day = self.days.get(ordinal)
+    if day is None:
+      day = self.days[ordinal] = DayLog()
+    day.add(moment.hour * 3600 + moment.minute * 60 + moment.second, amount, source)
+
+  def record(self, amount, source="other", timestamp=None):
+    """Store one drink event"""
+    timestamp = int(time.time() if timestamp is None else timestamp)
+    amount = max(0, min(int(amount), MAX_AMOUNT))
+    code = SOURCE_CODES.get(source, 0)
+
+    with self.lock:
+      self.add_to_day(timestamp, amount, code)
+      try:
+        # Small O_APPEND writes don't interleave between processes
+        with open(self.path, "ab") as f:
+          f.write(RECORD.pack(timestamp, amount, code))
+      except OSError as e:
+        log.error("Error recording intake event: %s", e)
+
+  def record_many(self, events):
+    """Store a batch of (amount, source, timestamp) events with one append and one fsync"""
+    records = []
+    for amount, source, timestamp in events:
+      records.append((
+        int(time.time() if timestamp is None else timestamp),
+        max(0, min(int(amount), MAX_AMOUNT)),
+        SOURCE_CODES.get(source, 0)
+      ))
+    if not records:
+      return 0
+
+    with self.lock:
+      for record in records:
+        self.add_to_day(*record)
+      try:
+        with open(self.path, "ab") as f:
+          f.write(b"".join(RECORD.pack(*record) for record in records))
+          f.flush()
+          os.fsync(f.fileno())
+      except OSError as e:
+        log.error("Error recording intake events: %s", e)
+    return len(records)
+
+  def day(self, day=None):
+    """Get the DayLog for a date (or ordinal); None if nothing was recorded"""
+    return self.days.get(to_ordinal(day))
+
+  def events(self, day=None):
+    """List a day's events as (datetime, ml, source) tuples"""
+    ordinal = to_ordinal(day)
+    log = self.days.get(ordinal)
+    if log is None:
+      return []
+    midnight = datetime.fromordinal(ordinal)
+    return [
+      (midnight.replace(hour=s // 3600, minute=s // 60 % 60, second=s % 60), ml, SOURCES[code])
+      for s, ml, code in zip(log.seconds, log.amounts, log.sources)
+    ]
+
+  def intake_by_hour(self, hour, day=None):
+    """ml drunk on a day before the end of `hour`"""
+    log = self.day(day)
+    return log.intake_by_hour(hour) if log else 0
+
+  def hourly_histogram(self, days=7, end=None):
+    """Total ml per hour of day over the last `days` days ending on `end`"""
+    end_ordinal = to_ordinal(end)
+    totals = [0] * 24
+    for ordinal in range(end_ordinal - days + 1, end_ordinal + 1):
+      log = self.days.get(ordinal)
+      if log is None:
+        continue
+      for hour, amount in enumerate(log.hour_totals()):
+        totals[hour] += amount
+    return totals
+
+  def longest_gap(self, day=None, start_hour=None, end_hour=None):
+    """Longest time in seconds without drinking on a day, optionally within waking hours"""
+    log = self.day(day)
+    if log is None:
+      return 0
+    start = start_hour * 3600 if start_hour is not None else None
+    end = end_hour * 3600 if end_hour is not None else None
+    return log.longest_gap(start, end)
@@ -1,18 +1,38 @@
+import sys
+
+from app_logging import setup_logging
+from single_instance import claim_or_forward, parse_launch_args
+
+if __name__ == "__main__":
+  # Silent unless WATER_REMINDER_LOG is set; records go to a background writer
+  setup_logging()
+
+  # Hand off to an already running instance before loading the GUI stack
+  instance = claim_or_forward(sys.argv[1:])
+  if instance is None:
+    sys.exit(0)
+
 import tkinter as tk
 from tkinter import ttk, messagebox
+import atexit
 import json
+import logging
 import os
-import sys
 from datetime import datetime
-import threading
-import time
 import platform
 import pygame
 
-from data_manager import DataManager
-from water_calculator import calculate_water_intake
+import metrics
+from data_manager import DataManager, get_quick_add_amounts
+from day_rollover import DayRollover, today_string
+from event_bus import WORKER, DayRolledOver, EventBus, GoalReached, IntakeAdded, ReminderFired
+from file_watcher import DataFileWatcher
+from history_chart import HistoryChart
+from water_calculator import ACTIVITY_LEVELS, calculate_water_intake
 from notification_manager import NotificationManager
+from pacing import PacingEngine, minute_of_day, parse_clock_time
 from reminder_scheduler import ReminderScheduler
+from reminder_simulator import apply_policy, suggest_policies
 from startup_manager import add_to_startup, remove_from_startup, is_in_startup
 from system_tray import SystemTray
 if sys.platform == 'win32':
@@ -20,6 +40,14 @@ if sys.platform == 'win32':
   # Hide console window
   ctypes.windll.user32.ShowWindow(ctypes.windll.kernel32.GetConsoleWindow(), 0)
 
+# How often history is exchanged with other devices when sync is configured
+SYNC_INTERVAL_MS = 5 * 60 * 1000
+# Backup snapshots: one shortly after start-up, then hourly (unchanged data is skipped)
+BACKUP_DELAY_MS = 60 * 1000
+BACKUP_INTERVAL_MS = 60 * 60 * 1000
+
+log = logging.getLogger(__name__)
+
 class WaterReminderApp:
   def __init__(self, root):
     self.root = root
@@ -36,7 +64,7 @@ class WaterReminderApp:
     try:
       self.root.iconphoto(False, tk.PhotoImage(file=self.icon_path))
     except Exception as e:
-      print(f"Could not load icon: {e}")
+      log.warning("Could not load icon: %s", e)
 
     # Initialize pygame for sounds
     pygame.init()
@@ -54,11 +82,27 @@ class WaterReminderApp:
     self.user_data["user_info"]["last_login"] = current_time
 
     self.reminder_active = False
-    self.reminder_thread = None
+
+    # Clicks and timers only publish events; saving, UI, sounds and
+    # notifications are subscribers
+    self.events = EventBus()
+    self.save_pending = None  # Tk after_idle id of a coalesced save, see save_soon()
+    self.setup_event_subscribers()
+
+    # Expected-intake curve used to skip or bring forward reminders
+    self.pacing = PacingEngine()
+    self.pacing.configure_from(self.user_data)
+    self.reminder_scheduler.should_notify = self.custom_reminder_allowed
+    self.reminder_scheduler.on_fire = self.publish_custom_reminder
+    self.reminder_scheduler.on_interval = self.publish_interval_reminder
 
     # Set up UI after data is loaded
     self.setup_ui()
 
+    # Archive and reset at local midnight even if the app sits idle overnight
+    self.rollover = DayRollover(self.on_day_rollover)
+    self.rollover.start()
+
     # Load and schedule custom reminders
     if "custom_reminders" in self.user_data:
       self.reminder_scheduler.load_reminders(self.user_data["custom_reminders"])
@@ -75,19 +119,36 @@ class WaterReminderApp:
     self.root.withdraw()
     self.is_visible = False
 
-    # Set up system sleep/resume handler
-    self.handle_system_resume()
+    # Pick up edits made to the data file by other tools or synced machines
+    self.file_watcher = DataFileWatcher(
+      self.data_manager,
+      lambda: self.root.after(0, self.reload_external_changes)
+    )
+    self.file_watcher.start()
 
     # Save initial user data
     self.save_user_data()
 
+    # Exchange history with other devices when a sync folder is configured
+    if self.data_manager.history_sync is not None:
+      self.sync_history()
+
+    self.root.after(BACKUP_DELAY_MS, self.backup_data)
+
+    # Periodic metrics snapshots when instrumentation is switched on
+    self.metrics_reporter = None
+    if metrics.enabled:
+      target = os.environ.get("WATER_REMINDER_METRICS_OUT", "metrics.json")
+      self.metrics_reporter = metrics.MetricsReporter(target)
+      self.metrics_reporter.start()
+
   def load_user_data(self):
     if os.path.exists("user_data.json"):
       try:
         with open("user_data.json", "r") as f:
           return json.load(f)
       except Exception as e:
-        print(f"Error loading user data: {e}")
+        log.error("Error loading user data: %s", e)
     return {
       "weight": 70,
       "weight_unit": "kg",
@@ -103,14 +164,23 @@ class WaterReminderApp:
 
   def save_user_data(self):
     self.user_data["custom_reminders"] = self.reminder_scheduler.to_list()
-    self.data_manager.save_data(self.user_data)
+    if not self.data_manager.save_data(self.user_data):
+      messagebox.showerror("Error", "Could not save your settings")
 
-    try:
-      with open("user_data.json", "w") as f:
-        json.dump(self.user_data, f)
-    except Exception as e:
-      print(f"Error saving user data: {e}")
-      messagebox.showerror("Error", f"Could not save your settings: {e}")
+  def save_soon(self):
+    """Save once the Tk event loop is idle, so a burst of clicks is written to disk once"""
+    if self.save_pending is None:
+      self.save_pending = self.root.after_idle(self.run_pending_save)
+
+  def run_pending_save(self):
+    self.save_pending = None
+    self.save_user_data()
+
+  def flush_pending_save(self):
+    """Write a coalesced save now, e.g. before exiting"""
+    if self.save_pending is not None:
+      self.root.after_cancel(self.save_pending)
+      self.run_pending_save()
 
   def setup_ui(self):
     notebook = ttk.Notebook(self.root)
@@ -120,6 +190,10 @@ class WaterReminderApp:
     dashboard_frame = ttk.Frame(notebook)
     notebook.add(dashboard_frame, text="Dashboard")
 
+    # History tab
+    history_frame = ttk.Frame(notebook)
+    notebook.add(history_frame, text="History")
+
     # Settings tab
     settings_frame = ttk.Frame(notebook)
     notebook.add(settings_frame, text="Settings")
@@ -131,15 +205,16 @@ class WaterReminderApp:
     self.setup_dashboard(dashboard_frame)
     self.setup_settings(settings_frame)
     self.setup_reminders_tab(reminders_frame)
+    self.history_chart = HistoryChart(history_frame, self.data_manager, self.user_data)
 
   def setup_dashboard(self, parent):
     # Current date display
-    date_label = ttk.Label(
+    self.date_label = ttk.Label(
       parent,
-      text=f"Today: {datetime.now().strftime('%Y-%m-%d')}",
+      text=f"Today: {today_string()}",
       font=("Arial", 12)
     )
-    date_label.grid(row=0, column=0, columnspan=2, pady=10, sticky="w")
+    self.date_label.grid(row=0, column=0, columnspan=2, pady=10, sticky="w")
 
     # Water target display
     target_frame = ttk.LabelFrame(parent, text="Daily Target")
@@ -174,21 +249,20 @@ class WaterReminderApp:
       maximum=100,
       length=400
     )
-    self.progress.pack(pady=20)
+    self.progress.pack(pady=(20, 5))
+
+    self.pace_label = ttk.Label(progress_frame, text="")
+    self.pace_label.pack(pady=(0, 2))
+
+    self.stats_label = ttk.Label(progress_frame, text="")
+    self.stats_label.pack(pady=(0, 10))
     self.update_progress()
+    self.root.after(60000, self.refresh_pace)
 
     # Add water buttons
-    buttons_frame = ttk.Frame(parent)
-    buttons_frame.grid(row=3, column=0, columnspan=2, pady=20)
-
-    amounts = [100, 200, 300, 500]
-    for i, amount in enumerate(amounts):
-      btn = ttk.Button(
-        buttons_frame,
-        text=f"+ {amount} ml",
-        command=lambda a=amount: self.add_water(a)
-      )
-      btn.grid(row=0, column=i, padx=10)
+    self.quick_add_frame = ttk.Frame(parent)
+    self.quick_add_frame.grid(row=3, column=0, columnspan=2, pady=20)
+    self.build_quick_add_buttons()
 
     # Reminder control
     reminder_frame = ttk.Frame(parent)
@@ -225,6 +299,19 @@ class WaterReminderApp:
     )
     reset_btn.grid(row=5, column=0, columnspan=2, pady=20)
 
+  def build_quick_add_buttons(self):
+    """(Re)create the dashboard's add water buttons from the configured amounts"""
+    for child in self.quick_add_frame.winfo_children():
+      child.destroy()
+
+    for i, amount in enumerate(get_quick_add_amounts(self.user_data)):
+      btn = ttk.Button(
+        self.quick_add_frame,
+        text=f"+ {amount} ml",
+        command=lambda a=amount: self.add_water(a)
+      )
+      btn.grid(row=0, column=i, padx=10)
+
   def setup_settings(self, parent):
     # Weight settings
     weight_frame = ttk.LabelFrame(parent, text="Personal Information")
@@ -252,7 +339,7 @@ class WaterReminderApp:
     self.activity_var = tk.StringVar(value=self.user_data["activity_level"])
     activity = ttk.Combobox(
       weight_frame,
-      values=["sedentary", "light", "moderate", "active", "very active"],
+      values=list(ACTIVITY_LEVELS),
       textvariable=self.activity_var,
       width=15,
       state="readonly"
@@ -269,6 +356,19 @@ class WaterReminderApp:
     interval_entry = ttk.Entry(reminder_frame, width=10, textvariable=self.interval_var)
     interval_entry.grid(row=0, column=1, padx=5, pady=10)
 
+    ttk.Label(weight_frame, text="Quick-add amounts (ml):").grid(row=2, column=0, padx=5, pady=10, sticky="w")
+    self.amounts_var = tk.StringVar(value=", ".join(str(a) for a in get_quick_add_amounts(self.user_data)))
+    ttk.Entry(weight_frame, width=20, textvariable=self.amounts_var).grid(
+      row=2, column=1, columnspan=2, padx=5, pady=10, sticky="w")
+
+    ttk.Label(reminder_frame, text="Wake time (HH:MM):").grid(row=1, column=0, padx=5, pady=5, sticky="w")
+    self.wake_var = tk.StringVar(value=self.user_data.get("wake_time", "08:00"))
+    ttk.Entry(reminder_frame, width=10, textvariable=self.wake_var).grid(row=1, column=1, padx=5, pady=5)
+
+    ttk.Label(reminder_frame, text="Sleep time (HH:MM):").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+    self.sleep_var = tk.StringVar(value=self.user_data.get("sleep_time", "22:00"))
+    ttk.Entry(reminder_frame, width=10, textvariable=self.sleep_var).grid(row=2, column=1, padx=5, pady=5)
+
     # Sound settings frame
     sound_frame = ttk.LabelFrame(parent, text="Sound Settings")
     sound_frame.pack(fill="x", padx=10, pady=10)
@@ -412,6 +512,13 @@ class WaterReminderApp:
     )
     stop_btn.pack(pady=5)
 
+    # Replay history against candidate schedules
+    ttk.Button(
+      parent,
+      text="Suggest From My History",
+      command=self.show_reminder_suggestions
+    ).pack(pady=5)
+
   def add_custom_reminder(self):
     try:
       hour = int(self.hour_var.get())
@@ -482,6 +589,59 @@ class WaterReminderApp:
       "Your custom reminders have been activated!"
     )
 
+  def show_reminder_suggestions(self):
+    """Simulate candidate reminder schedules over past days and offer the best ones"""
+    simulation, results = suggest_policies(self.data_manager, self.user_data)
+    if not simulation.intakes:
+      messagebox.showinfo("No History", "There are no past days to learn from yet.")
+      return
+
+    window = tk.Toplevel(self.root)
+    window.title("Suggested Reminders")
+    window.geometry("560x300")
+    ttk.Label(
+      window,
+      text=f"Replayed {len(simulation.intakes)} days ({simulation.baseline} on target as recorded)"
+    ).pack(pady=5)
+
+    columns = ("policy", "per_day", "on_target")
+    tree = ttk.Treeview(window, columns=columns, show="headings", height=len(results))
+    tree.heading("policy", text="Schedule")
+    tree.heading("per_day", text="Reminders/day")
+    tree.heading("on_target", text="Est. days on target")
+    tree.column("policy", width=300)
+    tree.column("per_day", width=100)
+    tree.column("on_target", width=130)
+    for index, result in enumerate(results):
+      tree.insert("", "end", iid=str(index),
+                  values=(result["label"], result["per_day"], result["on_target_days"]))
+    tree.pack(fill="both", expand=True, padx=10, pady=5)
+
+    def apply_selected():
+      selection = tree.selection()
+      if selection:
+        self.apply_reminder_policy(results[int(selection[0])]["policy"])
+        window.destroy()
+
+    tree.bind("<Double-1>", lambda event: apply_selected())
+    ttk.Button(window, text="Apply Selected", command=apply_selected).pack(pady=5)
+
+  def apply_reminder_policy(self, policy):
+    """Switch to a simulated schedule: interval reminders or custom times, not both"""
+    mode = apply_policy(policy, self.reminder_scheduler, self.user_data)
+    self.reminder_scheduler.stop_reminders()
+    if mode == "interval":
+      self.interval_var.set(str(self.user_data["reminder_interval"]))
+      if not self.reminder_active:
+        self.toggle_reminder()
+    else:
+      if self.reminder_active:
+        self.toggle_reminder()
+      self.reminder_scheduler.schedule_reminders()
+    self.save_user_data()
+    self.refresh_reminders_list()
+    messagebox.showinfo("Reminders Updated", f"Now reminding: {policy.label()}")
+
   def toggle_sound(self):
     self.user_data["sound_enabled"] = self.sound_var.get()
     self.save_user_data()
@@ -516,10 +676,30 @@ class WaterReminderApp:
         messagebox.showerror("Invalid Input", "Weight and interval must be positive numbers")
         return
 
+      try:
+        amounts = [int(part) for part in self.amounts_var.get().replace(" ", "").split(",") if part]
+      except ValueError:
+        amounts = None  # Not numbers: reported below rather than as a weight/interval error
+      if not amounts or any(a <= 0 for a in amounts):
+        messagebox.showerror("Invalid Input", "Quick-add amounts must be positive numbers separated by commas")
+        return
+
+      if parse_clock_time(self.wake_var.get(), None) is None or parse_clock_time(self.sleep_var.get(), None) is None:
+        messagebox.showerror("Invalid Input", "Wake and sleep times must be in HH:MM format")
+        return
+
       self.user_data["weight"] = weight
       self.user_data["weight_unit"] = self.weight_unit_var.get()
       self.user_data["activity_level"] = self.activity_var.get()
       self.user_data["reminder_interval"] = interval
+      self.user_data["wake_time"] = self.wake_var.get()
+      self.user_data["sleep_time"] = self.sleep_var.get()
+
+      if amounts != get_quick_add_amounts(self.user_data):
+        self.user_data["quick_add_amounts"] = amounts
+        self.build_quick_add_buttons()
+        if getattr(self, "system_tray", None) is not None:
+          self.system_tray.set_quick_add_amounts(amounts)
 
       # Calculate recommended intake
       daily_target = calculate_water_intake(
@@ -528,6 +708,10 @@ class WaterReminderApp:
         self.activity_var.get()
       )
       self.user_data["daily_target"] = daily_target
+      self.pacing.configure_from(self.user_data)
+      if self.reminder_active:
+        self.reminder_scheduler.start_interval(interval)
+      self.replan_reminders()
 
       self.save_user_data()
       self.update_ui()
@@ -539,42 +723,152 @@ class WaterReminderApp:
     except ValueError:
       messagebox.showerror("Invalid Input", "Please enter valid numbers for weight and interval")
 
-  def add_water(self, amount):
-    # Check if date has changed
-    current_date = datetime.now().strftime("%Y-%m-%d")
-    if current_date != self.user_data["last_reset_date"]:
-      self.user_data["current_intake"] = 0
-      self.user_data["last_reset_date"] = current_date
+  def add_water(self, amount, source="dashboard"):
+    with metrics.timer("add_water_ms"):
+      self.record_water(amount, source)
 
-    self.user_data["current_intake"] += amount
-    self.save_user_data()
-    self.update_ui()
+  def record_water(self, amount, source):
+    # Start a new day first if midnight passed and the timer hasn't caught up yet
+    if self.user_data["last_reset_date"] != today_string():
+      self.handle_day_rollover()
 
-    # Play water drop sound
+    target = self.user_data["daily_target"]
+    before = self.user_data["current_intake"]
+    self.user_data["current_intake"] += amount
+    self.user_data["last_amount"] = amount
+    total = self.user_data["current_intake"]
+    date = self.user_data["last_reset_date"]
+
+    self.events.publish(IntakeAdded(amount, source, total, target, date))
+    if before < target <= total:
+      self.events.publish(GoalReached(total, target, date))
+
+  def setup_event_subscribers(self):
+    """Wire up what happens when water is logged, the goal is reached, the day ends or a reminder fires"""
+    bus = self.events
+    # Intake is saved when Tk goes idle (one write per burst of clicks), rollovers right away
+    bus.subscribe(IntakeAdded, lambda event: self.save_soon(), priority=100, name="persist")
+    bus.subscribe(DayRolledOver, lambda event: self.save_user_data(), priority=100, name="persist")
+    bus.subscribe(IntakeAdded, self.log_intake_event, priority=90, mode=WORKER, name="intake_log")
+    bus.subscribe(IntakeAdded, lambda event: self.replan_reminders(), priority=60, name="reminders")
+
+    # UI (Tk thread: clicks, launch requests and rollovers are all published from it)
+    bus.subscribe(IntakeAdded, lambda event: self.update_ui(), priority=50, name="ui")
+    bus.subscribe(DayRolledOver, self.on_new_day, priority=50, name="ui")
+    bus.subscribe(GoalReached, lambda event: self.root.after(0, self.show_goal_reached), priority=50, name="ui")
+
+    # Sounds and desktop notifications can be slow, so they run on the worker pool
+    bus.subscribe(IntakeAdded, lambda event: self.play_sound("water_drop"), mode=WORKER, name="sound")
+    bus.subscribe(GoalReached, lambda event: self.play_sound("success"), mode=WORKER, name="sound")
+    bus.subscribe(IntakeAdded, self.notify_tray_intake, mode=WORKER, name="tray_notification")
+    bus.subscribe(ReminderFired, self.send_reminder_notification, mode=WORKER, name="notification")
+
+  def log_intake_event(self, event):
+    self.data_manager.record_intake_event(event.amount, event.source, event.timestamp)
+
+  def play_sound(self, name):
     if self.user_data.get("sound_enabled", True):
-      self.notification_manager.play_sound("water_drop")
+      self.notification_manager.play_sound(name)
+
+  def show_goal_reached(self):
+    messagebox.showinfo("Congratulations!", "You've reached your daily water intake goal!")
 
-    # Show congratulation if target reached
-    if self.user_data["current_intake"] >= self.user_data["daily_target"] and \
-      self.user_data["current_intake"] - amount < self.user_data["daily_target"]:
-      messagebox.showinfo("Congratulations!", "You've reached your daily water intake goal!")
+  def notify_tray_intake(self, event):
+    """Confirm water added from the tray, where the main window is usually hidden"""
+    if event.source == "tray":
+      self.notification_manager.send_notification("Water Added", f"Added {event.amount} ml of water!")
 
-      # Play success sound
-      if self.user_data.get("sound_enabled", True):
-        self.notification_manager.play_sound("success")
+  def send_reminder_notification(self, event):
+    self.notification_manager.send_notification(event.title, event.message, sound=event.sound)
+
+  def publish_custom_reminder(self, hour, minute):
+    """Called on the custom reminder thread when a reminder is due"""
+    self.events.publish(ReminderFired(
+      "custom", "Water Reminder", f"It's {hour:02d}:{minute:02d}! Time to drink water!", sound="reminder"
+    ))
 
   def reset_progress(self):
     if messagebox.askyesno("Reset Progress", "Are you sure you want to reset today's progress?"):
       self.user_data["current_intake"] = 0
-      self.user_data["last_reset_date"] = datetime.now().strftime("%Y-%m-%d")
+      self.user_data["last_reset_date"] = today_string()
       self.save_user_data()
       self.update_ui()
 
+  def reload_external_changes(self):
+    """Merge in changes made to the data file outside this app and refresh what they touch"""
+    try:
+      changes = self.data_manager.reload_changes(self.user_data)
+    except Exception:
+      log.exception("Error reloading external changes")
+      return
+
+    settings = set(changes["settings"])
+    if settings:
+      self.weight_var.set(str(self.user_data["weight"]))
+      self.weight_unit_var.set(self.user_data["weight_unit"])
+      self.activity_var.set(self.user_data["activity_level"])
+      self.interval_var.set(str(self.user_data["reminder_interval"]))
+      self.wake_var.set(self.user_data.get("wake_time", "08:00"))
+      self.sleep_var.set(self.user_data.get("sleep_time", "22:00"))
+      self.sound_var.set(self.user_data.get("sound_enabled", True))
+      self.minimized_var.set(self.user_data.get("start_minimized", False))
+      self.pacing.configure_from(self.user_data)
+      if self.reminder_active:
+        self.reminder_scheduler.start_interval(self.user_data["reminder_interval"])
+
+    if "quick_add_amounts" in settings:
+      self.amounts_var.set(", ".join(str(a) for a in get_quick_add_amounts(self.user_data)))
+      self.build_quick_add_buttons()
+      if getattr(self, "system_tray", None) is not None:
+        self.system_tray.set_quick_add_amounts(get_quick_add_amounts(self.user_data))
+
+    if "custom_reminders" in settings:
+      self.reminder_scheduler.load_reminders(self.user_data["custom_reminders"])
+      self.refresh_reminders_list()
+
+    if "reminder_active" in settings and self.user_data.get("reminder_active", False) != self.reminder_active:
+      self.toggle_reminder()
+
+    if settings or changes["today"]:
+      self.replan_reminders()
+      self.update_ui()
+
+  def sync_history(self):
+    """Sync history through the shared folder, then again every few minutes"""
+    self.user_data["custom_reminders"] = self.reminder_scheduler.to_list()
+    result = self.data_manager.sync_history(self.user_data)
+    if result and result["imported"]:
+      self.update_ui()
+    self.root.after(SYNC_INTERVAL_MS, self.sync_history)
+
+  def backup_data(self):
+    """Snapshot settings and history into the backup store, then again every hour"""
+    self.user_data["custom_reminders"] = self.reminder_scheduler.to_list()
+    self.data_manager.backup(self.user_data)
+    self.root.after(BACKUP_INTERVAL_MS, self.backup_data)
+
+  def on_day_rollover(self, previous_date, new_date):
+    """Called by the midnight timer thread"""
+    self.root.after(0, self.handle_day_rollover)
+
+  def handle_day_rollover(self):
+    """Archive the finished day and reset today's counter (runs on the Tk thread)"""
+    previous_date = self.user_data.get("last_reset_date")
+    if self.data_manager.check_new_day(self.user_data):
+      self.events.publish(DayRolledOver(previous_date, self.user_data["last_reset_date"]))
+
+  def on_new_day(self, event):
+    self.pacing.configure_from(self.user_data)
+    self.replan_reminders()
+    self.date_label.config(text=f"Today: {event.new_date}")
+    self.update_ui()
+
   def update_ui(self):
     self.target_label.config(text=f"{self.user_data['daily_target']} ml")
     self.intake_label.config(text=f"{self.user_data['current_intake']} ml")
     self.recommendation_label.config(text=f"Current recommended intake: {self.user_data['daily_target']} ml")
     self.update_progress()
+    self.history_chart.update_today()
 
   def update_progress(self):
     if self.user_data["daily_target"] > 0:
@@ -583,6 +877,46 @@ class WaterReminderApp:
     else:
       progress = 0
     self.progress_var.set(progress)
+    self.pace_label.config(text=self.pacing.describe(self.user_data["current_intake"]))
+    self.update_stats()
+
+    # The tray is created after the dashboard, so it may not exist yet
+    if getattr(self, "system_tray", None) is not None:
+      self.system_tray.update_progress(
+        round(progress),
+        self.user_data["current_intake"],
+        self.user_data["daily_target"]
+      )
+
+  def update_stats(self):
+    """Streak and 7-day average under the progress bar (cached until a day is archived)"""
+    summary = self.data_manager.stats_summary(self.user_data)
+    streaks = summary["streaks"]
+    text = f"Streak: {streaks['current']} days (best {streaks['longest']})"
+    average = summary["moving_averages"][7]
+    if average is not None:
+      text += f"  |  7-day average: {average:.0f} ml"
+    self.stats_label.config(text=text)
+
+  def refresh_pace(self):
+    """Keep the pace text current as the expected intake rises through the day"""
+    self.pace_label.config(text=self.pacing.describe(self.user_data["current_intake"]))
+    self.root.after(60000, self.refresh_pace)
+
+  def custom_reminder_allowed(self):
+    """Skip custom reminders while the user is awake and ahead of schedule"""
+    # Before wake time nothing is expected yet, so everyone counts as "ahead"
+    minute = minute_of_day()
+    return not (self.pacing.is_awake(minute) and self.pacing.is_ahead(self.user_data["current_intake"], minute))
+
+  def replan_reminders(self):
+    """Bring reminders forward to when the user will fall behind schedule, or put them back"""
+    minute = self.pacing.behind_at(self.user_data["current_intake"])
+    behind_time = None
+    if minute is not None:
+      midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+      behind_time = midnight.timestamp() + minute * 60
+    self.reminder_scheduler.replan(behind_time)
 
   def toggle_reminder(self):
     if self.reminder_active:
@@ -591,60 +925,68 @@ class WaterReminderApp:
       self.status_label.config(text="Reminders inactive")
       self.user_data["reminder_active"] = False
       self.save_user_data()
+      self.reminder_scheduler.stop_interval()
     else:
       self.reminder_active = True
       self.reminder_btn_text.set("Stop Reminders")
       self.status_label.config(text="Reminders active")
       self.user_data["reminder_active"] = True
       self.save_user_data()
+      # Every reminder_interval minutes, pulled forward by replan_reminders() when behind
+      self.reminder_scheduler.start_interval(self.user_data["reminder_interval"])
+      self.replan_reminders()
+
+  def publish_interval_reminder(self, planned_time):
+    """Called on the reminder engine's thread when the interval reminder is due"""
+    # No point nagging while asleep or ahead of schedule
+    if not self.pacing.should_remind(self.user_data["current_intake"]):
+      metrics.incr("reminder.suppressed")
+      return
 
-      if self.reminder_thread is None or not self.reminder_thread.is_alive():
-        self.reminder_thread = threading.Thread(target=self.reminder_loop, daemon=True)
-        self.reminder_thread.start()
-
-  def reminder_loop(self):
-    while self.reminder_active:
-      # Sleep for the specified interval (in minutes)
-      for _ in range(self.user_data["reminder_interval"] * 60):
-        time.sleep(1)
-        if not self.reminder_active:
-          return
-
-      # Show notification
-      sound = "reminder" if self.user_data.get("sound_enabled", True) else None
-      self.notification_manager.send_notification(
-        "Water Reminder",
-        "Time to drink water! Stay hydrated.",
-        sound=sound
-      )
+    sound = "reminder" if self.user_data.get("sound_enabled", True) else None
+    self.events.publish(ReminderFired("interval", "Water Reminder", "Time to drink water! Stay hydrated.", sound))
+
+  def show_diagnostics(self):
+    """Show a window with the current metrics snapshot"""
+    window = tk.Toplevel(self.root)
+    window.title("Diagnostics")
+    window.geometry("640x360")
 
-  def handle_system_resume(self):
-    """Reset timers when system wakes from sleep"""
-    last_time = time.time()
+    text = tk.Text(window, font=("Courier", 10), wrap="none")
+    text.pack(fill="both", expand=True, padx=10, pady=10)
 
-    def check_time():
-      nonlocal last_time
-      while True:
-        time.sleep(5)  # Check every 5 seconds
-        current_time = time.time()
+    def refresh():
+      text.delete("1.0", "end")
+      text.insert("1.0", metrics.format_snapshot(metrics.snapshot()))
 
-        # If more than 60 seconds have passed (system was likely asleep)
-        if current_time - last_time > 60:
-          # Reset reminder timers
-          if self.reminder_active:
-            if self.reminder_thread is not None and not self.reminder_thread.is_alive():
-              self.reminder_thread = threading.Thread(target=self.reminder_loop, daemon=True)
-              self.reminder_thread.start()
+    ttk.Button(window, text="Refresh", command=refresh).pack(pady=5)
+    refresh()
 
-        last_time = current_time
+  def handle_launch_request(self, request):
+    """Apply arguments from the command line or forwarded by a duplicate launch"""
+    for amount in request.get("add", []):
+      if amount > 0:
+        self.add_water(amount, source="launch")
 
-    # Start the time checking thread
-    time_thread = threading.Thread(target=check_time, daemon=True)
-    time_thread.daemon = True
-    time_thread.start()
+    if request.get("toggle_reminders"):
+      self.toggle_reminder()
+
+    if request.get("show"):
+      if hasattr(self, "system_tray"):
+        self.system_tray.show_window()
+      else:
+        self.root.deiconify()
+      self.is_visible = True
 
 
 if __name__ == "__main__":
   root = tk.Tk()
   app = WaterReminderApp(root)
-  root.mainloop()
\ No newline at end of file
+  app.handle_launch_request(parse_launch_args(sys.argv[1:]))
+
+  # Later launches forward their arguments here; run them on the Tk thread
+  instance.serve(lambda request: root.after(0, app.handle_launch_request, request))
+  atexit.register(instance.release)
+
+  root.mainloop()
+  app.flush_pending_save()
\ No newline at end of file
@@ -0,0 +1,226 @@
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# Instrumentation is off unless WATER_REMINDER_METRICS=1 (or enable() is called).
+# When disabled every hook is a single flag check that returns immediately.
+enabled = os.environ.get("WATER_REMINDER_METRICS", "") == "1"
+
+# Upper bounds in milliseconds; the last bucket catches everything larger
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, float("inf"))
+
+lock = threading.Lock()
+counters = {}
+histograms = {}
+started_at = time.time()
+
+
+class Histogram:
+  """Fixed-bucket latency histogram in milliseconds"""
+
+  def __init__(self):
+    self.counts = [0] * len(BUCKETS_MS)
+    self.count = 0
+    self.total = 0.0
+    self.min = None
+    self.max = None
+
+  def observe(self, value):
+    for i, bound in enumerate(BUCKETS_MS):
+      if value <= bound:
+        self.counts[i] += 1
+        break
+    self.count += 1
+    self.total += value
+    self.min = value if self.min is None else min(self.min, value)
+    self.max = value if self.max is None else max(self.max, value)
+
+  def percentile(self, pct):
+    """Estimate a percentile from the bucket upper bounds"""
+    if not self.count:
+      return 0.0
+    rank = pct / 100 * self.count
+    seen = 0
+    for bound, count in zip(BUCKETS_MS, self.counts):
+      seen += count
+      if seen >= rank:
+        return min(bound, self.max)
+    return self.max
+
+  def to_dict(self):
+    return {
+      "count": self.count,
+      "mean": round(self.total / self.count, 3) if self.count else 0.0,
+      "min": round(self.min, 3) if self.min is not None else 0.0,
+      "max": round(self.max, 3) if self.max is not None else 0.0,
+      "p50": round(self.percentile(50), 3),
+      "p99": round(self.percentile(99), 3),
+      "buckets": {("inf" if b == float("inf") else str(b)): c for b, c in zip(BUCKETS_MS, self.counts) if c}
+    }
+
+
+class Timer:
+  """Context manager that records its duration into a histogram"""
+  __slots__ = ("name", "start")
+
+  def __init__(self, name):
+    self.name = name
+    self.start = 0.0
+
+  def __enter__(self):
+    self.start = time.perf_counter()
+    return self
+
+  def __exit__(self, exc_type, exc, tb):
+    observe(self.name, (time.perf_counter() - self.start) * 1000)
+    return False
+
+
+class NullTimer:
+  """Shared do-nothing timer handed out while metrics are disabled"""
+  __slots__ = ()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc, tb):
+    return False
+
+
+NULL_TIMER = NullTimer()
+
+
+def enable(flag=True):
+  """Turn instrumentation on or off at runtime"""
+  global enabled
+  enabled = flag
+
+
+def incr(name, value=1):
+  """Add to a counter"""
+  if not enabled:
+    return
+  with lock:
+    counters[name] = counters.get(name, 0) + value
+
+
+def observe(name, value_ms):
+  """Record a millisecond value into a histogram"""
+  if not enabled:
+    return
+  with lock:
+    histogram = histograms.get(name)
+    if histogram is None:
+      histogram = histograms[name] = Histogram()
+    histogram.observe(value_ms)
+
+
+def timer(name):
+  """Time a block: `with metrics.timer("save_data_ms"): ...`"""
+  if not enabled:
+    return NULL_TIMER
+  return Timer(name)
+
+
+def reset():
+  """Clear all recorded metrics"""
+  global started_at
+  with lock:
+    counters.clear()
+    histograms.clear()
+    started_at = time.time()
+
+
+def snapshot():
+  """Get a JSON-serialisable copy of all metrics"""
+  with lock:
+    return {
+      "enabled": enabled,
+      "timestamp": time.time(),
+      "uptime_seconds": round(time.time() - started_at, 1),
+      "counters": dict(counters),
+      "histograms": {name: h.to_dict() for name, h in histograms.items()}
+    }
+
+
+def format_snapshot(snap):
+  """Render a snapshot as text for the Diagnostics view"""
+  lines = [f"Metrics {'enabled' if snap.get('enabled') else 'disabled'}, "
+           f"uptime {snap.get('uptime_seconds', 0)} s"]
+
+  if not snap.get("enabled"):
+    lines.append("Set WATER_REMINDER_METRICS=1 and restart to collect metrics.")
+
+  if snap.get("counters"):
+    lines.append("")
+    lines.append("Counters")
+    for name, value in sorted(snap["counters"].items()):
+      lines.append(f"  {name:<32} {value}")
+
+  if snap.get("histograms"):
+    lines.append("")
+    lines.append(f"  {'Timings (ms)':<32} {'count':>7} {'mean':>9} {'p50':>9} {'p99':>9} {'max':>9}")
+    for name, h in sorted(snap["histograms"].items()):
+      lines.append(f"  {name:<32} {h['count']:>7} {h['mean']:>9} {h['p50']:>9} {h['p99']:>9} {h['max']:>9}")
+
+  return "\n".join(lines)
+
+
+class MetricsReporter:
+  """Periodically writes a snapshot to a JSON file or sends it to udp://host:port"""
+
+  def __init__(self, target, interval=60):
+    self.target = target
+    self.interval = interval
+    self.stop_flag = threading.Event()
+    self.thread = None
+
+  def write_snapshot(self):
+    payload = json.dumps(snapshot())
+    if self.target.startswith("udp://"):
+      host, _, port = self.target[len("udp://"):].rpartition(":")
+      with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.sendto(payload.encode("utf-8"), (host, int(port)))
+    else:
+      temp_path = f"{self.target}.tmp"
+      with open(temp_path, "w") as f:
+        f.write(payload)
+      os.replace(temp_path, self.target)
+
+  def start(self):
+    if self.thread and self.thread.is_alive():
+      return
+    self.stop_flag.clear()
+
+    def report_loop():
+      while not self.stop_flag.wait(self.interval):
+        try:
+          self.write_snapshot()
+        except Exception as e:
+          log.warning("Error writing metrics snapshot: %s", e)
+
+    self.thread = threading.Thread(target=report_loop, daemon=True)
+    self.thread.start()
+
+  def stop(self):
+    self.stop_flag.set()
+    if self.thread and self.thread.is_alive():
+      self.thread.join(1.0)
+    self.thread = None
+
+
+if __name__ == "__main__":
+  # CLI diagnostics view: python metrics.py [metrics.json]
+  path = sys.argv[1] if len(sys.argv) > 1 else "metrics.json"
+  try:
+    with open(path, "r") as f:
+      print(format_snapshot(json.load(f)))
+  except (OSError, ValueError) as e:
+    print(f"Could not read metrics snapshot {path}: {e}")
+    sys.exit(1)
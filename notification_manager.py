@@ -1,8 +1,12 @@
 from plyer import notification
+import logging
 import os
-import platform
 import pygame  # Add pygame for sound effects
 
+import metrics
+
+log = logging.getLogger(__name__)
+
 
 class NotificationManager:
   def __init__(self):
@@ -14,7 +18,7 @@ class NotificationManager:
       pygame.mixer.init()
       self.sounds = self.load_sounds()
     except Exception as e:
-      print(f"Error initializing sound system: {e}")
+      log.error("Error initializing sound system: %s", e)
       self.sounds = {}
 
   def get_icon_path(self):
@@ -33,9 +37,9 @@ class NotificationManager:
     if not os.path.exists(sounds_dir):
       try:
         os.makedirs(sounds_dir)
-        print(f"Created sounds directory at {sounds_dir}")
+        log.info("Created sounds directory at %s", sounds_dir)
       except Exception as e:
-        print(f"Failed to create sounds directory: {e}")
+        log.error("Failed to create sounds directory: %s", e)
 
     sound_files = {
       "water_drop": "reminder.wav",
@@ -49,27 +53,28 @@ class NotificationManager:
         try:
           sounds[name] = path
         except Exception as e:
-          print(f"Failed to load sound {path}: {e}")
+          log.error("Failed to load sound %s: %s", path, e)
       else:
-        print(f"Sound file not found: {path}")
+        log.warning("Sound file not found: %s", path)
 
     return sounds
 
   def play_sound(self, sound_name):
     """Play a sound by name"""
     if not self.sounds:
-      print("No sounds available")
+      log.debug("No sounds available")
       return False
 
     if sound_name in self.sounds:
       try:
-        sound = pygame.mixer.Sound(self.sounds[sound_name])
-        sound.play()
+        with metrics.timer("play_sound_ms"):
+          sound = pygame.mixer.Sound(self.sounds[sound_name])
+          sound.play()
         return True
       except Exception as e:
-        print(f"Failed to play sound {sound_name}: {e}")
+        log.error("Failed to play sound %s: %s", sound_name, e)
     else:
-      print(f"Sound '{sound_name}' not found. Available sounds: {list(self.sounds.keys())}")
+      log.warning("Sound %r not found. Available sounds: %s", sound_name, list(self.sounds))
     return False
 
   def send_notification(self, title, message, sound=None):
@@ -79,15 +84,17 @@ class NotificationManager:
       if sound and self.sounds:
         self.play_sound(sound)
 
-      notification.notify(
-        title=title,
-        message=message,
-        app_name=self.app_name,
-        app_icon=self.icon_path,
-        timeout=10  # seconds
-      )
+      with metrics.timer("send_notification_ms"):
+        notification.notify(
+          title=title,
+          message=message,
+          app_name=self.app_name,
+          app_icon=self.icon_path,
+          timeout=10  # seconds
+        )
+      metrics.incr("notifications.sent")
       return True
     except Exception as e:
-      print(f"Failed to send notification: {e}")
+      log.error("Failed to send notification: %s", e)
       return False
       return False
\ No newline at end of file
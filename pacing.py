@@ -0,0 +1,111 @@
+import time
+from array import array
+from bisect import bisect_left
+
+MINUTES_PER_DAY = 24 * 60
+
+# How far behind (ml) counts as "behind" and pulls the next reminder forward
+BEHIND_THRESHOLD_ML = 250
+
+
+def parse_clock_time(value, default):
+  """Convert "HH:MM" into minutes after midnight"""
+  try:
+    hour, minute = (int(part) for part in str(value).split(":"))
+    if 0 <= hour < 24 and 0 <= minute < 60:
+      return hour * 60 + minute
+  except ValueError:
+    pass
+  return default
+
+
+def minute_of_day(now=None):
+  """Current local minute after midnight"""
+  local = time.localtime(now)
+  return local.tm_hour * 60 + local.tm_min
+
+
+class PacingEngine:
+  """
+    Precomputed expected-intake curve for the user's waking hours.
+
+    configure() builds a per-minute table once (on start-up, settings change
+    or day rollover); every pace question afterwards is a single lookup.
+    """
+
+  def __init__(self, daily_target=2000, wake_time="08:00", sleep_time="22:00"):
+    self.expected = array("L", [0] * MINUTES_PER_DAY)
+    self.configure(daily_target, wake_time, sleep_time)
+
+  def configure(self, daily_target, wake_time="08:00", sleep_time="22:00"):
+    """Rebuild the expected-intake table"""
+    self.daily_target = max(0, int(daily_target))
+    self.wake_minute = parse_clock_time(wake_time, 8 * 60)
+    self.sleep_minute = parse_clock_time(sleep_time, 22 * 60)
+    if self.sleep_minute <= self.wake_minute:
+      # The counter resets at midnight, so a window past midnight ends there
+      self.sleep_minute = MINUTES_PER_DAY
+
+    span = self.sleep_minute - self.wake_minute
+    expected = array("L", [0] * MINUTES_PER_DAY)
+    for minute in range(MINUTES_PER_DAY):
+      if minute >= self.sleep_minute:
+        expected[minute] = self.daily_target
+      elif minute > self.wake_minute:
+        # Drink evenly across the waking window
+        expected[minute] = self.daily_target * (minute - self.wake_minute) // span
+    self.expected = expected
+
+  def configure_from(self, user_data):
+    """Rebuild the table from a user_data dictionary"""
+    self.configure(
+      user_data.get("daily_target", 2000),
+      user_data.get("wake_time", "08:00"),
+      user_data.get("sleep_time", "22:00")
+    )
+
+  def expected_intake(self, minute=None):
+    """ml the user should have had by `minute` (default: now)"""
+    return self.expected[minute_of_day() if minute is None else minute]
+
+  def deficit(self, current_intake, minute=None):
+    """How far behind schedule the user is in ml (negative when ahead)"""
+    return self.expected_intake(minute) - current_intake
+
+  def is_awake(self, minute=None):
+    minute = minute_of_day() if minute is None else minute
+    return self.wake_minute <= minute < self.sleep_minute
+
+  def is_ahead(self, current_intake, minute=None):
+    """True when the user has drunk at least what the schedule expects"""
+    return current_intake >= self.expected_intake(minute)
+
+  def is_behind(self, current_intake, minute=None):
+    return self.deficit(current_intake, minute) >= BEHIND_THRESHOLD_ML
+
+  def behind_at(self, current_intake, minute=None):
+    """
+      First waking minute from `minute` (default: now) at which current_intake
+      falls behind schedule, or None if it doesn't before sleep time.
+
+      The expected curve never decreases, so this is a binary search.
+      """
+    minute = minute_of_day() if minute is None else minute
+    if minute >= self.sleep_minute:
+      return None
+    found = bisect_left(self.expected, current_intake + BEHIND_THRESHOLD_ML, minute, self.sleep_minute)
+    return found if found < self.sleep_minute else None
+
+  def should_remind(self, current_intake, minute=None):
+    """Whether an interval reminder that is due should actually be shown"""
+    minute = minute_of_day() if minute is None else minute
+    return self.is_awake(minute) and not self.is_ahead(current_intake, minute)
+
+  def describe(self, current_intake, minute=None):
+    """Short pace text for the dashboard"""
+    deficit = self.deficit(current_intake, minute)
+    if deficit >= BEHIND_THRESHOLD_ML:
+      return f"Behind schedule by {deficit} ml"
+    if deficit <= -BEHIND_THRESHOLD_ML:
+      return f"Ahead of schedule by {-deficit} ml"
+    return "On pace"
@@ -0,0 +1,271 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from data_manager import DataManager, is_profile_file
+from water_calculator import calculate_water_intake_batch, encode_activity_levels, encode_weight_units
+
+log = logging.getLogger(__name__)
+
+VALID_USER_ID = re.compile(r"^[A-Za-z0-9_.@-]{1,128}$")
+
+
+def retarget_profiles(data_dir, chunk_size=10000):
+  """
+    Recompute daily_target for every profile file in data_dir in one streaming pass.
+
+    Profiles are read in chunks, the targets of each chunk are calculated in a
+    single vectorised call, and only files whose target changed are rewritten.
+    Returns (scanned, updated, errors).
+    """
+  scanned = updated = errors = 0
+
+  def process(chunk):
+    nonlocal updated, errors
+    targets = calculate_water_intake_batch(
+      [data.get("weight", 70) for _, data in chunk],
+      encode_weight_units([data.get("weight_unit", "kg") for _, data in chunk]),
+      encode_activity_levels([data.get("activity_level", "moderate") for _, data in chunk])
+    )
+    for (path, data), target in zip(chunk, targets):
+      target = int(target)
+      if data.get("daily_target") == target:
+        continue
+      try:
+        # Re-read under the file lock so a concurrent writer's changes aren't lost,
+        # and bump the version so running apps merge the new target in
+        manager = DataManager(path)
+        with manager.file_lock():
+          current = json.loads(manager.read_disk())
+          current["daily_target"] = target
+          current["data_version"] = current.get("data_version", 0) + 1
+          manager.write_atomic(json.dumps(current, indent=2))
+        updated += 1
+      except (OSError, ValueError) as e:
+        log.error("Error rewriting profile %s: %s", path, e)
+        errors += 1
+
+  chunk = []
+  with os.scandir(data_dir) as entries:
+    for entry in entries:
+      if not is_profile_file(entry.name) or not entry.is_file():
+        continue
+      scanned += 1
+      try:
+        with open(entry.path, "r") as f:
+          chunk.append((entry.path, json.load(f)))
+      except (OSError, ValueError) as e:
+        log.error("Error reading profile %s: %s", entry.path, e)
+        errors += 1
+        continue
+
+      if len(chunk) >= chunk_size:
+        process(chunk)
+        chunk = []
+
+  if chunk:
+    process(chunk)
+
+  return scanned, updated, errors
+
+
+class Profile:
+  """A loaded user profile and the lock that guards it"""
+
+  def __init__(self, user_id, data_manager):
+    self.user_id = user_id
+    self.data_manager = data_manager
+    self.data = None
+    self.lock = threading.RLock()
+    self.dirty = False
+    self.pins = 0  # Number of callers currently using this profile
+    self.last_access = time.monotonic()
+
+
+class ProfileManager:
+  """Maps user IDs to per-user data files and keeps an LRU cache of loaded profiles"""
+
+  def __init__(self, data_dir="profiles", capacity=1000, idle_timeout=300):
+    self.data_dir = data_dir
+    self.capacity = capacity
+    self.idle_timeout = idle_timeout  # seconds
+
+    self.profiles = OrderedDict()  # user_id -> Profile, least recently used first
+    self.evicting = {}  # user_id -> Profile being flushed after leaving the cache
+    self.lock = threading.Lock()
+    self.stop_flag = threading.Event()
+    self.flush_thread = None
+
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.flushes = 0
+
+    os.makedirs(self.data_dir, exist_ok=True)
+
+  def profile_path(self, user_id):
+    """Get the storage file for a user"""
+    if not VALID_USER_ID.match(user_id) or user_id in (".", ".."):
+      raise ValueError(f"Invalid user ID: {user_id!r}")
+    return os.path.join(self.data_dir, f"{user_id}.json")
+
+  @contextmanager
+  def open(self, user_id, write=False):
+    """
+    Use a user's data with the profile locked.
+
+    Pass write=True when modifying the data so it is flushed before eviction.
+    """
+    path = self.profile_path(user_id)
+
+    with self.lock:
+      profile = self.profiles.get(user_id)
+      if profile is None:
+        self.misses += 1
+        # A profile still being flushed by evict() is taken back rather than
+        # reloaded from a file that doesn't have its changes yet
+        profile = self.evicting.get(user_id) or Profile(user_id, DataManager(path))
+        self.profiles[user_id] = profile
+      else:
+        self.hits += 1
+        self.profiles.move_to_end(user_id)
+      profile.pins += 1
+
+    try:
+      with profile.lock:
+        # Load outside the cache lock so slow disks don't block other users
+        if profile.data is None:
+          profile.data = profile.data_manager.load_data()
+          profile.data.setdefault("user_info", {})["username"] = user_id
+        profile.last_access = time.monotonic()
+
+        yield profile.data
+
+        if write:
+          profile.dirty = True
+    finally:
+      with self.lock:
+        profile.pins -= 1
+      self.evict_over_capacity()
+
+  def flush_profile(self, profile):
+    """Write a profile to disk if it has unsaved changes. Caller holds profile.lock."""
+    if profile.dirty and profile.data is not None:
+      if profile.data_manager.save_data(profile.data):
+        profile.dirty = False
+        self.flushes += 1
+
+  def flush(self, user_id=None):
+    """Flush one profile, or all loaded profiles"""
+    with self.lock:
+      if user_id is None:
+        targets = list(self.profiles.values())
+      else:
+        targets = [self.profiles[user_id]] if user_id in self.profiles else []
+
+    for profile in targets:
+      with profile.lock:
+        self.flush_profile(profile)
+
+  def evict(self, user_id):
+    """Flush and drop a profile from the cache. Returns False if it is in use."""
+    with self.lock:
+      profile = self.profiles.get(user_id)
+      if profile is None or profile.pins > 0:
+        return False
+      # Don't wait on a profile another thread is about to use
+      if not profile.lock.acquire(blocking=False):
+        return False
+      del self.profiles[user_id]
+      self.evicting[user_id] = profile
+
+    # Flush under the profile's own lock only, so a slow disk doesn't block other users
+    try:
+      self.flush_profile(profile)
+    finally:
+      profile.lock.release()
+      with self.lock:
+        del self.evicting[user_id]
+        if profile.dirty and user_id not in self.profiles:
+          # The flush failed: keep the changes cached so a later flush can retry
+          self.profiles[user_id] = profile
+          self.profiles.move_to_end(user_id, last=False)
+        evicted = self.profiles.get(user_id) is not profile
+        if evicted:
+          self.evictions += 1
+    return evicted
+
+  def evict_over_capacity(self):
+    """Evict least recently used profiles until the cache fits its capacity"""
+    with self.lock:
+      excess = len(self.profiles) - self.capacity
+      if excess <= 0:
+        return
+      candidates = [uid for uid, p in self.profiles.items() if p.pins == 0][:excess]
+
+    for user_id in candidates:
+      self.evict(user_id)
+
+  def flush_idle(self):
+    """Flush and evict profiles that have not been used for idle_timeout seconds"""
+    cutoff = time.monotonic() - self.idle_timeout
+    with self.lock:
+      idle = [uid for uid, p in self.profiles.items() if p.pins == 0 and p.last_access < cutoff]
+
+    evicted = 0
+    for user_id in idle:
+      if self.evict(user_id):
+        evicted += 1
+    return evicted
+
+  def start_idle_flusher(self, interval=60):
+    """Periodically flush and evict idle profiles in a background thread"""
+    self.stop_flag.clear()
+    if self.flush_thread and self.flush_thread.is_alive():
+      return
+
+    def flush_loop():
+      while not self.stop_flag.wait(interval):
+        try:
+          self.flush_idle()
+        except Exception:
+          log.exception("Error flushing idle profiles")
+
+    self.flush_thread = threading.Thread(target=flush_loop, daemon=True)
+    self.flush_thread.start()
+
+  def close(self):
+    """Stop the background flusher and write out every loaded profile"""
+    self.stop_flag.set()
+    if self.flush_thread and self.flush_thread.is_alive():
+      self.flush_thread.join(1.0)
+    self.flush_thread = None
+    self.flush()
+
+  def retarget_all(self, chunk_size=10000):
+    """Recalculate daily_target for every stored profile, e.g. after a formula change"""
+    # Write out cached changes first, then drop the cache so profiles reload the new targets
+    self.flush()
+    result = retarget_profiles(self.data_dir, chunk_size)
+    with self.lock:
+      idle = [uid for uid, p in self.profiles.items() if p.pins == 0]
+    for user_id in idle:
+      self.evict(user_id)
+    return result
+
+  def stats(self):
+    """Get cache counters"""
+    with self.lock:
+      return {
+        "loaded": len(self.profiles),
+        "capacity": self.capacity,
+        "hits": self.hits,
+        "misses": self.misses,
+        "evictions": self.evictions,
+        "flushes": self.flushes
+      }
@@ -0,0 +1,222 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+
+class Reminder:
+  """A custom (daily at hour:minute) or interval reminder owned by one user"""
+  __slots__ = ("user_id", "reminder_id", "hour", "minute", "interval", "generation", "deadline", "anchor")
+
+  def __init__(self, user_id, reminder_id, hour=None, minute=None, interval=None):
+    self.user_id = user_id
+    self.reminder_id = reminder_id
+    self.hour = hour
+    self.minute = minute
+    self.interval = interval  # seconds, for interval reminders
+    self.generation = 0
+    self.deadline = None  # When its live heap entry is due
+    self.anchor = 0  # Regular daily slot an early (rescheduled) firing stands in for
+
+  def next_deadline(self, now):
+    """Get the next time (epoch seconds) this reminder is due after now"""
+    if self.interval is not None:
+      return now + self.interval
+
+    current = datetime.fromtimestamp(max(now, self.anchor))
+    target = current.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+    if target <= current:
+      target += timedelta(days=1)
+    return target.timestamp()
+
+
+class ReminderEngine:
+  """
+    Drives every user's reminders from one deadline heap and one dispatcher thread.
+
+    Sinks are called on the dispatcher thread as sink(user_id, reminder_id, planned_time)
+    and should hand slow work (notifications, sounds) off rather than block.
+    """
+
+  def __init__(self, default_sink=None):
+    self.heap = []  # [deadline, sequence, Reminder, generation]
+    self.reminders = {}  # (user_id, reminder_id) -> Reminder
+    self.sinks = {}  # user_id -> callable
+    self.default_sink = default_sink
+    self.sequence = 0
+    self.stale = 0  # Heap entries left behind by removed or rescheduled reminders
+
+    self.condition = threading.Condition()
+    self.stop_flag = False
+    self.dispatcher_thread = None
+
+    self.fired = 0
+    self.max_lateness = 0.0
+
+  def set_sink(self, user_id, sink):
+    """Route a user's due reminders to sink"""
+    with self.condition:
+      if sink is None:
+        self.sinks.pop(user_id, None)
+      else:
+        self.sinks[user_id] = sink
+
+  def push(self, reminder, deadline):
+    """Add a heap entry for reminder. Caller holds the condition."""
+    self.sequence += 1
+    reminder.deadline = deadline
+    entry = [deadline, self.sequence, reminder, reminder.generation]
+    woke_earlier = not self.heap or deadline < self.heap[0][0]
+    heapq.heappush(self.heap, entry)
+    if woke_earlier:
+      self.condition.notify()
+
+  def add(self, reminder):
+    """Add or replace a reminder"""
+    key = (reminder.user_id, reminder.reminder_id)
+    with self.condition:
+      previous = self.reminders.get(key)
+      if previous is not None:
+        previous.generation += 1  # Invalidate its heap entry
+        self.stale += 1
+      self.reminders[key] = reminder
+      self.push(reminder, reminder.next_deadline(time.time()))
+      self.maybe_compact()
+    return reminder.reminder_id
+
+  def add_daily(self, user_id, hour, minute, reminder_id=None):
+    """Add a reminder that fires every day at hour:minute"""
+    if reminder_id is None:
+      reminder_id = f"reminder_{hour:02d}{minute:02d}"
+    return self.add(Reminder(user_id, reminder_id, hour=hour, minute=minute))
+
+  def add_interval(self, user_id, minutes, reminder_id="interval"):
+    """Add a reminder that fires every `minutes` minutes"""
+    return self.add(Reminder(user_id, reminder_id, interval=minutes * 60))
+
+  def reschedule(self, user_id, reminder_id, deadline):
+    """
+      Move a reminder's next firing to deadline (epoch seconds). Returns False if it doesn't exist.
+
+      A daily reminder moved earlier than its regular slot skips that slot
+      once it has fired; an interval reminder counts its next interval from
+      when it actually fired.
+      """
+    with self.condition:
+      reminder = self.reminders.get((user_id, reminder_id))
+      if reminder is None:
+        return False
+      reminder.anchor = 0
+      if reminder.interval is None:
+        regular = reminder.next_deadline(time.time())
+        reminder.anchor = regular if deadline < regular else 0
+      reminder.generation += 1  # Invalidate its current heap entry
+      self.stale += 1
+      self.push(reminder, deadline)
+      self.maybe_compact()
+      return True
+
+  def remove(self, user_id, reminder_id):
+    """Remove one reminder. Returns True if it existed."""
+    with self.condition:
+      reminder = self.reminders.pop((user_id, reminder_id), None)
+      if reminder is None:
+        return False
+      reminder.generation += 1
+      self.stale += 1
+      self.maybe_compact()
+      return True
+
+  def remove_user(self, user_id):
+    """Remove all of a user's reminders and their sink"""
+    with self.condition:
+      keys = [key for key in self.reminders if key[0] == user_id]
+      for key in keys:
+        self.reminders.pop(key).generation += 1
+      self.stale += len(keys)
+      self.sinks.pop(user_id, None)
+      self.maybe_compact()
+      return len(keys)
+
+  def maybe_compact(self):
+    """Drop dead heap entries once they make up most of the heap. Caller holds the condition."""
+    if self.stale > 1024 and self.stale * 2 > len(self.heap):
+      self.heap = [entry for entry in self.heap if entry[3] == entry[2].generation]
+      heapq.heapify(self.heap)
+      self.stale = 0
+
+  def pop_due(self, now):
+    """Pop every live entry due at or before now and reschedule it. Caller holds the condition."""
+    due = []
+    while self.heap and self.heap[0][0] <= now:
+      deadline, _, reminder, generation = heapq.heappop(self.heap)
+      if generation != reminder.generation:
+        self.stale -= 1
+        continue
+      due.append((reminder, deadline))
+      self.push(reminder, reminder.next_deadline(max(now, deadline)))
+      reminder.anchor = 0
+    return due
+
+  def dispatch(self, due, now):
+    for reminder, deadline in due:
+      sink = self.sinks.get(reminder.user_id, self.default_sink)
+      self.fired += 1
+      self.max_lateness = max(self.max_lateness, now - deadline)
+      if metrics.enabled:
+        metrics.observe("reminder.engine_drift_ms", (now - deadline) * 1000)
+      if sink is None:
+        continue
+      try:
+        sink(reminder.user_id, reminder.reminder_id, deadline)
+      except Exception:
+        log.exception("Error delivering reminder %s for %s", reminder.reminder_id, reminder.user_id)
+
+  def run(self):
+    """Dispatcher loop: sleep until the earliest deadline, then fire what is due"""
+    while True:
+      with self.condition:
+        if self.stop_flag:
+          return
+        now = time.time()
+        due = self.pop_due(now)
+        if not due:
+          timeout = self.heap[0][0] - now if self.heap else None
+          # Wake at least every minute so clock changes don't strand daily reminders
+          self.condition.wait(60 if timeout is None else min(timeout, 60))
+          continue
+      self.dispatch(due, now)
+
+  def start(self):
+    """Start the dispatcher thread"""
+    with self.condition:
+      self.stop_flag = False
+    if self.dispatcher_thread and self.dispatcher_thread.is_alive():
+      return
+    self.dispatcher_thread = threading.Thread(target=self.run, daemon=True)
+    self.dispatcher_thread.start()
+
+  def stop(self):
+    """Stop the dispatcher thread"""
+    with self.condition:
+      self.stop_flag = True
+      self.condition.notify()
+    if self.dispatcher_thread and self.dispatcher_thread.is_alive():
+      self.dispatcher_thread.join(1.0)
+    self.dispatcher_thread = None
+
+  def stats(self):
+    with self.condition:
+      return {
+        "reminders": len(self.reminders),
+        "users": len({user_id for user_id, _ in self.reminders}),
+        "heap_size": len(self.heap),
+        "stale_entries": self.stale,
+        "fired": self.fired,
+        "max_lateness": round(self.max_lateness, 4)
+      }
@@ -2,27 +2,59 @@ import threading
 import time
 from datetime import datetime, timedelta
 
+import metrics
+from reminder_engine import ReminderEngine
+
+# Owner of the local user's reminders in the ReminderEngine
+LOCAL_USER = "local"
+# Engine id of the every-N-minutes reminder (custom ids never start with ":")
+INTERVAL_REMINDER = ":interval"
+
 
 class ReminderScheduler:
-  def __init__(self, notification_manager):
+  def __init__(self, notification_manager, engine=None, user_id=LOCAL_USER):
     self.notification_manager = notification_manager
     self.custom_reminders = []  # List of (hour, minute, reminder_id) tuples
-    self.scheduled_reminders = {}  # Dictionary of active reminders
-    self.stop_flag = threading.Event()
-    self.scheduler_thread = None
+    # Due times are kept in a ReminderEngine deadline heap, shared when one is passed in
+    self.engine = engine or ReminderEngine()
+    self.owns_engine = engine is None
+    self.user_id = user_id
+    self.running = False
+    self.should_notify = None  # Optional callable; return False to skip a due reminder
+    self.on_fire = None  # Optional callable(hour, minute) replacing the direct notification
+    self.engine.set_sink(user_id, self.fire)
+
+    # Interval reminder, when started: every interval_minutes, or earlier when behind
+    self.on_interval = None  # callable(planned_time) run when it is due
+    self.interval_minutes = None
+    self.last_interval = None  # When it last fired (or was started)
+    self.interval_deadline = None
+    self.behind_time = None  # When the user falls behind schedule, see replan()
+    self.plan_lock = threading.Lock()
+
+    # The custom reminder currently pulled forward: (reminder_id, regular slot, deadline)
+    self.pulled = None
+    self.covered_until = 0  # Regular slot already stood in for by an early firing
 
   def add_reminder(self, hour, minute, reminder_id=None):
     """Add a new custom reminder time"""
-    if reminder_id is None:
-      reminder_id = f"reminder_{len(self.custom_reminders)}"
-
     # Check for duplicate time
     for h, m, _ in self.custom_reminders:
       if h == hour and m == minute:
         return None  # Don't add duplicates
 
+    if reminder_id is None:
+      used = {rid for _, _, rid in self.custom_reminders}
+      number = len(self.custom_reminders)
+      while f"reminder_{number}" in used:
+        number += 1
+      reminder_id = f"reminder_{number}"
+
     self.custom_reminders.append((hour, minute, reminder_id))
     self.custom_reminders.sort()  # Sort by time
+    if self.running:
+      self.engine.add_daily(self.user_id, hour, minute, reminder_id)
+      self.replan(self.behind_time)
     return reminder_id
 
   def remove_reminder(self, reminder_id):
@@ -30,6 +62,9 @@ class ReminderScheduler:
     for i, (hour, minute, rid) in enumerate(self.custom_reminders):
       if rid == reminder_id:
         self.custom_reminders.pop(i)
+        if self.running:
+          self.engine.remove(self.user_id, reminder_id)
+          self.replan(self.behind_time)
         return True
     return False
 
@@ -44,54 +79,152 @@ class ReminderScheduler:
 
     return target_time
 
+  def start_interval(self, minutes):
+    """Start the interval reminder, or change its interval if it is running"""
+    with self.plan_lock:
+      if self.interval_minutes is None:
+        self.last_interval = time.time()
+      self.interval_minutes = minutes
+      self.engine.add_interval(self.user_id, minutes, INTERVAL_REMINDER)
+      self.interval_deadline = None
+    self.engine.start()
+    self.replan(self.behind_time)
+
+  def stop_interval(self):
+    """Stop the interval reminder"""
+    with self.plan_lock:
+      self.interval_minutes = None
+      self.engine.remove(self.user_id, INTERVAL_REMINDER)
+    self.stop_engine_if_idle()
+
+  def replan(self, behind_time):
+    """
+      Pull reminders forward when the user falls behind, or put them back.
+
+      behind_time is when (epoch seconds) the user's intake falls behind the
+      expected curve, or None. The interval reminder then fires at that
+      time, but no earlier than half an interval after the last one. The
+      next custom reminder is brought forward the same way, but no earlier
+      than halfway from the previous custom slot.
+      """
+    with self.plan_lock:
+      self.behind_time = behind_time
+      self.replan_custom(behind_time)
+      if self.interval_minutes is None:
+        return
+      interval = self.interval_minutes * 60
+      deadline = self.last_interval + interval
+      if behind_time is not None:
+        deadline = min(deadline, max(self.last_interval + interval / 2, behind_time))
+      if deadline != self.interval_deadline:
+        self.engine.reschedule(self.user_id, INTERVAL_REMINDER, deadline)
+        self.interval_deadline = deadline
+
+  def replan_custom(self, behind_time):
+    """Move the next custom reminder to its pulled-forward time. Caller holds plan_lock."""
+    pulled = None
+    if self.running and self.custom_reminders:
+      start = max(time.time(), self.covered_until)
+      slots = []
+      for hour, minute, reminder_id in self.custom_reminders:
+        current = datetime.fromtimestamp(start)
+        target = current.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if target <= current:
+          target += timedelta(days=1)
+        slots.append((target.timestamp(), (target - timedelta(days=1)).timestamp(), reminder_id))
+      slot, _, reminder_id = min(slots)
+      previous = max(earlier for _, earlier, _ in slots)
+      if behind_time is not None:
+        deadline = max(previous + (slot - previous) / 2, behind_time)
+        if deadline < slot:
+          pulled = (reminder_id, slot, deadline)
+
+    if pulled == self.pulled:
+      return
+    # Put the previously pulled reminder back on its regular slot first
+    if self.pulled is not None and (pulled is None or pulled[0] != self.pulled[0]):
+      self.engine.reschedule(self.user_id, self.pulled[0], self.pulled[1])
+    if pulled is not None:
+      self.engine.reschedule(self.user_id, pulled[0], pulled[2])
+    self.pulled = pulled
+
+  def fire(self, user_id, reminder_id, planned_time):
+    """ReminderEngine sink: deliver one due interval or custom reminder"""
+    if reminder_id == INTERVAL_REMINDER:
+      if metrics.enabled:
+        metrics.observe("reminder.interval_drift_ms", (time.time() - planned_time) * 1000)
+      with self.plan_lock:
+        self.last_interval = time.time()
+        self.interval_deadline = None
+      self.replan(self.behind_time)
+      if self.on_interval is not None:
+        self.on_interval(planned_time)
+      return
+
+    with self.plan_lock:
+      if self.pulled is not None and self.pulled[0] == reminder_id:
+        # Fired early: its regular slot is covered, plan from the one after it
+        self.covered_until = self.pulled[1]
+        self.pulled = None
+    self.replan(self.behind_time)
+
+    planned = datetime.fromtimestamp(planned_time)
+    if metrics.enabled:
+      metrics.observe("reminder.custom_drift_ms", (datetime.now() - planned).total_seconds() * 1000)
+    if self.should_notify is not None and not self.should_notify():
+      metrics.incr("reminder.suppressed")
+      return
+    if self.on_fire is not None:
+      self.on_fire(planned.hour, planned.minute)
+      return
+    self.notification_manager.send_notification(
+      "Water Reminder",
+      f"It's {planned.hour:02d}:{planned.minute:02d}! Time to drink water!",
+      sound="reminder"
+    )
+
   def schedule_reminders(self):
     """Schedule all custom reminders"""
-    self.stop_flag.clear()
-
     if not self.custom_reminders:
       return False
 
-    if self.scheduler_thread and self.scheduler_thread.is_alive():
+    if self.running:
       return True  # Already running
 
-    def reminder_thread():
-      while not self.stop_flag.is_set():
-        now = datetime.now()
-
-        for hour, minute, reminder_id in self.custom_reminders:
-          next_time = self.get_next_occurrence(hour, minute)
-          seconds_to_wait = (next_time - now).total_seconds()
-
-          if 0 <= seconds_to_wait < 60:  # If reminder is due within the next minute
-            time.sleep(seconds_to_wait)
-            if not self.stop_flag.is_set():
-              self.notification_manager.send_notification(
-                "Water Reminder",
-                f"It's {hour:02d}:{minute:02d}! Time to drink water!",
-                sound="reminder"
-              )
-
-        # Sleep for a bit to avoid busy waiting
-        time.sleep(30)
-
-    self.scheduler_thread = threading.Thread(target=reminder_thread, daemon=True)
-    self.scheduler_thread.start()
+    for hour, minute, reminder_id in self.custom_reminders:
+      self.engine.add_daily(self.user_id, hour, minute, reminder_id)
+    self.engine.start()
+    self.running = True
+    self.replan(self.behind_time)
     return True
 
   def stop_reminders(self):
-    """Stop all scheduled reminders"""
-    self.stop_flag.set()
-    if self.scheduler_thread and self.scheduler_thread.is_alive():
-      self.scheduler_thread.join(1.0)  # Wait for thread to end with timeout
-    self.scheduler_thread = None
+    """Stop all scheduled custom reminders"""
+    self.running = False
+    for _, _, reminder_id in self.custom_reminders:
+      self.engine.remove(self.user_id, reminder_id)
+    with self.plan_lock:
+      self.pulled = None
+      self.covered_until = 0
+    self.stop_engine_if_idle()
     return True
 
+  def stop_engine_if_idle(self):
+    """Stop our own engine's dispatcher once neither kind of reminder is running"""
+    if self.owns_engine and not self.running and self.interval_minutes is None:
+      self.engine.stop()
+
   def get_all_reminders(self):
     """Get all custom reminders"""
     return self.custom_reminders
 
   def load_reminders(self, reminders_list):
     """Load reminders from a list"""
+    if self.running:
+      for _, _, reminder_id in self.custom_reminders:
+        self.engine.remove(self.user_id, reminder_id)
+      with self.plan_lock:
+        self.pulled = None
     self.custom_reminders = []
     for reminder in reminders_list:
       if len(reminder) >= 2:  # At minimum, we need hour and minute
@@ -0,0 +1,346 @@
+"""
+What-if simulator for reminder policies over recorded history.
+
+Each candidate policy (an interval, a set of fixed times, optionally with
+quiet hours) becomes a mask of the 5-minute slots it fires in. Each recorded
+day becomes two masks: slots where a reminder would actually be sent (awake
+and not ahead of pace, the same suppression the app applies) and slots where
+it could help (the user had gone GAP_MINUTES without a drink). Every policy
+is scored against every day in one pass -- a matrix product with NumPy,
+popcounts over integer bitsets without it:
+
+  sent     = reminders the policy would have sent
+  helpful  = sent reminders that landed in a drinking gap
+  estimate = day's intake + helpful * RESPONSE_RATE * typical drink
+
+A day counts as on target when the estimate reaches its target. Policies
+are ranked by on-target days minus NOTIFICATION_COST per notification.
+Days with per-drink timestamps (intake_log) get exact masks; days with only
+a total assume drinks spread evenly across the waking window.
+
+  python reminder_simulator.py --data user_data.json --top 10
+"""
+import argparse
+import json
+import logging
+import statistics
+import time
+from datetime import date, timedelta
+
+from app_logging import setup_logging
+from pacing import MINUTES_PER_DAY, parse_clock_time
+
+try:
+  import numpy as np
+
+  HAS_NUMPY = True
+except ImportError:
+  HAS_NUMPY = False
+
+log = logging.getLogger(__name__)
+
+SLOT_MINUTES = 5
+SLOTS = MINUTES_PER_DAY // SLOT_MINUTES
+
+HISTORY_DAYS = 365
+GAP_MINUTES = 45  # A reminder only helps once the user has gone this long without a drink
+RESPONSE_RATE = 0.5  # Share of helpful reminders that end in a drink
+DEFAULT_DRINK_ML = 250
+NOTIFICATION_COST = 0.02  # On-target days one notification has to be worth
+
+try:
+  popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+  def popcount(value):
+    return bin(value).count("1")
+
+
+def format_minute(minute):
+  return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class ReminderPolicy:
+  """Interval reminders, fixed daily times, or both, minus quiet hours"""
+  __slots__ = ("interval", "times", "quiet")
+
+  def __init__(self, interval=None, times=(), quiet=()):
+    self.interval = interval  # minutes
+    self.times = tuple(sorted(times))  # minutes after midnight
+    self.quiet = tuple(quiet)  # (start, end) minute ranges with no reminders
+
+  def fire_minutes(self, wake_minute, sleep_minute):
+    """Minutes of the day this policy would remind at"""
+    minutes = set(m for m in self.times if wake_minute <= m < sleep_minute)
+    if self.interval:
+      # The reminder loop first fires one interval after it starts
+      minutes.update(range(wake_minute + self.interval, sleep_minute, self.interval))
+    return sorted(m for m in minutes if not any(start <= m < end for start, end in self.quiet))
+
+  def mask(self, wake_minute, sleep_minute):
+    """Bitset of the slots this policy fires in"""
+    bits = 0
+    for minute in self.fire_minutes(wake_minute, sleep_minute):
+      bits |= 1 << (minute // SLOT_MINUTES)
+    return bits
+
+  def label(self):
+    parts = []
+    if self.interval:
+      parts.append(f"every {self.interval} min")
+    if self.times:
+      shown = ", ".join(format_minute(m) for m in self.times[:4])
+      parts.append(shown + (f" +{len(self.times) - 4} more" if len(self.times) > 4 else ""))
+    for start, end in self.quiet:
+      parts.append(f"quiet {format_minute(start)}-{format_minute(end)}")
+    return ", ".join(parts) or "no reminders"
+
+  def to_dict(self):
+    return {
+      "interval": self.interval,
+      "times": [format_minute(m) for m in self.times],
+      "quiet": [[format_minute(start), format_minute(end)] for start, end in self.quiet]
+    }
+
+  def __repr__(self):
+    return f"ReminderPolicy({self.label()})"
+
+
+def candidate_policies(wake_minute, sleep_minute):
+  """
+    The default search space: intervals with a few quiet-hour variants, and
+    evenly spaced fixed times over windows that start later and end earlier.
+    """
+  quiet_options = [
+    (),
+    ((wake_minute, wake_minute + 60),),
+    ((sleep_minute - 60, sleep_minute),),
+    ((sleep_minute - 120, sleep_minute),),
+    ((wake_minute, wake_minute + 60), (sleep_minute - 60, sleep_minute)),
+    ((12 * 60, 13 * 60 + 30),)
+  ]
+  policies = [ReminderPolicy()]
+  for interval in range(20, 241, 10):
+    for quiet in quiet_options:
+      policies.append(ReminderPolicy(interval=interval, quiet=quiet))
+
+  seen = set()
+  for count in range(2, 13):
+    for first in range(wake_minute, wake_minute + 121, 15):
+      for last in range(sleep_minute - SLOT_MINUTES, sleep_minute - 181, -15):
+        if last - first < (count - 1) * SLOT_MINUTES:
+          continue
+        step = (last - first) / (count - 1)
+        times = tuple(round((first + i * step) / SLOT_MINUTES) * SLOT_MINUTES for i in range(count))
+        if times not in seen:
+          seen.add(times)
+          policies.append(ReminderPolicy(times=times))
+  return policies
+
+
+def day_masks(log_day, intake, target, wake_minute, sleep_minute):
+  """
+    (sendable, helpful) slot bitsets for one recorded day.
+
+    log_day is the day's intake_log.DayLog, or None when only the total is known.
+    """
+  span = sleep_minute - wake_minute
+  awake_slots = range(-(-wake_minute // SLOT_MINUTES), -(-sleep_minute // SLOT_MINUTES))
+  sendable = helpful = 0
+
+  if log_day is None or not len(log_day.seconds):
+    # Only the total: an even pace is either always ahead (target met) or always behind
+    if target <= 0 or intake >= target:
+      return 0, 0
+    for slot in awake_slots:
+      sendable |= 1 << slot
+    return sendable, sendable
+
+  seconds, amounts = log_day.seconds, log_day.amounts
+  index = drunk = 0
+  last_drink = wake_minute * 60
+  for slot in awake_slots:
+    second = slot * SLOT_MINUTES * 60
+    while index < len(seconds) and seconds[index] < second:
+      drunk += amounts[index]
+      last_drink = max(last_drink, seconds[index])
+      index += 1
+    expected = target * (slot * SLOT_MINUTES - wake_minute) // span
+    if drunk >= expected:
+      continue  # Ahead of pace: the app would suppress the reminder
+    sendable |= 1 << slot
+    if second - last_drink >= GAP_MINUTES * 60:
+      helpful |= 1 << slot
+  return sendable, helpful
+
+
+def bit_matrix(bitsets):
+  """Slot bitsets as rows of a 0/1 float matrix"""
+  width = SLOTS // 8
+  raw = b"".join(bits.to_bytes(width, "little") for bits in bitsets)
+  packed = np.frombuffer(raw, dtype=np.uint8).reshape(len(bitsets), width)
+  return np.unpackbits(packed, axis=1, bitorder="little").astype(np.float32)
+
+
+def typical_drink(event_store):
+  """Median logged drink in ml"""
+  amounts = [amount for day in event_store.days.values() for amount in day.amounts] if event_store else []
+  return int(statistics.median(amounts)) if amounts else DEFAULT_DRINK_ML
+
+
+def history_days(data_manager, data, days=HISTORY_DAYS, end=None):
+  """(ordinal, intake, target) for each recorded day in the `days` days before `end` (default: yesterday)"""
+  end = end or date.today() - timedelta(days=1)
+  start = end - timedelta(days=days - 1)
+  return [
+    (date.fromisoformat(day["start"]).toordinal(), day["intake"], day["target"])
+    for day in data_manager.query(data, start, end)
+  ]
+
+
+class Simulation:
+  """Recorded days reduced to slot masks, ready to score any number of policies"""
+
+  def __init__(self, days, event_store=None, wake_time="08:00", sleep_time="22:00",
+               drink_ml=None, response_rate=RESPONSE_RATE, notification_cost=NOTIFICATION_COST):
+    self.wake_minute = parse_clock_time(wake_time, 8 * 60)
+    self.sleep_minute = parse_clock_time(sleep_time, 22 * 60)
+    if self.sleep_minute <= self.wake_minute:
+      self.sleep_minute = MINUTES_PER_DAY
+    self.response_ml = response_rate * (drink_ml or typical_drink(event_store))
+    self.notification_cost = notification_cost
+
+    self.intakes = []
+    self.targets = []
+    self.sendable = []
+    self.helpful = []
+    for ordinal, intake, target in days:
+      if target <= 0:
+        continue
+      log_day = event_store.days.get(ordinal) if event_store else None
+      sendable, helpful = day_masks(log_day, intake, target, self.wake_minute, self.sleep_minute)
+      self.intakes.append(intake)
+      self.targets.append(target)
+      self.sendable.append(sendable)
+      self.helpful.append(helpful)
+    self.baseline = sum(1 for intake, target in zip(self.intakes, self.targets) if intake >= target)
+
+  def count(self, masks):
+    """(sent, helpful) counts per day for each policy mask"""
+    if HAS_NUMPY:
+      policies = bit_matrix(masks).T
+      sent = bit_matrix(self.sendable) @ policies
+      helpful = bit_matrix(self.helpful) @ policies
+      return sent.T, helpful.T
+
+    rows = list(zip(self.sendable, self.helpful))
+    sent, helpful = [], []
+    for mask in masks:
+      sent.append([popcount(s & mask) for s, _ in rows])
+      helpful.append([popcount(h & mask) for _, h in rows])
+    return sent, helpful
+
+  def on_target_days(self, helpful):
+    """Estimated on-target days per policy from helpful-reminder counts"""
+    if HAS_NUMPY:
+      if not self.intakes:
+        return np.zeros(len(helpful))
+      estimate = np.asarray(self.intakes, dtype=np.float64) + np.asarray(helpful) * self.response_ml
+      return (estimate >= np.asarray(self.targets, dtype=np.float64)).sum(axis=1)
+
+    response_ml = self.response_ml
+    days = list(zip(self.intakes, self.targets))
+    return [
+      sum(1 for (intake, target), count in zip(days, counts) if intake + count * response_ml >= target)
+      for counts in helpful
+    ]
+
+  def run(self, policies):
+    """Score every policy. Returns result dicts, best first."""
+    started = time.perf_counter()
+    masks = [policy.mask(self.wake_minute, self.sleep_minute) for policy in policies]
+    sent, helpful = self.count(masks)
+    on_target = self.on_target_days(helpful)
+    day_count = max(len(self.intakes), 1)
+
+    results = []
+    for policy, sent_days, days_on_target in zip(policies, sent, on_target):
+      notifications = int(sum(sent_days))
+      days_on_target = int(days_on_target)
+      results.append({
+        "policy": policy,
+        "label": policy.label(),
+        "notifications": notifications,
+        "per_day": round(notifications / day_count, 1),
+        "on_target_days": days_on_target,
+        "gained_days": days_on_target - self.baseline,
+        "score": round(days_on_target - self.notification_cost * notifications, 2)
+      })
+    results.sort(key=lambda r: (-r["score"], r["notifications"]))
+    log.info("Simulated %d policies over %d days in %.1f ms",
+             len(policies), len(self.intakes), (time.perf_counter() - started) * 1000)
+    return results
+
+
+def suggest_policies(data_manager, data, top=5, days=HISTORY_DAYS):
+  """Best candidate policies for a profile, with its recorded days and drink log"""
+  simulation = Simulation(
+    history_days(data_manager, data, days),
+    data_manager.get_event_store(),
+    data.get("wake_time", "08:00"),
+    data.get("sleep_time", "22:00")
+  )
+  policies = candidate_policies(simulation.wake_minute, simulation.sleep_minute)
+  return simulation, simulation.run(policies)[:top]
+
+
+def apply_policy(policy, scheduler, user_data):
+  """
+    Load a policy into the ReminderScheduler and user_data.
+
+    A plain interval sets reminder_interval and clears custom reminders.
+    Anything else becomes custom reminders at the times it would fire.
+    Returns "interval" or "custom" so the caller knows which reminders to run.
+    """
+  if policy.interval and not policy.times and not policy.quiet:
+    user_data["reminder_interval"] = policy.interval
+    scheduler.load_reminders([])
+    user_data["custom_reminders"] = scheduler.to_list()
+    return "interval"
+
+  wake_minute = parse_clock_time(user_data.get("wake_time", "08:00"), 8 * 60)
+  sleep_minute = parse_clock_time(user_data.get("sleep_time", "22:00"), 22 * 60)
+  if sleep_minute <= wake_minute:
+    sleep_minute = MINUTES_PER_DAY
+  minutes = policy.fire_minutes(wake_minute, sleep_minute)
+  scheduler.load_reminders([[m // 60, m % 60, f"reminder_{i}"] for i, m in enumerate(minutes)])
+  user_data["custom_reminders"] = scheduler.to_list()
+  return "custom"
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--data", default="user_data.json", help="Profile to simulate")
+  parser.add_argument("--days", type=int, default=HISTORY_DAYS, help="Days of history to replay")
+  parser.add_argument("--top", type=int, default=10)
+  parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+  args = parser.parse_args(argv)
+  setup_logging(console=True)
+
+  from data_manager import DataManager
+  manager = DataManager(args.data)
+  with open(args.data, "r") as f:
+    data = json.load(f)  # Read directly: load_data would stamp last_login
+
+  simulation, results = suggest_policies(manager, data, args.top, args.days)
+  if args.json:
+    print(json.dumps([{**r, "policy": r["policy"].to_dict()} for r in results], indent=2))
+    return
+
+  print(f"{len(simulation.intakes)} days replayed, {simulation.baseline} on target as recorded")
+  print(f"{'Score':>7}{'On target':>11}{'Per day':>9}  Policy")
+  for r in results:
+    print(f"{r['score']:>7.1f}{r['on_target_days']:>11}{r['per_day']:>9.1f}  {r['label']}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,210 @@
+import json
+import logging
+import os
+import secrets
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# Keep this module free of heavy imports (tkinter, pygame, PIL): it runs before
+# the GUI stack is loaded so a duplicate launch can hand off and exit quickly.
+
+APP_ID = "water_reminder"
+CONNECT_TIMEOUT = 0.5  # seconds
+
+
+def parse_launch_args(argv):
+  """Parse command line arguments into a launch request dictionary"""
+  request = {
+    "show": False,
+    "minimized": False,
+    "add": [],
+    "toggle_reminders": False
+  }
+
+  i = 0
+  while i < len(argv):
+    arg = argv[i]
+    if arg == "--show":
+      request["show"] = True
+    elif arg == "--minimized":
+      request["minimized"] = True
+    elif arg == "--toggle-reminders":
+      request["toggle_reminders"] = True
+    elif arg == "--add" and i + 1 < len(argv):
+      i += 1
+      try:
+        request["add"].append(int(argv[i]))
+      except ValueError:
+        log.warning("Ignoring invalid --add amount: %s", argv[i])
+    elif arg.startswith("--add="):
+      try:
+        request["add"].append(int(arg.split("=", 1)[1]))
+      except ValueError:
+        log.warning("Ignoring invalid argument: %s", arg)
+    i += 1
+
+  return request
+
+
+class SingleInstance:
+  def __init__(self, app_id=APP_ID, directory=None):
+    # Lock files are per user so different accounts don't block each other
+    user = os.environ.get("USERNAME") or os.environ.get("USER") or "user"
+    directory = directory or tempfile.gettempdir()
+    self.lock_path = os.path.join(directory, f"{app_id}-{user}.lock")
+    self.port_path = os.path.join(directory, f"{app_id}-{user}.port")
+    self.lock_file = None
+    self.server_socket = None
+    self.server_thread = None
+    self.token = None
+
+  def acquire(self):
+    """Try to become the primary instance. Returns True on success."""
+    try:
+      lock_file = open(self.lock_path, "a+")
+    except OSError as e:
+      log.error("Could not open instance lock file: %s", e)
+      return True  # Don't prevent the app from starting
+
+    try:
+      if sys.platform == "win32":
+        import msvcrt
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+      else:
+        import fcntl
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+      lock_file.close()
+      return False
+
+    self.lock_file = lock_file
+    return True
+
+  def forward(self, request):
+    """Send a launch request to the running instance. Returns True if it was handled."""
+    try:
+      with open(self.port_path, "r") as f:
+        info = json.load(f)
+      port = int(info["port"])
+      token = info["token"]
+    except (OSError, ValueError, KeyError):
+      return False
+
+    message = json.dumps({"token": token, "request": request}) + "\n"
+    try:
+      with socket.create_connection(("127.0.0.1", port), timeout=CONNECT_TIMEOUT) as conn:
+        conn.sendall(message.encode("utf-8"))
+        reply = conn.makefile("r", encoding="utf-8").readline()
+        return reply.strip() == "ok"
+    except OSError:
+      return False
+
+  def serve(self, handler):
+    """Listen for launch requests from later instances and pass them to handler"""
+    self.token = secrets.token_hex(16)
+    self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    self.server_socket.bind(("127.0.0.1", 0))
+    self.server_socket.listen(5)
+    port = self.server_socket.getsockname()[1]
+
+    # Only the current user should be able to read the token
+    fd = os.open(self.port_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+      json.dump({"port": port, "token": self.token, "pid": os.getpid()}, f)
+
+    def accept_loop():
+      while True:
+        try:
+          conn, _ = self.server_socket.accept()
+        except OSError:
+          return  # Socket closed
+        with conn:
+          try:
+            conn.settimeout(CONNECT_TIMEOUT)
+            line = conn.makefile("r", encoding="utf-8").readline()
+            message = json.loads(line)
+            if message.get("token") != self.token:
+              conn.sendall(b"denied\n")
+              continue
+            conn.sendall(b"ok\n")
+            handler(message.get("request", {}))
+          except Exception:
+            log.exception("Error handling launch request")
+
+    self.server_thread = threading.Thread(target=accept_loop, daemon=True)
+    self.server_thread.start()
+    return port
+
+  def release(self):
+    """Stop listening and release the instance lock"""
+    if self.server_socket:
+      try:
+        self.server_socket.close()
+      except OSError:
+        pass
+      self.server_socket = None
+      try:
+        os.remove(self.port_path)
+      except OSError:
+        pass
+
+    if self.lock_file:
+      try:
+        if sys.platform == "win32":
+          import msvcrt
+          self.lock_file.seek(0)
+          msvcrt.locking(self.lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+          import fcntl
+          fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+      except OSError:
+        pass
+      self.lock_file.close()
+      self.lock_file = None
+
+
+def build_forward_request(argv):
+  """Build the request a duplicate launch sends to the running instance"""
+  request = parse_launch_args(argv)
+  # A plain second launch should bring the running window to the front
+  if not (request["add"] or request["toggle_reminders"] or request["minimized"]):
+    request["show"] = True
+  return request
+
+
+def claim_or_forward(argv, retries=10, retry_delay=0.2):
+  """
+    Become the primary instance or hand the arguments to the one already running.
+
+    Returns the held SingleInstance if this process should start the app,
+    or None if the launch was forwarded (or a running instance was found) and
+    this process should exit.
+    """
+  instance = SingleInstance()
+  if instance.acquire():
+    return instance
+
+  request = build_forward_request(argv)
+  # The running instance may still be starting up and not listening yet
+  for _ in range(retries):
+    if instance.forward(request):
+      return None
+    time.sleep(retry_delay)
+
+  log.warning("Another instance is running but did not respond")
+  return None
+
+
+def forward_to_running_instance(argv):
+  """Forward the launch to a running instance without claiming the lock. Returns True if forwarded."""
+  instance = SingleInstance()
+  if instance.acquire():
+    instance.release()
+    return False
+  return instance.forward(build_forward_request(argv))
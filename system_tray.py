@@ -1,18 +1,47 @@
+import logging
 import os
 import sys
+import threading
 import tkinter as tk
-from PIL import Image, ImageTk
+from PIL import Image, ImageDraw, ImageTk
+
+from data_manager import get_quick_add_amounts
+
+log = logging.getLogger(__name__)
 
 # For Windows and Linux
 try:
   import pystray
-  from pystray import MenuItem as item
+  from pystray import Menu, MenuItem as item
 
   HAS_PYSTRAY = True
 except ImportError:
   HAS_PYSTRAY = False
-  print("pystray package not found. System tray functionality will be disabled.")
-  print("Install it with: pip install pystray")
+  log.warning("pystray package not found, system tray disabled. Install it with: pip install pystray")
+
+
+ICON_SIZE = 64
+PROGRESS_STEP = 5  # Pre-render one icon frame per 5%
+UPDATE_THROTTLE = 0.5  # seconds; a burst of updates causes one icon change
+
+
+def render_progress_frames(base_image, step=PROGRESS_STEP):
+  """Pre-render the tray icon with a progress bar for every `step` percent"""
+  base = base_image.convert("RGBA").resize((ICON_SIZE, ICON_SIZE))
+  bar_height = ICON_SIZE // 6
+  top = ICON_SIZE - bar_height
+
+  frames = {}
+  for percent in range(0, 101, step):
+    frame = base.copy()
+    draw = ImageDraw.Draw(frame)
+    draw.rectangle([0, top, ICON_SIZE - 1, ICON_SIZE - 1], fill=(40, 40, 40, 220))
+    filled = round((ICON_SIZE - 2) * percent / 100)
+    if filled > 0:
+      colour = (46, 204, 113, 255) if percent >= 100 else (52, 152, 219, 255)
+      draw.rectangle([1, top + 1, filled, ICON_SIZE - 2], fill=colour)
+    frames[percent] = frame
+  return frames
 
 
 class SystemTray:
@@ -23,6 +52,17 @@ class SystemTray:
     self.tray_icon = None
     self.tray_thread = None
 
+    # Progress icon frames and the throttled update state
+    self.progress_frames = {}
+    self.current_frame = None
+    self.pending_progress = None
+    self.update_timer = None
+    self.update_lock = threading.Lock()
+
+    # Quick-add amounts and last amount the current menu shows
+    self.menu_amounts = None
+    self.menu_last_amount = None
+
     # Make window withdraw instead of destroy on close
     self.root.protocol("WM_DELETE_WINDOW", self.hide_window)
 
@@ -35,7 +75,7 @@ class SystemTray:
     if HAS_PYSTRAY and os.path.exists(icon_path):
       self.setup_tray()
     else:
-      print(f"System tray disabled. Icon path exists: {os.path.exists(icon_path)}")
+      log.info("System tray disabled. Icon path exists: %s", os.path.exists(icon_path))
       # Keep window visible if no tray support
       self.is_visible = True
       self.show_window()
@@ -61,7 +101,7 @@ class SystemTray:
           style = style | WS_EX_TOOLWINDOW
           ctypes.windll.user32.SetWindowLongW(hwnd, GWL_EXSTYLE, style)
         except Exception as e:
-          print(f"Could not remove from taskbar: {e}")
+          log.warning("Could not remove from taskbar: %s", e)
 
       # For Linux
       elif sys.platform.startswith('linux'):
@@ -75,71 +115,153 @@ class SystemTray:
         # NSApplicationActivationPolicyAccessory = 1
         # This requires PyObjC which is a larger dependency
     except Exception as e:
-      print(f"Error configuring window: {e}")
+      log.error("Error configuring window: %s", e)
 
   def setup_tray(self):
     """Set up the system tray icon and menu"""
     try:
       image = Image.open(self.icon_path)
-
-      # Create menu items
-      menu = (
-        item('Show', self.show_window),
-        item('Hide', self.hide_window),
-        item('Add Water', self.add_water_menu),
-        item('Toggle Reminders', self.toggle_reminders),
-        item('Exit', self.exit_app)
-      )
+      self.progress_frames = render_progress_frames(image)
+      percent, intake, target = self.app_progress()
+      self.current_frame = self.frame_for(percent)
 
       # Create tray icon
-      self.tray_icon = pystray.Icon("WaterReminder", image, "Water Reminder", menu)
+      self.tray_icon = pystray.Icon(
+        "WaterReminder",
+        self.progress_frames[self.current_frame],
+        self.tooltip(percent, intake, target),
+        self.build_menu(get_quick_add_amounts(self.app.user_data))
+      )
 
       # Start the icon in a separate thread
-      import threading
       self.tray_thread = threading.Thread(target=self.tray_icon.run)
       self.tray_thread.daemon = True
       self.tray_thread.start()
 
-      print("System tray icon initialized successfully")
+      log.info("System tray icon initialized")
+    except Exception:
+      log.exception("Error setting up system tray")
+
+  def app_progress(self):
+    """Get (percent, intake, target) from the app's data"""
+    intake = self.app.user_data.get("current_intake", 0)
+    target = self.app.user_data.get("daily_target", 0)
+    percent = min(100, round(intake / target * 100)) if target > 0 else 0
+    return percent, intake, target
+
+  def frame_for(self, percent):
+    """Key of the pre-rendered frame closest below percent"""
+    return min(100, max(0, percent)) // PROGRESS_STEP * PROGRESS_STEP
+
+  def tooltip(self, percent, intake, target):
+    return f"Water Reminder - {percent}% ({intake}/{target} ml)"
+
+  def update_progress(self, percent, intake, target):
+    """Show new progress in the tray; bursts are coalesced into one update"""
+    with self.update_lock:
+      self.pending_progress = (percent, intake, target)
+      if self.update_timer is not None:
+        return  # An update is already scheduled and will pick up the latest values
+      self.update_timer = threading.Timer(UPDATE_THROTTLE, self.apply_progress)
+      self.update_timer.daemon = True
+      self.update_timer.start()
+
+  def apply_progress(self):
+    with self.update_lock:
+      progress = self.pending_progress
+      self.update_timer = None
+    if progress is None or self.tray_icon is None:
+      return
+
+    percent, intake, target = progress
+    try:
+      frame = self.frame_for(percent)
+      if frame != self.current_frame:
+        # Frames are pre-rendered, so this just swaps the image
+        self.tray_icon.icon = self.progress_frames[frame]
+        self.current_frame = frame
+      self.tray_icon.title = self.tooltip(percent, intake, target)
     except Exception as e:
-      print(f"Error setting up system tray: {e}")
+      log.error("Error updating tray icon: %s", e)
+    self.refresh_last_amount()
 
-  def add_water_menu(self):
-    """Show submenu for adding water"""
+  def refresh_last_amount(self):
+    """Redraw the menu when the "Repeat last" entry's amount changed"""
+    last_amount = self.app.user_data.get("last_amount")
+    if last_amount == self.menu_last_amount:
+      return
     try:
-      from pystray import Menu, MenuItem as item
+      # Some backends only re-evaluate dynamic item text when asked to
+      self.tray_icon.update_menu()
+      self.menu_last_amount = last_amount
+    except Exception as e:
+      log.error("Error updating tray menu: %s", e)
+
+  def build_menu(self, amounts):
+    """Build the tray menu once; it is only rebuilt when the quick-add amounts change"""
+    self.menu_amounts = tuple(amounts)
+    self.menu_last_amount = self.app.user_data.get("last_amount")
 
-      # Create water amount menu
-      amounts = [100, 200, 300, 500]
-      water_menu = Menu(
-        *[item(f"{amount} ml", lambda _, a=amount: self.add_water(a)) for amount in amounts]
+    water_menu = Menu(
+      *[item(f"{amount} ml", self.quick_add_action(amount)) for amount in amounts],
+      Menu.SEPARATOR,
+      item(
+        lambda _: f"Repeat last ({self.app.user_data.get('last_amount')} ml)"
+        if self.app.user_data.get("last_amount") else "Repeat last amount",
+        self.repeat_last_amount,
+        enabled=lambda _: bool(self.app.user_data.get("last_amount"))
       )
+    )
+
+    return Menu(
+      item('Show', self.show_window),
+      item('Hide', self.hide_window),
+      item('Add Water', water_menu),
+      item('Toggle Reminders', self.toggle_reminders),
+      item('Diagnostics', self.show_diagnostics),
+      item('Exit', self.exit_app)
+    )
 
-      return water_menu
+  def quick_add_action(self, amount):
+    """Menu action for one amount (pystray passes icon/item to actions that take arguments)"""
+    return lambda: self.add_water(amount)
+
+  def set_quick_add_amounts(self, amounts):
+    """Rebuild the Add Water submenu if the configured amounts changed"""
+    if self.tray_icon is None or tuple(amounts) == self.menu_amounts:
+      return
+    try:
+      self.tray_icon.menu = self.build_menu(amounts)
+      self.tray_icon.update_menu()
     except Exception as e:
-      print(f"Error creating water menu: {e}")
-      # Fallback to 200ml
-      self.add_water(200)
+      log.error("Error updating tray menu: %s", e)
+
+  def repeat_last_amount(self):
+    """Add the most recently logged amount again"""
+    amount = self.app.user_data.get("last_amount")
+    if amount:
+      self.add_water(amount)
 
   def add_water(self, amount):
     """Add water from system tray"""
     try:
-      self.app.add_water(amount)
-      # Show notification
-      self.app.notification_manager.send_notification(
-        "Water Added",
-        f"Added {amount} ml of water!",
-        sound="water_drop" if self.app.user_data.get("sound_enabled", True) else None
-      )
-    except Exception as e:
-      print(f"Error adding water from tray: {e}")
+      # The app publishes IntakeAdded on the Tk thread; its subscribers play the
+      # sound and show the "Water Added" notification
+      self.root.after(0, self.app.add_water, amount, "tray")
+    except Exception:
+      log.exception("Error adding water from tray")
 
   def toggle_reminders(self):
     """Toggle reminders from system tray"""
     try:
       self.app.toggle_reminder()
-    except Exception as e:
-      print(f"Error toggling reminders from tray: {e}")
+    except Exception:
+      log.exception("Error toggling reminders from tray")
+
+  def show_diagnostics(self):
+    """Open the metrics Diagnostics window"""
+    # Tk calls must run on the Tk thread, not the tray thread
+    self.root.after(0, self.app.show_diagnostics)
 
   def show_window(self):
     """Show the main window"""
@@ -164,10 +286,11 @@ class SystemTray:
       if self.tray_icon:
         self.tray_icon.stop()
 
+      self.app.flush_pending_save()
       self.root.destroy()
       sys.exit(0)
     except Exception as e:
-      print(f"Error during exit: {e}")
+      log.error("Error during exit: %s", e)
       # Force exit if normal exit fails
       os._exit(0)
 
@@ -0,0 +1,73 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import AnalyticsEngine  # noqa: E402
+from data_manager import DataManager  # noqa: E402
+
+
+def days_ago(days):
+  return (date.today() - timedelta(days=days)).isoformat()
+
+
+class IncrementalSyncTest(unittest.TestCase):
+  """Syncing only what changed must give the same columns as a fresh full sync"""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.manager = DataManager(os.path.join(self.directory, "user_data.json"))
+    self.data = self.manager.load_data()
+    self.data["history"] = {days_ago(n): {"intake": 100 * n, "target": 2000} for n in range(1, 40)}
+    self.manager.save_data(self.data)
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def assertMatchesFreshSync(self):
+    engine = self.manager.analytics(self.data)
+    fresh = AnalyticsEngine(self.manager.archive)
+    fresh.sync(self.data["history"], self.data["daily_target"], self.data["last_reset_date"])
+    self.assertEqual(engine.series(), fresh.series())
+    self.assertEqual(engine.summary(), fresh.summary())
+
+  def test_late_event_is_folded_in(self):
+    self.assertMatchesFreshSync()
+    version = self.manager.analytics_engine.version
+    late = datetime.fromisoformat(days_ago(3)).replace(hour=12)
+    self.manager.apply_intake_events(self.data, [(late, 250)])
+    self.assertMatchesFreshSync()
+    self.assertGreater(self.manager.analytics_engine.version, version)
+
+  def test_new_day_is_folded_in(self):
+    self.data["last_reset_date"] = days_ago(1)
+    self.manager.analytics(self.data)  # Yesterday still in progress
+
+    self.data["current_intake"] = 1234
+    self.manager.archive_daily_data(self.data)
+    self.data["last_reset_date"] = days_ago(0)
+    self.assertMatchesFreshSync()
+    self.assertEqual(self.manager.analytics(self.data).series()[1][-1], 1234)
+
+  def test_unchanged_history_keeps_the_cache(self):
+    engine = self.manager.analytics(self.data)
+    version = engine.version
+    self.manager.analytics(self.data)
+    self.assertEqual(engine.version, version)
+
+
+class CacheTest(unittest.TestCase):
+  def test_none_results_are_cached(self):
+    engine = AnalyticsEngine()
+    calls = []
+    for _ in range(2):
+      engine.cached("key", lambda: calls.append(1))
+    self.assertEqual(len(calls), 1)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,56 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_server import HttpError, WaterApiServer, parse_amount, parse_timestamp  # noqa: E402
+from data_manager import DataManager  # noqa: E402
+
+
+class ValidationTest(unittest.TestCase):
+  def test_timestamps_outside_the_event_window_are_rejected(self):
+    for value in ("0001-01-01T00:00:00", "1960-01-01", -315619200, "2999-01-01", 1e20, True):
+      with self.assertRaises(HttpError) as raised:
+        parse_timestamp(value)
+      self.assertEqual(raised.exception.status, 400)
+
+  def test_amounts_above_the_event_log_maximum_are_rejected(self):
+    self.assertEqual(parse_amount(65535), 65535)
+    for value in (0, -5, 70000, 1.5, True):
+      with self.assertRaises(HttpError):
+        parse_amount(value)
+
+
+class BatchTest(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.api = WaterApiServer(DataManager(os.path.join(self.directory, "user_data.json")))
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def test_bad_event_rejects_the_whole_batch(self):
+    body = json.dumps({"events": [{"amount": 250}, {"amount": 100, "timestamp": "1960-01-01"}]}).encode()
+    with self.assertRaises(HttpError) as raised:
+      self.api.dispatch("POST", "/intake/batch", body)
+    self.assertEqual(raised.exception.status, 400)
+    self.assertEqual(self.api.user_data["current_intake"], 0)
+
+    status, payload = self.api.dispatch("POST", "/intake", b'{"amount": 250}')
+    self.assertEqual((status, payload["current_intake"]), (200, 250))
+
+  def test_data_manager_rejects_unloggable_events_before_changing_data(self):
+    data = self.api.user_data
+    with self.assertRaises(ValueError):
+      self.api.data_manager.apply_intake_events(data, [(datetime.now(), 100), (datetime(1960, 1, 1), 100)])
+    self.assertEqual(data["current_intake"], 0)
+    self.assertTrue(self.api.data_manager.save_data(data))
+
+
+if __name__ == "__main__":
+  unittest.main()
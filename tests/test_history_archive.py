@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_manager import DataManager  # noqa: E402
+
+
+def days_ago(days):
+  return (date.today() - timedelta(days=days)).isoformat()
+
+
+class SealedHistoryTest(unittest.TestCase):
+  """Late events and stale processes must never overwrite days already sealed into the archive"""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.filename = os.path.join(self.directory, "user_data.json")
+    self.old_day = days_ago(200)
+    self.recent_day = days_ago(1)
+
+    # A file written before the old day was sealed
+    manager = DataManager(self.filename)
+    data = manager.load_data()
+    data["history"] = {
+      self.old_day: {"intake": 1500, "target": 2000, "percentage": 75.0},
+      self.recent_day: {"intake": 1800, "target": 2000, "percentage": 90.0}
+    }
+    with open(self.filename, "w") as f:
+      json.dump(data, f)
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def archived_intake(self, day):
+    entry = DataManager(self.filename).archive.segment(day[:7]).get(day)
+    return entry and entry["intake"]
+
+  def test_save_seals_old_days(self):
+    manager = DataManager(self.filename)
+    data = manager.load_data()
+    self.assertTrue(manager.save_data(data))
+    self.assertNotIn(self.old_day, data["history"])
+    self.assertEqual(self.archived_intake(self.old_day), 1500)
+
+  def test_late_event_adds_to_sealed_day(self):
+    manager = DataManager(self.filename)
+    data = manager.load_data()
+    manager.save_data(data)
+
+    late = datetime.fromisoformat(self.old_day).replace(hour=12)
+    self.assertEqual(manager.apply_intake_events(data, [(late, 250)]), 1)
+    self.assertTrue(manager.save_data(data))
+    self.assertEqual(self.archived_intake(self.old_day), 1750)
+
+  def test_stale_process_does_not_resurrect_sealed_days(self):
+    stale = DataManager(self.filename)
+    stale_data = stale.load_data()
+
+    # Another process seals the old day while the stale one still holds it in memory
+    sealer = DataManager(self.filename)
+    sealer.save_data(sealer.load_data())
+
+    stale_data["current_intake"] += 100
+    self.assertTrue(stale.save_data(stale_data))
+    self.assertNotIn(self.old_day, stale_data["history"])
+    self.assertEqual(self.archived_intake(self.old_day), 1500)
+
+    reloaded = DataManager(self.filename).load_data()
+    self.assertNotIn(self.old_day, reloaded["history"])
+    self.assertEqual(reloaded["current_intake"], 100)
+
+  def test_stale_process_keeps_its_late_event_for_a_sealed_day(self):
+    stale = DataManager(self.filename)
+    stale_data = stale.load_data()
+    late = datetime.fromisoformat(self.old_day).replace(hour=12)
+    stale.apply_intake_events(stale_data, [(late, 250)])
+
+    sealer = DataManager(self.filename)
+    sealer.save_data(sealer.load_data())
+
+    self.assertTrue(stale.save_data(stale_data))
+    self.assertEqual(self.archived_intake(self.old_day), 1750)
+
+  def test_reload_drops_days_sealed_elsewhere(self):
+    stale = DataManager(self.filename)
+    stale_data = stale.load_data()
+
+    sealer = DataManager(self.filename)
+    sealer.save_data(sealer.load_data())
+
+    stale.reload_changes(stale_data)
+    self.assertNotIn(self.old_day, stale_data["history"])
+    self.assertTrue(stale.save_data(stale_data))
+    self.assertEqual(self.archived_intake(self.old_day), 1500)
+
+
+if __name__ == "__main__":
+  unittest.main()
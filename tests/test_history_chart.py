@@ -0,0 +1,37 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_chart import lttb  # noqa: E402
+
+
+class LttbTest(unittest.TestCase):
+  def test_keeps_the_ends_and_exactly_threshold_points(self):
+    rng = random.Random(7)
+    for count in (3, 10, 101, 1000):
+      xs = list(range(count))
+      ys = [rng.randrange(0, 4000) for _ in xs]
+      for threshold in (3, 4, 17, count - 1):
+        if not 3 <= threshold <= count:
+          continue
+        with self.subTest(count=count, threshold=threshold):
+          kept = lttb(xs, ys, threshold)
+          self.assertEqual(len(kept), threshold)
+          self.assertEqual((kept[0], kept[-1]), (0, count - 1))
+          self.assertEqual(kept, sorted(set(kept)))  # Increasing, no repeats
+
+  def test_small_inputs_are_returned_whole(self):
+    self.assertEqual(lttb([0, 1, 2], [5, 6, 7], 10), [0, 1, 2])
+    self.assertEqual(lttb([0, 1, 2, 3], [5, 6, 7, 8], 2), [0, 1, 2, 3])
+
+  def test_keeps_a_spike(self):
+    ys = [1000] * 200
+    ys[123] = 5000
+    self.assertIn(123, lttb(list(range(200)), ys, 20))
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,88 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import history_sync  # noqa: E402
+from history_sync import HistorySync  # noqa: E402
+
+
+def days_ago(days):
+  return (date.today() - timedelta(days=days)).isoformat()
+
+
+def user_data(current_intake, history):
+  return {
+    "daily_target": 2000,
+    "last_reset_date": days_ago(0),
+    "current_intake": current_intake,
+    "history": {day: {"intake": intake, "target": 2000} for day, intake in history.items()}
+  }
+
+
+def intakes(data):
+  return {day: entry["intake"] for day, entry in data["history"].items()}
+
+
+class TwoDeviceSyncTest(unittest.TestCase):
+  """Two devices logging water and exchanging deltas end up with the same history"""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.sync_dir = os.path.join(self.directory, "shared")
+    compact_after = history_sync.COMPACT_AFTER
+    history_sync.COMPACT_AFTER = 3
+    self.addCleanup(setattr, history_sync, "COMPACT_AFTER", compact_after)
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def device(self, name):
+    return HistorySync(os.path.join(self.directory, f"{name}_sync.json"), self.sync_dir)
+
+  def delta_files(self):
+    return [name for name in os.listdir(self.sync_dir) if name.endswith(".delta.json")]
+
+  def test_devices_converge_and_clean_up_deltas(self):
+    laptop, phone = self.device("laptop"), self.device("phone")
+    laptop_data = user_data(0, {days_ago(1): 1500})
+    phone_data = user_data(0, {})
+    yesterday = days_ago(1)
+
+    for round_number in range(10):
+      laptop_data["current_intake"] += 250
+      laptop.sync(laptop_data)
+
+      phone_data["current_intake"] += 100
+      if yesterday in phone_data["history"]:
+        # A late entry for yesterday logged on the phone
+        phone_data["history"][yesterday]["intake"] += 50
+        phone.mark_dirty([yesterday])
+      phone.sync(phone_data)
+
+    # Quiet rounds so each side applies the other's last delta and its watermark
+    for _ in range(2):
+      laptop.sync(laptop_data)
+      phone.sync(phone_data)
+
+    self.assertEqual(laptop_data["current_intake"], 10 * 250 + 10 * 100)
+    self.assertEqual(phone_data["current_intake"], laptop_data["current_intake"])
+    self.assertEqual(intakes(laptop_data), intakes(phone_data))
+    self.assertEqual(intakes(laptop_data)[yesterday], 1500 + 9 * 50)
+
+    # Deltas both devices applied and a snapshot covers are gone
+    self.assertLess(len(self.delta_files()), 2 * history_sync.COMPACT_AFTER)
+
+    # A device joining now starts from the snapshots instead of the deleted deltas
+    tablet_data = user_data(0, {})
+    self.device("tablet").sync(tablet_data)
+    self.assertEqual(tablet_data["current_intake"], laptop_data["current_intake"])
+    self.assertEqual(intakes(tablet_data), intakes(laptop_data))
+
+
+if __name__ == "__main__":
+  unittest.main()
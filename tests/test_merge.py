@@ -0,0 +1,68 @@
+import os
+import sys
+import unittest
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_manager import merge_user_data  # noqa: E402
+
+
+def days_ago(days):
+  return (date.today() - timedelta(days=days)).isoformat()
+
+
+def user_data(current_intake, history):
+  return {
+    "daily_target": 2000,
+    "last_reset_date": days_ago(0),
+    "current_intake": current_intake,
+    "history": {day: {"intake": intake, "target": 2000} for day, intake in history.items()}
+  }
+
+
+def intakes(data):
+  return {day: entry["intake"] for day, entry in data["history"].items()}
+
+
+class MergeUserDataTest(unittest.TestCase):
+  """Two processes writing the same file: counters merge per day, nothing is lost"""
+
+  def test_concurrent_increments_of_the_same_day_add_up(self):
+    base = user_data(500, {days_ago(1): 1000})
+    disk = user_data(700, {days_ago(1): 1250})  # Another process: +200 today, +250 yesterday
+    mine = user_data(800, {days_ago(1): 1100})  # This one: +300 today, +100 yesterday
+
+    merged = merge_user_data(base, disk, mine)
+    self.assertEqual(merged["current_intake"], 1000)
+    self.assertEqual(intakes(merged)[days_ago(1)], 1350)
+
+  def test_merge_is_the_same_from_either_side(self):
+    base = user_data(500, {days_ago(1): 1000})
+    disk = user_data(700, {days_ago(1): 1250})
+    mine = user_data(800, {days_ago(1): 1100})
+
+    ours = merge_user_data(base, disk, mine)
+    theirs = merge_user_data(base, mine, disk)
+    self.assertEqual((ours["current_intake"], intakes(ours)), (theirs["current_intake"], intakes(theirs)))
+
+  def test_deleting_a_day_on_one_side_does_not_bring_it_back(self):
+    base = user_data(0, {days_ago(1): 1000, days_ago(2): 800})
+    disk = user_data(0, {days_ago(1): 1000, days_ago(2): 800})
+    mine = user_data(0, {days_ago(2): 800})  # Yesterday deleted here
+
+    for merged in (merge_user_data(base, disk, mine), merge_user_data(base, mine, disk)):
+      self.assertEqual(merged["history"].get(days_ago(1), {"intake": 0})["intake"], 0)
+      self.assertEqual(intakes(merged)[days_ago(2)], 800)
+
+  def test_deletion_keeps_the_other_sides_new_increments(self):
+    base = user_data(0, {days_ago(1): 1000})
+    disk = user_data(0, {days_ago(1): 1200})  # +200 after our base
+    mine = user_data(0, {})  # Deleted here
+
+    merged = merge_user_data(base, disk, mine)
+    self.assertEqual(intakes(merged)[days_ago(1)], 200)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,70 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_manager import DataManager  # noqa: E402
+from history_index import bucket_start, to_ordinal  # noqa: E402
+
+
+class QueryTest(unittest.TestCase):
+  """query() across sealed months and the hot history must match a plain sum over every day"""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.manager = DataManager(os.path.join(self.directory, "user_data.json"))
+    self.data = self.manager.load_data()
+    rng = random.Random(42)
+    today = date.today()
+    self.data["history"] = {
+      (today - timedelta(days=n)).isoformat(): {"intake": rng.randrange(0, 3000, 50), "target": 2000}
+      for n in range(1, 400) if rng.random() < 0.9
+    }
+    self.manager.save_data(self.data)  # Seals the older months into the archive
+
+    # A late event makes a hot copy of a sealed day that must win over the archived one
+    self.late_day = min(day for day, _ in self.manager.archive.days())
+    late = datetime.fromisoformat(self.late_day).replace(hour=12)
+    self.manager.apply_intake_events(self.data, [(late, 500)])
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def all_days(self):
+    days = {day: entry["intake"] for day, entry in self.manager.archive.days()}
+    days.update((day, entry["intake"]) for day, entry in self.data["history"].items())
+    return days
+
+  def brute_force(self, start, end, granularity):
+    totals = {}
+    for day, intake in self.all_days().items():
+      ordinal = to_ordinal(day)
+      if (start is None or ordinal >= to_ordinal(start)) and (end is None or ordinal <= to_ordinal(end)):
+        key = date.fromordinal(bucket_start(ordinal, granularity)).isoformat()
+        totals[key] = totals.get(key, 0) + intake
+    return sorted(totals.items())
+
+  def test_matches_brute_force_across_the_archive_boundary(self):
+    self.assertTrue(self.manager.archive.months(), "setup should have sealed some months")
+    self.assertIn(self.late_day, self.data["history"])
+    today = date.today()
+    ranges = [
+      (None, None),
+      ((today - timedelta(days=300)).isoformat(), (today - timedelta(days=20)).isoformat()),
+      ((today - timedelta(days=250)).isoformat(), None),
+      (None, (today - timedelta(days=100)).isoformat())
+    ]
+    for start, end in ranges:
+      for granularity in ("day", "week", "month"):
+        with self.subTest(start=start, end=end, granularity=granularity):
+          result = self.manager.query(self.data, start, end, granularity)
+          self.assertEqual([(b["start"], b["intake"]) for b in result], self.brute_force(start, end, granularity))
+
+
+if __name__ == "__main__":
+  unittest.main()
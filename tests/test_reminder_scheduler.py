@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reminder_scheduler import INTERVAL_REMINDER, ReminderScheduler  # noqa: E402
+
+
+class PullForwardTest(unittest.TestCase):
+  """Falling behind schedule brings the next reminders forward; catching up puts them back"""
+
+  def setUp(self):
+    self.scheduler = ReminderScheduler(None)
+    now = datetime.now()
+    for minutes in (120, 240):
+      slot = now + timedelta(minutes=minutes)
+      self.scheduler.add_reminder(slot.hour, slot.minute)
+    self.scheduler.schedule_reminders()
+
+  def tearDown(self):
+    self.scheduler.stop_interval()
+    self.scheduler.stop_reminders()
+
+  def deadline(self, reminder_id):
+    return self.scheduler.engine.reminders[(self.scheduler.user_id, reminder_id)].deadline
+
+  def reminder_ids(self):
+    """Custom reminder ids in firing order (the later one may be after midnight)"""
+    return sorted((rid for _, _, rid in self.scheduler.custom_reminders), key=self.deadline)
+
+  def test_next_custom_reminder_moves_to_behind_time_and_back(self):
+    first_id = self.reminder_ids()[0]
+    regular = self.deadline(first_id)
+    behind = time.time() + 600
+
+    self.scheduler.replan(behind)
+    self.assertEqual(self.deadline(first_id), behind)
+
+    self.scheduler.replan(None)
+    self.assertEqual(self.deadline(first_id), regular)
+    self.assertIsNone(self.scheduler.pulled)
+
+  def test_early_firing_stands_in_for_its_slot(self):
+    first_id, second_id = self.reminder_ids()
+    first_slot, second_slot = self.deadline(first_id), self.deadline(second_id)
+    self.scheduler.on_fire = lambda hour, minute: None
+
+    self.scheduler.replan(time.time() + 600)
+    engine = self.scheduler.engine
+    with engine.condition:
+      due = engine.pop_due(self.deadline(first_id))
+    engine.dispatch(due, time.time())
+
+    # Its regular slot is skipped, and the next one is pulled no earlier than halfway to it
+    self.assertEqual(self.deadline(first_id), first_slot + 24 * 3600)
+    self.assertEqual(self.deadline(second_id), first_slot + (second_slot - first_slot) / 2)
+
+  def test_interval_reminder_waits_at_least_half_an_interval(self):
+    self.scheduler.start_interval(60)
+    started = self.scheduler.last_interval
+    self.assertEqual(self.deadline(INTERVAL_REMINDER), started + 3600)
+
+    self.scheduler.replan(time.time())
+    self.assertEqual(self.deadline(INTERVAL_REMINDER), started + 1800)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,41 @@
+import os
+import random
+import sys
+import unittest
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reminder_simulator import Simulation, candidate_policies  # noqa: E402
+
+
+def random_days(seed, count=120):
+  """(ordinal, intake, target) days from a seeded generator"""
+  rng = random.Random(seed)
+  first = date(2026, 1, 1).toordinal()
+  return [(first + n, rng.randrange(800, 3200, 50), 2000) for n in range(count)]
+
+
+def simulate(seed):
+  simulation = Simulation(random_days(seed), drink_ml=250)
+  results = simulation.run(candidate_policies(simulation.wake_minute, simulation.sleep_minute))
+  return simulation, [{k: v for k, v in result.items() if k != "policy"} for result in results]
+
+
+class SimulationTest(unittest.TestCase):
+  def test_same_seed_gives_the_same_ranking(self):
+    self.assertEqual(simulate(3)[1], simulate(3)[1])
+
+  def test_results_are_ranked_and_never_lose_days(self):
+    simulation, results = simulate(11)
+    self.assertTrue(results)
+    scores = [result["score"] for result in results]
+    self.assertEqual(scores, sorted(scores, reverse=True))
+    for result in results:
+      # Reminders can only add estimated drinks
+      self.assertGreaterEqual(result["on_target_days"], simulation.baseline)
+      self.assertEqual(result["gained_days"], result["on_target_days"] - simulation.baseline)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,134 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOAK = os.path.join(ROOT, "benchmarks", "soak.py")
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.dirname(SOAK))
+
+import day_rollover  # noqa: E402
+import reminder_scheduler  # noqa: E402
+from soak import SimulatedClock, SimulatedTimers, install_clock  # noqa: E402
+
+
+def app_unavailable():
+  """Why the GUI app can't start here (no display or a missing dependency), or None"""
+  probe = "import tkinter; tkinter.Tk().destroy(); import main"
+  result = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True)
+  if result.returncode == 0:
+    return None
+  return (result.stderr.strip().splitlines() or ["unknown error"])[-1]
+
+
+class SoakSmokeTest(unittest.TestCase):
+  """Two simulated days of the real app, so the soak harness itself keeps working"""
+
+  def test_two_days_complete(self):
+    reason = app_unavailable()
+    if reason:
+      self.skipTest(f"GUI app can't start: {reason}")
+
+    result = subprocess.run(
+      [sys.executable, SOAK, "--days", "2", "--sample-hours", "6"],
+      cwd=ROOT, capture_output=True, text=True, timeout=600
+    )
+    self.assertEqual(result.returncode, 0, result.stdout[-2000:] + result.stderr[-2000:])
+    report = json.loads(result.stdout)
+    self.assertTrue(report["passed"], report["failures"])
+    self.assertGreaterEqual(report["rollovers"], 1)
+    # Hourly backups and 5-minute syncs ran on simulated time, not the real clock
+    self.assertGreaterEqual(report["jobs"]["backup_data"], 40)
+    self.assertGreaterEqual(report["jobs"]["sync_history"], 500)
+    self.assertGreater(report["jobs"]["watcher_polls"], 0)
+
+
+class SimulatedTimeTest(unittest.TestCase):
+  """The soak's clock and timers on their own, so they are covered without a display"""
+
+  def setUp(self):
+    # 22:00, so three simulated hours cross midnight
+    self.clock = SimulatedClock(datetime(2026, 3, 10, 22, 0).timestamp())
+
+  def use_simulated_clock(self):
+    saved = (time.time, time.sleep, reminder_scheduler.datetime)
+
+    def restore():
+      time.time, time.sleep, reminder_scheduler.datetime = saved
+      day_rollover.clock.refresh()
+
+    self.addCleanup(restore)
+    install_clock(self.clock)
+
+  def test_timers_run_in_due_order_on_simulated_time(self):
+    timers = SimulatedTimers(self.clock)
+    root = SimpleNamespace()
+    timers.install(root)
+    ran = []
+    root.after(2000, ran.append, "late")
+    cancelled = root.after(500, ran.append, "cancelled")
+    root.after(1000, lambda: root.after_idle(ran.append, "idle"))
+    root.after_cancel(cancelled)
+
+    timers.run_due()
+    self.assertEqual(ran, [])
+    self.clock.advance(1)
+    timers.run_due()
+    self.assertEqual(ran, ["idle"])  # Scheduled while running and already due
+    self.clock.advance(1)
+    timers.run_due()
+    self.assertEqual(ran, ["idle", "late"])
+    self.assertEqual(timers.runs["append"], 2)
+
+  def test_sleep_blocks_until_the_clock_is_advanced(self):
+    sleeper = threading.Thread(target=self.clock.sleep, args=(30,))
+    sleeper.start()
+    self.clock.advance(20)
+    sleeper.join(0.2)
+    self.assertTrue(sleeper.is_alive())
+    self.clock.advance(10)
+    sleeper.join(5)
+    self.assertFalse(sleeper.is_alive())
+
+  def test_reminders_and_rollover_follow_the_simulated_clock(self):
+    self.use_simulated_clock()
+    scheduler = reminder_scheduler.ReminderScheduler(None)
+    fired = []
+    scheduler.on_interval = lambda planned: fired.append(("interval", planned))
+    scheduler.on_fire = lambda hour, minute: fired.append(("custom", f"{hour:02d}:{minute:02d}"))
+    scheduler.add_reminder(23, 15)
+    scheduler.schedule_reminders()
+    scheduler.start_interval(60)
+    self.addCleanup(scheduler.stop_reminders)
+    self.addCleanup(scheduler.stop_interval)
+
+    # Drive the engine from the test instead of its real-time dispatcher thread
+    engine = scheduler.engine
+    engine.stop()
+    rollovers = []
+    rollover = day_rollover.DayRollover(lambda previous, new: rollovers.append((previous, new)))
+    start = self.clock.now
+    for _ in range(3 * 60):
+      self.clock.advance(60)
+      with engine.condition:
+        due = engine.pop_due(self.clock.now)
+      engine.dispatch(due, self.clock.now)
+      rollover.check()
+
+    self.assertEqual(fired, [
+      ("interval", start + 3600),
+      ("custom", "23:15"),
+      ("interval", start + 7200),
+      ("interval", start + 10800)
+    ])
+    self.assertEqual(rollovers, [("2026-03-10", "2026-03-11")])
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -1,3 +1,23 @@
+try:
+  import numpy as np
+
+  HAS_NUMPY = True
+except ImportError:
+  HAS_NUMPY = False
+
+# Activity levels in code order; a profile's level is stored as its index here
+ACTIVITY_LEVELS = ("sedentary", "light", "moderate", "active", "very active")
+ACTIVITY_MULTIPLIERS = (1.0, 1.1, 1.2, 1.3, 1.4)
+ACTIVITY_CODES = {level: code for code, level in enumerate(ACTIVITY_LEVELS)}
+
+WEIGHT_UNITS = ("kg", "lbs")
+WEIGHT_UNIT_CODES = {unit: code for code, unit in enumerate(WEIGHT_UNITS)}
+
+LBS_TO_KG = 0.453592
+ML_PER_KG = 30
+ROUND_TO_ML = 50
+
+
 def calculate_water_intake(weight, weight_unit, activity_level):
   """
     Calculate the recommended daily water intake based on weight and activity level.
@@ -11,22 +31,55 @@ def calculate_water_intake(weight, weight_unit, activity_level):
     """
   # Convert to kg if needed
   if weight_unit == "lbs":
-    weight = weight * 0.453592
+    weight = weight * LBS_TO_KG
 
   # Base calculation: 30-35ml per kg of body weight
-  base_intake = weight * 30
-
-  # Adjust for activity level
-  activity_multipliers = {
-    "sedentary": 1.0,
-    "light": 1.1,
-    "moderate": 1.2,
-    "active": 1.3,
-    "very active": 1.4
-  }
-
-  multiplier = activity_multipliers.get(activity_level, 1.0)
+  base_intake = weight * ML_PER_KG
+
+  # Adjust for activity level (unknown levels count as sedentary)
+  multiplier = ACTIVITY_MULTIPLIERS[ACTIVITY_CODES.get(activity_level, 0)]
   total_intake = base_intake * multiplier
 
   # Round to nearest 50ml
-  return round(total_intake / 50) * 50
\ No newline at end of file
+  return round(total_intake / ROUND_TO_ML) * ROUND_TO_ML
+
+
+def encode_activity_levels(activity_levels):
+  """Convert activity level names to small integer codes (unknown levels become sedentary)"""
+  codes = [ACTIVITY_CODES.get(level, 0) for level in activity_levels]
+  return np.array(codes, dtype=np.uint8) if HAS_NUMPY else codes
+
+
+def encode_weight_units(weight_units):
+  """Convert weight unit names to codes: 0 for kg, 1 for lbs"""
+  codes = [WEIGHT_UNIT_CODES.get(unit, 0) for unit in weight_units]
+  return np.array(codes, dtype=np.uint8) if HAS_NUMPY else codes
+
+
+def calculate_water_intake_batch(weights, unit_codes, activity_codes):
+  """
+    Calculate recommended intakes for many users at once.
+
+    Parameters:
+    - weights: sequence or array of weights
+    - unit_codes: weight unit codes from encode_weight_units()
+    - activity_codes: activity level codes from encode_activity_levels()
+
+    Returns: targets in ml, as a NumPy int64 array when NumPy is installed, otherwise a list
+    """
+  if HAS_NUMPY:
+    weights = np.asarray(weights, dtype=np.float64)
+    unit_codes = np.asarray(unit_codes, dtype=np.uint8)
+    activity_codes = np.asarray(activity_codes, dtype=np.uint8)
+
+    kg = np.where(unit_codes == WEIGHT_UNIT_CODES["lbs"], weights * LBS_TO_KG, weights)
+    multipliers = np.asarray(ACTIVITY_MULTIPLIERS)[activity_codes]
+    # np.round rounds half to even, matching the built-in round() used above
+    return (np.round(kg * ML_PER_KG * multipliers / ROUND_TO_ML) * ROUND_TO_ML).astype(np.int64)
+
+  lbs = WEIGHT_UNIT_CODES["lbs"]
+  return [
+    round((weight * LBS_TO_KG if unit == lbs else weight) * ML_PER_KG * ACTIVITY_MULTIPLIERS[code] / ROUND_TO_ML)
+    * ROUND_TO_ML
+    for weight, unit, code in zip(weights, unit_codes, activity_codes)
+  ]
@@ -1,11 +1,24 @@
+import logging
 import os
 import sys
+
+# If the app is already running, pass our arguments to it and exit right away
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from app_logging import setup_logging
+from single_instance import forward_to_running_instance
+
+# Records go to a background writer in the per-user log directory, and only
+# when WATER_REMINDER_LOG is set
+setup_logging()
+log = logging.getLogger("launcher")
+
+if forward_to_running_instance(sys.argv[1:]):
+  sys.exit(0)
+
 import subprocess
-from datetime import datetime
 
 # Record the startup info
-with open("startup_log.txt", "a") as log:
-  log.write(f"Application started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+log.info("Application started", extra={"argv": sys.argv[1:]})
 
 # Get the script directory
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -26,6 +39,5 @@ try:
 
   subprocess.Popen([pythonw, os.path.join(script_dir, "main.py")] + args,
                    creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0)
-except Exception as e:
-  with open("error_log.txt", "a") as error_log:
-    error_log.write(f"Error launching app: {e}\n")
\ No newline at end of file
+except Exception:
+  log.exception("Error launching app")
\ No newline at end of file